@@ -0,0 +1,76 @@
+"""
+Client disconnect detection.
+Following Single Responsibility Principle - handles only stopping work whose HTTP client has gone away.
+"""
+
+import asyncio
+from typing import Awaitable, TypeVar
+
+from starlette.requests import Request
+
+from ..utils import metrics
+from ..utils.exceptions import ClientDisconnectedError
+
+T = TypeVar("T")
+
+
+async def _wait_for_disconnect(http_request: Request) -> None:
+    """Return once the server reports that the client closed the connection."""
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_until_disconnect(http_request: Request, work: Awaitable[T], route: str) -> T:
+    """
+    Await ``work``, cancelling it as soon as the client disconnects.
+
+    ``work`` is awaited in the calling task; only the disconnect watcher
+    runs in its own task and cancels the caller when the client goes away.
+    Async generators advanced through ``work`` (e.g. ``stream.__anext__()``)
+    therefore keep running in the task that consumes them. The request body
+    must already have been read, so the only message left to receive is the
+    disconnect.
+
+    Args:
+        http_request: Request whose connection is watched
+        work: Coroutine or awaitable producing the result
+        route: Route label for metrics
+
+    Returns:
+        The result of ``work``
+
+    Raises:
+        ClientDisconnectedError: If the client went away first (``work`` has been cancelled)
+    """
+    current = asyncio.current_task()
+    disconnected = False
+    finished = False
+
+    def on_disconnect(watcher: "asyncio.Future[None]") -> None:
+        nonlocal disconnected
+        if finished or watcher.cancelled() or watcher.exception() is not None:
+            return
+        disconnected = True
+        current.cancel()
+
+    watcher = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    watcher.add_done_callback(on_disconnect)
+    try:
+        result = await work
+    except asyncio.CancelledError:
+        # Only our own cancellation becomes a disconnect; any other is passed on
+        if not disconnected or current.uncancel() > 0:
+            raise
+    else:
+        if not disconnected:
+            return result
+        # The work finished despite the cancellation, but the client is gone
+        current.uncancel()
+    finally:
+        finished = True
+        watcher.cancel()
+
+    metrics.REQUESTS_CANCELLED.labels(route, "disconnect").inc()
+    raise ClientDisconnectedError()
@@ -0,0 +1,81 @@
+"""
+ASGI middleware.
+Following Single Responsibility Principle - handles only cross-cutting request setup.
+"""
+
+import math
+import time
+import uuid
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.config import settings
+from ..utils.request_context import RequestOptions, set_request_options
+
+# Longest client-supplied request ID that is accepted as-is
+MAX_REQUEST_ID_LENGTH = 128
+
+
+def _request_deadline(headers: Dict[bytes, bytes]) -> Optional[float]:
+    """
+    Turn ``X-Request-Timeout`` (seconds the client will wait) into a monotonic deadline.
+
+    Falls back to REQUEST_TIMEOUT when the header is missing or invalid, and
+    is capped at REQUEST_MAX_TIMEOUT.
+
+    Returns:
+        time.monotonic() deadline, or None without one
+    """
+    try:
+        timeout = float(headers.get(b"x-request-timeout", b"").decode("latin-1"))
+    except ValueError:
+        timeout = settings.request_timeout
+    if not math.isfinite(timeout) or timeout <= 0:
+        timeout = settings.request_timeout
+    if timeout <= 0:
+        return None
+    return time.monotonic() + min(timeout, settings.request_max_timeout)
+
+
+class RequestContextMiddleware:
+    """
+    Populate request options from HTTP headers.
+
+    ``Cache-Control: no-cache`` (or ``no-store``) skips the response cache
+    for that request. ``X-Request-ID`` is reused when present (otherwise one
+    is generated), attached to every log record of the request and echoed
+    in the response headers. ``X-Request-Timeout`` sets the HTTP request's
+    deadline.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        cache_control = headers.get(b"cache-control", b"").decode("latin-1").lower()
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1").strip()
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH:
+            request_id = uuid.uuid4().hex
+
+        set_request_options(RequestOptions(
+            bypass_cache="no-cache" in cache_control or "no-store" in cache_control,
+            request_id=request_id,
+            route=scope.get("path", ""),
+            deadline=_request_deadline(headers) if scope["type"] == "http" else None
+        ))
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
@@ -3,40 +3,237 @@ Chat endpoints.
 Following Single Responsibility Principle - handles only chat-related routes.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Optional
+import asyncio
+import time
+from dataclasses import dataclass
 
-from ...models.schemas import ChatRequest, ChatResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from typing import Dict, List, Optional
+
+from ...core.config import settings
+from ...models.attachment import AttachmentContent
+from ...models.schemas import (
+    BatchChatItem,
+    BatchChatRequest,
+    BatchChatResponse,
+    BatchChatResult,
+    ChatRequest,
+    ChatResponse,
+)
+from ..disconnect import run_until_disconnect
+from ...services.attachments import AttachmentFetcher
+from ...services.factory import ChatComponents
+from ...services.idempotency import (
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    IdempotencyGuard,
+    build_idempotency_key,
+    build_request_fingerprint,
+)
 from ...services.interfaces import ChatServiceInterface, LanguageServiceInterface
-from ...services.gemini_service import GeminiChatService
 from ...services.language_service import LanguageService
-from ...utils.exceptions import handle_service_error, log_request_error
+from ...utils import metrics
+from ...utils.exceptions import ClientDisconnectedError, handle_service_error, log_request_error
+from ...utils.logging import log_request_success
+from ...utils.request_context import get_request_options
 
 # Create router
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 # Dependency injection functions
-def get_chat_service() -> ChatServiceInterface:
-    """Dependency injection for chat service."""
-    return GeminiChatService()
+async def get_components(http_request: Request) -> ChatComponents:
+    """Dependency injection for the worker's chat components, waiting for warm-up if needed."""
+    if not await http_request.app.state.startup.wait(settings.startup_wait_timeout):
+        raise HTTPException(
+            status_code=503,
+            detail={"message": "Service is starting, retry shortly", "type": "service_starting"},
+            headers={"Retry-After": "1"}
+        )
+    return http_request.app.state.components
+
+def get_chat_service(components: ChatComponents = Depends(get_components)) -> ChatServiceInterface:
+    """Dependency injection for chat service (shared per worker, built during warm-up)."""
+    return components.chat_service
+
+def get_attachment_fetcher(components: ChatComponents = Depends(get_components)) -> Optional[AttachmentFetcher]:
+    """Dependency injection for the attachment fetcher (shared per worker)."""
+    return components.attachment_fetcher
 
 def get_language_service() -> LanguageServiceInterface:
     """Dependency injection for language service."""
     return LanguageService()
 
 
+@dataclass
+class IdempotencyScope:
+    """Idempotency handling for one HTTP request."""
+    guard: IdempotencyGuard
+    # Idempotency-Key header, if sent
+    client_key: Optional[str] = None
+    # Response whose headers mark replays (None inside a batch)
+    response: Optional[Response] = None
+
+def get_idempotency(
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    components: ChatComponents = Depends(get_components)
+) -> Optional[IdempotencyScope]:
+    """Dependency injection for idempotent request handling (None when disabled)."""
+    if components.idempotency is None:
+        return None
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters",
+                "type": "invalid_idempotency_key"
+            }
+        )
+    return IdempotencyScope(components.idempotency, idempotency_key, response)
+
+
+def route_label(http_request: Request) -> str:
+    """
+    Get the matched route template (e.g. ``/chat/english``) for metrics labels.
+    
+    Args:
+        http_request: Incoming request
+        
+    Returns:
+        The route's path template, or the request path if no route matched
+    """
+    route = http_request.scope.get("route")
+    return getattr(route, "path", None) or http_request.url.path
+
+
+def build_context(request: ChatRequest) -> Optional[Dict]:
+    """
+    Build the service context from the request context and GPS location.
+    
+    Args:
+        request: Chat request
+        
+    Returns:
+        Context dictionary, or None if the request has neither
+    """
+    context = request.context.dict() if request.context else {}
+    location = request.location
+    if location and location.latitude is not None and location.longitude is not None:
+        context["location"] = {"latitude": location.latitude, "longitude": location.longitude}
+    return context or None
+
+
+async def fetch_attachments(
+    request: ChatRequest,
+    language: str,
+    chat_service: ChatServiceInterface,
+    attachment_fetcher: Optional[AttachmentFetcher]
+) -> Optional[List[AttachmentContent]]:
+    """
+    Fetch a request's attachments once it is within its rate limit and quota.
+    
+    Args:
+        request: Chat request
+        language: Target language
+        chat_service: Chat service that will generate the response
+        attachment_fetcher: Fetcher for request attachments (attachments are ignored if None)
+        
+    Returns:
+        Fetched attachments, or None without a fetcher
+    """
+    if attachment_fetcher is None:
+        return None
+    if request.attachments:
+        # Refuse over-limit requests before downloading anything for them
+        chat_service.admit(request.message, language, request.user_id)
+    return await attachment_fetcher.fetch_all(request.attachments)
+
+
 async def _process_chat_request(
     request: ChatRequest,
     language: str,
-    chat_service: ChatServiceInterface
+    chat_service: ChatServiceInterface,
+    attachment_fetcher: Optional[AttachmentFetcher],
+    route: str,
+    idempotency: Optional[IdempotencyScope] = None,
+    http_request: Optional[Request] = None
 ) -> ChatResponse:
     """
     Common chat processing logic.
     
+    Retries of a request (same Idempotency-Key, or same user, message and
+    client timestamp) attach to its in-flight execution or get its stored
+    response back, marked with ``Idempotent-Replayed: true``. If the client
+    disconnects first, the work is cancelled.
+    
+    Args:
+        request: Chat request
+        language: Target language
+        chat_service: Chat service instance
+        attachment_fetcher: Fetcher for request attachments (attachments are ignored if None)
+        route: Route label for metrics
+        idempotency: Idempotency handling (every request runs if None)
+        http_request: Request whose connection is watched for a disconnect (not watched if None)
+        
+    Returns:
+        Chat response
+        
+    Raises:
+        HTTPException: If processing fails
+    """
+    if http_request is not None:
+        try:
+            return await run_until_disconnect(
+                http_request,
+                _process_chat_request(request, language, chat_service, attachment_fetcher, route, idempotency),
+                route
+            )
+        except ClientDisconnectedError as e:
+            log_request_error(f"/chat/{language}", request.user_id, e, language)
+            raise handle_service_error(e, request.user_id)
+    
+    async def generate() -> ChatResponse:
+        return await _generate_chat_response(request, language, chat_service, attachment_fetcher, route)
+    
+    key = None
+    if idempotency is not None:
+        key = build_idempotency_key(
+            get_request_options().route, request, language, idempotency.client_key,
+            derive=idempotency.guard.derived_ttl > 0
+        )
+    if key is None:
+        return await generate()
+    
+    fingerprint = build_request_fingerprint(request, language) if idempotency.client_key else None
+    ttl = None if idempotency.client_key else idempotency.guard.derived_ttl
+    try:
+        response, replayed = await idempotency.guard.run(key, fingerprint, generate, ttl)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_request_error(f"/chat/{language}", request.user_id, e, language)
+        raise handle_service_error(e, request.user_id)
+    
+    if replayed and idempotency.response is not None:
+        idempotency.response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+async def _generate_chat_response(
+    request: ChatRequest,
+    language: str,
+    chat_service: ChatServiceInterface,
+    attachment_fetcher: Optional[AttachmentFetcher],
+    route: str
+) -> ChatResponse:
+    """
+    Generate a chat response through the chat service.
+    
     Args:
         request: Chat request
         language: Target language
         chat_service: Chat service instance
+        attachment_fetcher: Fetcher for request attachments (attachments are ignored if None)
+        route: Route label for metrics
         
     Returns:
         Chat response
@@ -44,16 +241,22 @@ async def _process_chat_request(
     Raises:
         HTTPException: If processing fails
     """
+    started = time.perf_counter()
+    in_flight = metrics.REQUESTS_IN_FLIGHT.labels(route)
+    in_flight.inc()
     try:
-        context_dict = request.context.dict() if request.context else None
+        context_dict = build_context(request)
+        attachments = await fetch_attachments(request, language, chat_service, attachment_fetcher)
         
-        response_text = chat_service.generate_response(
+        response_text = await chat_service.generate_response_async(
             message=request.message,
             language=language,
             context=context_dict,
-            user_id=request.user_id
+            user_id=request.user_id,
+            attachments=attachments
         )
         
+        log_request_success(f"/chat/{language}", request.user_id, language, time.perf_counter() - started)
         return ChatResponse.create(
             response=response_text,
             language=language,
@@ -61,73 +264,180 @@ async def _process_chat_request(
         )
         
     except Exception as e:
-        log_request_error(f"/chat/{language}", request.user_id, e)
+        log_request_error(
+            f"/chat/{language}", request.user_id, e, language, time.perf_counter() - started
+        )
         raise handle_service_error(e, request.user_id)
+        
+    finally:
+        in_flight.dec()
+        metrics.observe_request(route, language, time.perf_counter() - started)
 
 
 @router.post("/", response_model=ChatResponse)
 async def chat_auto_route(
     request: ChatRequest,
+    http_request: Request,
     chat_service: ChatServiceInterface = Depends(get_chat_service),
-    language_service: LanguageServiceInterface = Depends(get_language_service)
+    language_service: LanguageServiceInterface = Depends(get_language_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
 ):
-    """Auto-route chat endpoint based on language in context."""
+    """Auto-route chat endpoint based on language in context, or detected from the message."""
     language = language_service.normalize_language(
-        request.context.language if request.context else None
+        request.context.language if request.context else None,
+        request.message
     )
     
-    return await _process_chat_request(request, language, chat_service)
+    return await _process_chat_request(
+        request, language, chat_service, attachment_fetcher, route_label(http_request),
+        idempotency=idempotency, http_request=http_request
+    )
+
+
+@router.post("/batch", response_model=BatchChatResponse)
+async def chat_batch(
+    batch: BatchChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    language_service: LanguageServiceInterface = Depends(get_language_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
+):
+    """
+    Process several chat requests concurrently.
+    
+    Each item uses its own ``language`` (or its context language). Items run
+    under a concurrency limit and results are returned in request order,
+    with per-item errors instead of failing the whole batch. Retried items
+    are deduplicated on their user, message and timestamp; an
+    Idempotency-Key header is not applied to a whole batch. Every item is
+    cancelled if the client disconnects.
+    """
+    if len(batch.requests) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": f"Batch exceeds the limit of {settings.batch_max_items} requests",
+                "type": "batch_too_large"
+            }
+        )
+    
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+    item_idempotency = IdempotencyScope(idempotency.guard) if idempotency is not None else None
+    
+    async def process_item(index: int, item: BatchChatItem) -> BatchChatResult:
+        language = language_service.normalize_language(
+            item.language or (item.context.language if item.context else None),
+            item.message
+        )
+        async with semaphore:
+            try:
+                response = await _process_chat_request(
+                    item, language, chat_service, attachment_fetcher, "/chat/batch",
+                    idempotency=item_idempotency
+                )
+                return BatchChatResult(index=index, response=response)
+            except HTTPException as e:
+                return BatchChatResult(index=index, error=e.detail)
+    
+    try:
+        results = await run_until_disconnect(
+            http_request,
+            asyncio.gather(*(process_item(index, item) for index, item in enumerate(batch.requests))),
+            "/chat/batch"
+        )
+    except ClientDisconnectedError as e:
+        log_request_error("/chat/batch", "", e)
+        raise handle_service_error(e)
+    return BatchChatResponse(results=list(results))
 
 
 @router.post("/english", response_model=ChatResponse)
 async def chat_english(
     request: ChatRequest,
-    chat_service: ChatServiceInterface = Depends(get_chat_service)
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
 ):
     """English chat endpoint."""
-    return await _process_chat_request(request, "english", chat_service)
+    return await _process_chat_request(
+        request, "english", chat_service, attachment_fetcher, route_label(http_request),
+        idempotency=idempotency, http_request=http_request
+    )
 
 
 @router.post("/urdu", response_model=ChatResponse)
 async def chat_urdu(
     request: ChatRequest,
-    chat_service: ChatServiceInterface = Depends(get_chat_service)
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
 ):
     """Urdu chat endpoint."""
-    return await _process_chat_request(request, "urdu", chat_service)
+    return await _process_chat_request(
+        request, "urdu", chat_service, attachment_fetcher, route_label(http_request),
+        idempotency=idempotency, http_request=http_request
+    )
 
 
 @router.post("/punjabi", response_model=ChatResponse)
 async def chat_punjabi(
     request: ChatRequest,
-    chat_service: ChatServiceInterface = Depends(get_chat_service)
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
 ):
     """Punjabi chat endpoint."""
-    return await _process_chat_request(request, "punjabi", chat_service)
+    return await _process_chat_request(
+        request, "punjabi", chat_service, attachment_fetcher, route_label(http_request),
+        idempotency=idempotency, http_request=http_request
+    )
 
 
 @router.post("/balochi", response_model=ChatResponse)
 async def chat_balochi(
     request: ChatRequest,
-    chat_service: ChatServiceInterface = Depends(get_chat_service)
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
 ):
     """Balochi chat endpoint."""
-    return await _process_chat_request(request, "balochi", chat_service)
+    return await _process_chat_request(
+        request, "balochi", chat_service, attachment_fetcher, route_label(http_request),
+        idempotency=idempotency, http_request=http_request
+    )
 
 
 @router.post("/saraiki", response_model=ChatResponse)
 async def chat_saraiki(
     request: ChatRequest,
-    chat_service: ChatServiceInterface = Depends(get_chat_service)
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
 ):
     """Saraiki chat endpoint."""
-    return await _process_chat_request(request, "saraiki", chat_service)
+    return await _process_chat_request(
+        request, "saraiki", chat_service, attachment_fetcher, route_label(http_request),
+        idempotency=idempotency, http_request=http_request
+    )
 
 
 @router.post("/pushto", response_model=ChatResponse)
 async def chat_pushto(
     request: ChatRequest,
-    chat_service: ChatServiceInterface = Depends(get_chat_service)
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher),
+    idempotency: Optional[IdempotencyScope] = Depends(get_idempotency)
 ):
     """Pushto chat endpoint."""
-    return await _process_chat_request(request, "pushto", chat_service)
+    return await _process_chat_request(
+        request, "pushto", chat_service, attachment_fetcher, route_label(http_request),
+        idempotency=idempotency, http_request=http_request
+    )
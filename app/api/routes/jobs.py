@@ -0,0 +1,88 @@
+"""
+Asynchronous chat job endpoints.
+Following Single Responsibility Principle - handles only submitting and polling background chat jobs.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from ...core.config import settings
+from ...models.schemas import ChatJobRequest, ChatJobResponse
+from ...services.factory import ChatComponents
+from ...services.interfaces import LanguageServiceInterface
+from ...services.jobs import JobManager
+from ...utils.exceptions import handle_service_error, log_request_error
+from ...utils.request_context import get_request_options
+from .chat import build_context, get_components, get_language_service
+
+# Create router
+router = APIRouter(prefix="/chat/jobs", tags=["chat"])
+
+# Route label for metrics and logs
+ROUTE = "/chat/jobs"
+
+
+def get_job_manager(components: ChatComponents = Depends(get_components)) -> JobManager:
+    """Dependency injection for the worker's job manager."""
+    if components.jobs is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Asynchronous jobs are disabled", "type": "jobs_disabled"}
+        )
+    return components.jobs
+
+
+@router.post("", response_model=ChatJobResponse, status_code=202)
+async def submit_chat_job(
+    request: ChatJobRequest,
+    response: Response,
+    jobs: JobManager = Depends(get_job_manager),
+    language_service: LanguageServiceInterface = Depends(get_language_service)
+):
+    """
+    Queue a chat request and return its job ID immediately.
+
+    Poll ``GET /chat/jobs/{job_id}`` for the result, or pass ``webhook_url``
+    to have the finished job POSTed there.
+    """
+    language = language_service.normalize_language(
+        request.language or (request.context.language if request.context else None),
+        request.message
+    )
+
+    if request.webhook_url:
+        try:
+            await jobs.check_webhook_url(request.webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail={"message": str(e), "type": "invalid_webhook"})
+
+    try:
+        record = jobs.submit(
+            request,
+            language,
+            context=build_context(request),
+            webhook_url=request.webhook_url,
+            options=get_request_options()
+        )
+    except Exception as e:
+        log_request_error(ROUTE, request.user_id, e, language)
+        raise handle_service_error(e, request.user_id)
+
+    response.headers["Location"] = f"{ROUTE}/{record['job_id']}"
+    return record
+
+
+@router.get("/{job_id}", response_model=ChatJobResponse)
+async def get_chat_job(
+    job_id: str,
+    wait: float = Query(0.0, ge=0.0, description="Seconds to wait for the job to finish before answering"),
+    jobs: JobManager = Depends(get_job_manager)
+):
+    """Get a job's status and, once it has finished, its response or error."""
+    wait = min(wait, settings.job_max_wait)
+    record = await jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Job not found or expired", "type": "job_not_found"}
+        )
+    return record
@@ -0,0 +1,260 @@
+"""
+Streaming chat endpoints.
+Following Single Responsibility Principle - handles only Server-Sent Events chat routes.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import anyio
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from ...models.schemas import ChatRequest, ChatResponse
+from ...services.attachments import AttachmentFetcher
+from ...services.interfaces import ChatServiceInterface, LanguageServiceInterface
+from ...utils import metrics
+from ...utils.exceptions import handle_service_error, log_request_error
+from ...utils.logging import log_request_success
+from ..disconnect import run_until_disconnect
+from .chat import (
+    build_context,
+    fetch_attachments,
+    get_attachment_fetcher,
+    get_chat_service,
+    get_language_service,
+)
+
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/chat/stream", tags=["chat"])
+
+# Route label for metrics
+ROUTE = "/chat/stream"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_chat_events(
+    request: ChatRequest,
+    language: str,
+    chunks: AsyncIterator[str],
+    first_chunk: Optional[str],
+    started: float
+) -> AsyncIterator[str]:
+    """
+    Forward response chunks as SSE frames.
+
+    Emits one ``chunk`` event per upstream chunk, then a ``done`` event with
+    the same fields as ChatResponse, or an ``error`` event if generation
+    fails after streaming has started. If the client disconnects, the
+    response is cancelled here and the upstream stream closed with it.
+    """
+    collected = []
+
+    try:
+        if first_chunk is not None:
+            collected.append(first_chunk)
+            yield _format_sse("chunk", {"text": first_chunk})
+
+            async for text in chunks:
+                collected.append(text)
+                yield _format_sse("chunk", {"text": text})
+
+        final = ChatResponse.create(
+            response="".join(collected).strip(),
+            language=language,
+            user_id=request.user_id
+        )
+        yield _format_sse("done", final.dict())
+        log_request_success(
+            f"/chat/stream/{language}", request.user_id, language, time.perf_counter() - started,
+            chunks=len(collected)
+        )
+
+    except Exception as e:
+        log_request_error(
+            f"/chat/stream/{language}", request.user_id, e, language, time.perf_counter() - started
+        )
+        http_error = handle_service_error(e, request.user_id)
+        yield _format_sse("error", http_error.detail)
+
+    except asyncio.CancelledError:
+        metrics.REQUESTS_CANCELLED.labels(ROUTE, "disconnect").inc()
+        raise
+
+    finally:
+        # Shielded so the upstream stream is closed even while being cancelled
+        with anyio.CancelScope(shield=True):
+            await chunks.aclose()
+        metrics.REQUESTS_IN_FLIGHT.labels(ROUTE).dec()
+        metrics.observe_request(ROUTE, language, time.perf_counter() - started)
+
+
+async def _stream_chat_request(
+    request: ChatRequest,
+    language: str,
+    chat_service: ChatServiceInterface,
+    attachment_fetcher: Optional[AttachmentFetcher] = None,
+    http_request: Optional[Request] = None
+) -> StreamingResponse:
+    """
+    Common streaming chat logic.
+
+    Waits for the first chunk before sending headers, so failures before
+    any output (rate limits, overload, upstream errors) return a proper
+    HTTP status instead of an in-stream error event.
+
+    Args:
+        request: Chat request
+        language: Target language
+        chat_service: Chat service instance
+        attachment_fetcher: Fetcher for request attachments (attachments are ignored if None)
+        http_request: Incoming request, watched for a client disconnect before the first chunk
+
+    Returns:
+        Streaming response of Server-Sent Events
+
+    Raises:
+        HTTPException: If generation fails before the first chunk
+    """
+    started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.labels(ROUTE).inc()
+    chunks: Optional[AsyncIterator[str]] = None
+    try:
+        context_dict = build_context(request)
+        attachments = await fetch_attachments(request, language, chat_service, attachment_fetcher)
+        chunks = chat_service.stream_response(
+            message=request.message,
+            language=language,
+            context=context_dict,
+            user_id=request.user_id,
+            attachments=attachments
+        )
+        if http_request is not None:
+            first_chunk = await run_until_disconnect(http_request, chunks.__anext__(), ROUTE)
+        else:
+            first_chunk = await chunks.__anext__()
+        time_to_first_token = time.perf_counter() - started
+        metrics.STREAM_FIRST_TOKEN.labels(language).observe(time_to_first_token)
+        logger.debug(
+            "Time to first token: %.1f ms",
+            time_to_first_token * 1000,
+            extra={
+                "user_id": request.user_id,
+                "language": language,
+                "latency_ms": round(time_to_first_token * 1000, 1)
+            }
+        )
+    except StopAsyncIteration:
+        first_chunk = None
+    except Exception as e:
+        if chunks is not None:
+            await chunks.aclose()
+        metrics.REQUESTS_IN_FLIGHT.labels(ROUTE).dec()
+        metrics.observe_request(ROUTE, language, time.perf_counter() - started)
+        log_request_error(
+            f"/chat/stream/{language}", request.user_id, e, language, time.perf_counter() - started
+        )
+        raise handle_service_error(e, request.user_id)
+
+    return StreamingResponse(
+        _stream_chat_events(request, language, chunks, first_chunk, started),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.post("")
+async def stream_auto_route(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    language_service: LanguageServiceInterface = Depends(get_language_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher)
+):
+    """Auto-route streaming chat endpoint based on language in context, or detected from the message."""
+    language = language_service.normalize_language(
+        request.context.language if request.context else None,
+        request.message
+    )
+
+    return await _stream_chat_request(request, language, chat_service, attachment_fetcher, http_request)
+
+
+@router.post("/english")
+async def stream_english(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher)
+):
+    """English streaming chat endpoint."""
+    return await _stream_chat_request(request, "english", chat_service, attachment_fetcher, http_request)
+
+
+@router.post("/urdu")
+async def stream_urdu(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher)
+):
+    """Urdu streaming chat endpoint."""
+    return await _stream_chat_request(request, "urdu", chat_service, attachment_fetcher, http_request)
+
+
+@router.post("/punjabi")
+async def stream_punjabi(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher)
+):
+    """Punjabi streaming chat endpoint."""
+    return await _stream_chat_request(request, "punjabi", chat_service, attachment_fetcher, http_request)
+
+
+@router.post("/balochi")
+async def stream_balochi(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher)
+):
+    """Balochi streaming chat endpoint."""
+    return await _stream_chat_request(request, "balochi", chat_service, attachment_fetcher, http_request)
+
+
+@router.post("/saraiki")
+async def stream_saraiki(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher)
+):
+    """Saraiki streaming chat endpoint."""
+    return await _stream_chat_request(request, "saraiki", chat_service, attachment_fetcher, http_request)
+
+
+@router.post("/pushto")
+async def stream_pushto(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatServiceInterface = Depends(get_chat_service),
+    attachment_fetcher: Optional[AttachmentFetcher] = Depends(get_attachment_fetcher)
+):
+    """Pushto streaming chat endpoint."""
+    return await _stream_chat_request(request, "pushto", chat_service, attachment_fetcher, http_request)
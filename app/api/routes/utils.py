@@ -3,12 +3,25 @@ Utility endpoints.
 Following Single Responsibility Principle - handles only utility routes.
 """
 
-from fastapi import APIRouter, Depends
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-from ...models.schemas import HealthResponse, LanguagesResponse
+from ...core.config import settings
+from ...models.schemas import (
+    HealthResponse,
+    LanguagesResponse,
+    ReadinessResponse,
+    TokenUsageResponse,
+    UserTokenUsage,
+)
+from ...services.budget import TokenBudget, TokenUsage
+from ...services.gemini_client import gemini_client_manager
 from ...services.interfaces import LanguageServiceInterface
 from ...services.language_service import LanguageService
+from ...utils.metrics import registry
 
 # Create router
 router = APIRouter(tags=["utilities"])
@@ -21,13 +34,34 @@ def get_language_service() -> LanguageServiceInterface:
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint."""
+    """Liveness endpoint: answers as soon as the worker accepts connections."""
     return HealthResponse(
         status="healthy",
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        gemini_pool=gemini_client_manager.pool_stats()
     )
 
 
+@router.get("/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check(http_request: Request):
+    """Readiness endpoint: 200 once the worker has finished warm-up, 503 before or if it failed."""
+    startup = getattr(http_request.app.state, "startup", None)
+    if startup is not None and startup.is_ready:
+        status = "ready"
+    elif startup is not None and startup.error:
+        status = "failed"
+    else:
+        status = "starting"
+    
+    body = ReadinessResponse(
+        status=status,
+        timestamp=datetime.now().isoformat(),
+        startup=startup.phases if startup is not None else {},
+        error=startup.error if startup is not None else None
+    )
+    return JSONResponse(status_code=200 if status == "ready" else 503, content=body.dict())
+
+
 @router.get("/languages", response_model=LanguagesResponse)
 async def get_supported_languages(
     language_service: LanguageServiceInterface = Depends(get_language_service)
@@ -37,3 +71,82 @@ async def get_supported_languages(
         supported_languages=language_service.get_supported_languages(),
         default_language=language_service.get_default_language()
     )
+
+
+@router.get("/stats")
+async def get_stats(http_request: Request) -> Dict[str, Any]:
+    """Get runtime statistics for worker-scoped components."""
+    stats: Dict[str, Any] = {"gemini_pool": gemini_client_manager.pool_stats()}
+    
+    components = getattr(http_request.app.state, "components", None)
+    if components is not None:
+        stats.update(components.stats())
+    
+    return stats
+
+
+def require_usage_admin(authorization: Optional[str] = Header(None)) -> None:
+    """Only let callers with ``Authorization: Bearer <USAGE_ADMIN_TOKEN>`` read token usage."""
+    if settings.usage_admin_token is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Usage endpoints are disabled", "type": "usage_disabled"}
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.strip().encode("utf-8"), settings.usage_admin_token.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail={"message": "Admin token required", "type": "unauthorized"},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def get_token_budget(http_request: Request) -> TokenBudget:
+    """Dependency injection for the worker's token budget, when usage is tracked."""
+    components = getattr(http_request.app.state, "components", None)
+    token_budget = components.token_budget if components is not None else None
+    if token_budget is None or token_budget.ledger is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Token usage is not tracked", "type": "usage_not_tracked"}
+        )
+    return token_budget
+
+
+def _usage_response(token_budget: TokenBudget, users: List[Tuple[str, TokenUsage]]) -> TokenUsageResponse:
+    return TokenUsageResponse(
+        window_seconds=token_budget.ledger.window,
+        quota=token_budget.quota or None,
+        users=[
+            UserTokenUsage(user_id=user_id, remaining=token_budget.remaining(usage), **usage.to_dict())
+            for user_id, usage in users
+        ]
+    )
+
+
+@router.get("/usage", response_model=TokenUsageResponse, dependencies=[Depends(require_usage_admin)])
+async def get_top_usage(
+    limit: int = Query(10, ge=1, le=1000),
+    token_budget: TokenBudget = Depends(get_token_budget)
+):
+    """Heaviest users by tokens within the quota window."""
+    return _usage_response(token_budget, token_budget.ledger.top_users(limit))
+
+
+@router.get(
+    "/usage/{user_id}", response_model=TokenUsageResponse, dependencies=[Depends(require_usage_admin)]
+)
+async def get_user_usage(user_id: str, token_budget: TokenBudget = Depends(get_token_budget)):
+    """One user's tokens within the quota window."""
+    return _usage_response(token_budget, [(user_id, token_budget.ledger.usage(user_id))])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics in text exposition format."""
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,257 @@
+"""
+WebSocket chat endpoint.
+Following Single Responsibility Principle - handles only the persistent chat channel and its framing.
+
+Protocol (JSON text frames):
+
+Client to server
+    {"type": "hello", "language": "urdu", "session_id": null, "last_seq": 0}
+        First frame. Omit ``language`` to detect it from the first message.
+        To resume after a reconnect, send the ``session_id`` from the
+        welcome frame and the last ``seq`` received.
+    {"type": "chat", "id": "m1", "request": {<ChatRequest>}}
+        Several messages may be in flight at once; every event carries the
+        message ``id``.
+    {"type": "cancel", "id": "m1"}
+    {"type": "ping"} / {"type": "pong"}
+
+Server to client
+    {"type": "welcome", "session_id", "language", "resumed", "seq", "heartbeat_interval"}
+    {"type": "chunk", "id", "seq", "text"}
+    {"type": "done", "id", "seq", "response": {<ChatResponse>}}
+    {"type": "error", "id", "seq", "error": {"message", "type", ...}}
+    {"type": "cancelled", "id", "seq"}
+    {"type": "ping"} / {"type": "pong"}
+
+Message events are numbered by ``seq`` and replayed on resume. Protocol
+errors (bad frames) have no ``seq`` and are not replayed.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from ...core.config import settings
+from ...models.schemas import ChatRequest, ChatResponse, WebSocketChatMessage, WebSocketHello
+from ...services.attachments import AttachmentFetcher
+from ...services.factory import ChatComponents
+from ...services.interfaces import ChatServiceInterface, LanguageServiceInterface
+from ...services.sessions import ChatSession
+from ...utils import metrics
+from ...utils.exceptions import handle_service_error, log_request_error
+from ...utils.logging import log_request_success
+from .chat import build_context, fetch_attachments, get_language_service
+
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/chat", tags=["chat"])
+
+# Route label for metrics
+ROUTE = "/chat/ws"
+
+# Close codes (RFC 6455)
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+CLOSE_GOING_AWAY = 1001
+
+
+def _protocol_error(message: str, error_type: str, message_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build an error frame for a bad client frame (not numbered, not replayed)."""
+    frame: Dict[str, Any] = {"type": "error", "error": {"message": message, "type": error_type}}
+    if message_id is not None:
+        frame["id"] = message_id
+    return frame
+
+
+async def _stream_message(
+    session: ChatSession,
+    message_id: str,
+    request: ChatRequest,
+    language: str,
+    chat_service: ChatServiceInterface,
+    attachment_fetcher: Optional[AttachmentFetcher]
+) -> None:
+    """
+    Generate one message's response and emit it as session events.
+
+    Emits a ``chunk`` event per upstream chunk, then ``done`` with the
+    ChatResponse fields, or ``error``.
+    """
+    started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.labels(ROUTE).inc()
+    chunks = None
+    collected = []
+    try:
+        context_dict = build_context(request)
+        attachments = await fetch_attachments(request, language, chat_service, attachment_fetcher)
+        chunks = chat_service.stream_response(
+            message=request.message,
+            language=language,
+            context=context_dict,
+            user_id=request.user_id,
+            attachments=attachments
+        )
+        async for text in chunks:
+            if not collected:
+                metrics.STREAM_FIRST_TOKEN.labels(language).observe(time.perf_counter() - started)
+            collected.append(text)
+            await session.emit({"type": "chunk", "id": message_id, "text": text})
+
+        final = ChatResponse.create(
+            response="".join(collected).strip(),
+            language=language,
+            user_id=request.user_id
+        )
+        await session.emit({"type": "done", "id": message_id, "response": final.dict()})
+        log_request_success(
+            ROUTE, request.user_id, language, time.perf_counter() - started, chunks=len(collected)
+        )
+
+    except Exception as e:
+        log_request_error(ROUTE, request.user_id, e, language, time.perf_counter() - started)
+        http_error = handle_service_error(e, request.user_id)
+        await session.emit({"type": "error", "id": message_id, "error": http_error.detail})
+
+    finally:
+        if chunks is not None:
+            await chunks.aclose()
+        metrics.REQUESTS_IN_FLIGHT.labels(ROUTE).dec()
+        metrics.observe_request(ROUTE, language, time.perf_counter() - started)
+
+
+async def _receive_frame(websocket: WebSocket) -> Optional[Dict[str, Any]]:
+    """Receive one JSON object frame, or None if the frame is not one."""
+    text = await websocket.receive_text()
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        return None
+    return frame if isinstance(frame, dict) else None
+
+
+@router.websocket("/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    language_service: LanguageServiceInterface = Depends(get_language_service)
+):
+    """Persistent chat channel: one session, many multiplexed, streamed messages."""
+    await websocket.accept()
+    if not await websocket.app.state.startup.wait(settings.startup_wait_timeout):
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason="Service is starting")
+        return
+    components: ChatComponents = websocket.app.state.components
+    sessions = components.sessions
+
+    send_lock = asyncio.Lock()
+    last_received = time.monotonic()
+
+    async def send(frame: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_json(frame)
+
+    # Negotiate the session
+    try:
+        frame = await asyncio.wait_for(_receive_frame(websocket), settings.ws_idle_timeout)
+        if frame is None or frame.get("type") != "hello":
+            raise ValueError("first frame must be a hello")
+        hello = WebSocketHello(**{key: value for key, value in frame.items() if key != "type"})
+    except (asyncio.TimeoutError, ValueError, ValidationError, TypeError) as e:
+        await send(_protocol_error(f"Invalid hello: {e}", "invalid_hello"))
+        await websocket.close(code=CLOSE_POLICY_VIOLATION)
+        return
+    except WebSocketDisconnect:
+        return
+
+    resumed = sessions.resume(hello.session_id, hello.last_seq) if hello.session_id else None
+    if resumed is not None:
+        session, missed = resumed
+    else:
+        language = language_service.normalize_language(hello.language) if hello.language else None
+        session, missed = sessions.create(language), []
+
+    # Attach before replaying: events emitted meanwhile queue behind the replay on the lock
+    async with send_lock:
+        session.attach(send)
+        await websocket.send_json({
+            "type": "welcome",
+            "session_id": session.session_id,
+            "language": session.language,
+            "resumed": resumed is not None,
+            "seq": session.next_seq - 1,
+            "heartbeat_interval": settings.ws_heartbeat_interval,
+        })
+        for event in missed:
+            await websocket.send_json(event)
+
+    async def heartbeat() -> None:
+        while True:
+            await asyncio.sleep(settings.ws_heartbeat_interval)
+            if time.monotonic() - last_received > settings.ws_idle_timeout:
+                logger.info("Closing idle WebSocket", extra={"session_id": session.session_id})
+                await websocket.close(code=CLOSE_GOING_AWAY, reason="Idle timeout")
+                return
+            await send({"type": "ping"})
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        while True:
+            frame = await _receive_frame(websocket)
+            last_received = time.monotonic()
+            if frame is None:
+                await send(_protocol_error("Frames must be JSON objects", "invalid_frame"))
+                continue
+
+            frame_type = frame.get("type")
+            if frame_type == "ping":
+                await send({"type": "pong"})
+            elif frame_type == "pong":
+                pass
+            elif frame_type == "cancel":
+                message_id = str(frame.get("id"))
+                if session.cancel(message_id):
+                    await session.emit({"type": "cancelled", "id": message_id})
+            elif frame_type == "chat":
+                try:
+                    message = WebSocketChatMessage(**{key: value for key, value in frame.items() if key != "type"})
+                except (ValidationError, TypeError) as e:
+                    await send(_protocol_error(f"Invalid chat frame: {e}", "invalid_request", frame.get("id")))
+                    continue
+                if message.id in session.tasks:
+                    await send(_protocol_error("Message id already in flight", "duplicate_id", message.id))
+                    continue
+                if len(session.tasks) >= settings.ws_max_in_flight:
+                    await send(_protocol_error(
+                        f"At most {settings.ws_max_in_flight} messages may be in flight", "too_many_in_flight",
+                        message.id
+                    ))
+                    continue
+
+                request = message.request
+                if session.language is None:
+                    session.language = language_service.normalize_language(
+                        request.context.language if request.context else None,
+                        request.message
+                    )
+                session.start(
+                    message.id,
+                    _stream_message(
+                        session, message.id, request, session.language,
+                        components.chat_service, components.attachment_fetcher
+                    )
+                )
+            else:
+                await send(_protocol_error(f"Unknown frame type {frame_type!r}", "invalid_frame"))
+    except WebSocketDisconnect:
+        pass
+    except RuntimeError:
+        # Raised when receiving after the heartbeat closed the socket
+        pass
+    finally:
+        heartbeat_task.cancel()
+        sessions.detach(session, send)
@@ -4,11 +4,25 @@ Following Single Responsibility Principle - handles only configuration.
 """
 
 import os
+from functools import lru_cache
+from pathlib import Path
 from dotenv import load_dotenv
-from typing import Dict
+from typing import Any, Dict
 
-# Load environment variables
-load_dotenv()
+
+def _parse_token_caps(value: str) -> Dict[str, int]:
+    """
+    Parse comma-separated ``name=tokens`` pairs, e.g. ``urdu=1536,pushto=1536``.
+    
+    Returns:
+        Token cap by name
+    """
+    caps = {}
+    for item in value.split(","):
+        name, _, tokens = item.partition("=")
+        if name.strip() and tokens.strip():
+            caps[name.strip()] = int(tokens)
+    return caps
 
 
 class Settings:
@@ -19,9 +33,200 @@ class Settings:
         self.port = int(os.environ.get("PORT", 8000))
         self.debug = os.environ.get("DEBUG", "false").lower() == "true"
         self.host = os.environ.get("HOST", "0.0.0.0")
+        
+        # Worker processes started by main.py; with more than one, per-user state and
+        # the response cache default to SQLite so every worker shares them
+        self.workers = int(os.environ.get("WORKERS", os.environ.get("WEB_CONCURRENCY", 1)))
+        self.graceful_timeout = float(os.environ.get("GRACEFUL_TIMEOUT", 30.0))
+        shared_backend = "sqlite" if self.workers > 1 else "memory"
+        # Seconds a shared SQLite store waits for another worker's write lock before giving up
+        self.sqlite_busy_timeout = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 0.5))
+        
+        # Seconds a chat request arriving during start-up waits for the worker's warm-up
+        self.startup_wait_timeout = float(os.environ.get("STARTUP_WAIT_TIMEOUT", 30.0))
+        
+        # Request deadlines: clients send X-Request-Timeout (seconds); REQUEST_TIMEOUT applies when
+        # they do not (0 = none). Close to the deadline answers are kept brief; past it work is cancelled
+        self.request_timeout = float(os.environ.get("REQUEST_TIMEOUT", 0.0))
+        self.request_max_timeout = float(os.environ.get("REQUEST_MAX_TIMEOUT", 120.0))
+        self.deadline_brief_below = float(os.environ.get("DEADLINE_BRIEF_BELOW", 8.0))
+        self.deadline_brief_max_tokens = int(os.environ.get("DEADLINE_BRIEF_MAX_TOKENS", 256))
+        self.deadline_min_remaining = float(os.environ.get("DEADLINE_MIN_REMAINING", 0.5))
+        
         self.gemini_model = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
         
-        if not self.gemini_api_key:
+        # Model routing: short, simple messages go to the fast model, the rest to GEMINI_MODEL
+        self.model_router_enabled = os.environ.get("MODEL_ROUTER_ENABLED", "true").lower() == "true"
+        self.gemini_fast_model = os.environ.get("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite")
+        self.router_fast_max_chars = int(os.environ.get("ROUTER_FAST_MAX_CHARS", 160))
+        self.router_first_chunk_timeout = float(os.environ.get("ROUTER_FIRST_CHUNK_TIMEOUT", 10.0))
+        self.router_max_error_rate = float(os.environ.get("ROUTER_MAX_ERROR_RATE", 0.5))
+        self.router_slow_first_chunk = float(os.environ.get("ROUTER_SLOW_FIRST_CHUNK", 6.0))
+        self.router_min_samples = int(os.environ.get("ROUTER_MIN_SAMPLES", 20))
+        self.router_recovery_timeout = float(os.environ.get("ROUTER_RECOVERY_TIMEOUT", 30.0))
+        
+        # Chat backend: "gemini" or "fake" (local simulator for benchmarks, no API key needed)
+        self.chat_backend = os.environ.get("CHAT_BACKEND", "gemini").lower()
+        self.fake_first_chunk_ms = float(os.environ.get("FAKE_FIRST_CHUNK_MS", 400.0))
+        self.fake_latency_sigma = float(os.environ.get("FAKE_LATENCY_SIGMA", 0.5))
+        self.fake_chunk_interval_ms = float(os.environ.get("FAKE_CHUNK_INTERVAL_MS", 40.0))
+        self.fake_chunks = int(os.environ.get("FAKE_CHUNKS", 12))
+        self.fake_error_rate = float(os.environ.get("FAKE_ERROR_RATE", 0.0))
+        
+        # Connection pool for the shared Gemini HTTP client
+        self.gemini_max_connections = int(os.environ.get("GEMINI_MAX_CONNECTIONS", 100))
+        self.gemini_max_keepalive_connections = int(
+            os.environ.get("GEMINI_MAX_KEEPALIVE_CONNECTIONS", 20)
+        )
+        self.gemini_keepalive_expiry = float(os.environ.get("GEMINI_KEEPALIVE_EXPIRY", 30.0))
+        
+        # Gemini cached-content storage of per-language system instructions
+        self.context_cache_enabled = os.environ.get("GEMINI_CONTEXT_CACHE_ENABLED", "false").lower() == "true"
+        self.context_cache_ttl = float(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", 3600.0))
+        self.context_cache_refresh_margin = float(os.environ.get("GEMINI_CONTEXT_CACHE_REFRESH_MARGIN", 300.0))
+        self.context_cache_min_tokens = int(os.environ.get("GEMINI_CONTEXT_CACHE_MIN_TOKENS", 1024))
+        
+        # Response cache for repeated questions
+        self.response_cache_enabled = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+        self.response_cache_max_entries = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+        self.response_cache_max_bytes = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+        self.response_cache_ttl = float(os.environ.get("RESPONSE_CACHE_TTL", 3600.0))
+        self.response_cache_backend = os.environ.get("RESPONSE_CACHE_BACKEND", shared_backend).lower()
+        self.response_cache_db_path = os.environ.get("RESPONSE_CACHE_DB_PATH", "response_cache.db")
+        # Also cache follow-ups that read as complete questions, keyed without the history
+        self.response_cache_standalone_follow_ups = os.environ.get(
+            "RESPONSE_CACHE_STANDALONE_FOLLOW_UPS", "true"
+        ).lower() == "true"
+        
+        # Share one upstream generation between identical concurrent requests
+        self.coalescing_enabled = os.environ.get("COALESCING_ENABLED", "true").lower() == "true"
+        
+        # Admission control: global in-flight Gemini calls and per-user rate limits
+        self.max_in_flight = int(os.environ.get("MAX_IN_FLIGHT", 64))
+        self.max_queue = int(os.environ.get("MAX_QUEUE", 32))
+        self.queue_timeout = float(os.environ.get("QUEUE_TIMEOUT", 2.0))
+        self.rate_limit_enabled = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        self.rate_limit_per_minute = float(os.environ.get("RATE_LIMIT_PER_MINUTE", 20))
+        self.rate_limit_burst = int(os.environ.get("RATE_LIMIT_BURST", 10))
+        self.rate_limit_backend = os.environ.get("RATE_LIMIT_BACKEND", shared_backend).lower()
+        self.rate_limit_db_path = os.environ.get("RATE_LIMIT_DB_PATH", "rate_limits.db")
+        
+        # Token budgeting: output caps (the lowest applicable one wins, 0 disables), an estimated
+        # input limit and rolling per-user quotas kept in a ledger ("memory", "sqlite" or "none")
+        self.token_output_cap = int(os.environ.get("TOKEN_OUTPUT_CAP", 2048))
+        self.token_language_output_caps = _parse_token_caps(os.environ.get("TOKEN_LANGUAGE_OUTPUT_CAPS", ""))
+        self.token_route_output_caps = _parse_token_caps(os.environ.get("TOKEN_ROUTE_OUTPUT_CAPS", ""))
+        self.token_max_input = int(os.environ.get("TOKEN_MAX_INPUT", 8192))
+        self.token_quota = int(os.environ.get("TOKEN_QUOTA", 200_000))
+        self.token_quota_window = float(os.environ.get("TOKEN_QUOTA_WINDOW", 86400.0))
+        self.token_ledger_backend = os.environ.get("TOKEN_LEDGER_BACKEND", shared_backend).lower()
+        self.token_ledger_db_path = os.environ.get("TOKEN_LEDGER_DB_PATH", "token_usage.db")
+        # Bearer token for the /usage endpoints, which are disabled without one
+        self.usage_admin_token = os.environ.get("USAGE_ADMIN_TOKEN") or None
+        
+        # Upstream resilience: retries, hedged requests and circuit breaker
+        self.retry_max_attempts = int(os.environ.get("RETRY_MAX_ATTEMPTS", 3))
+        self.retry_base_delay = float(os.environ.get("RETRY_BASE_DELAY", 0.25))
+        self.retry_max_delay = float(os.environ.get("RETRY_MAX_DELAY", 2.0))
+        self.hedge_enabled = os.environ.get("HEDGE_ENABLED", "false").lower() == "true"
+        self.hedge_percentile = float(os.environ.get("HEDGE_PERCENTILE", 0.95))
+        self.hedge_min_samples = int(os.environ.get("HEDGE_MIN_SAMPLES", 50))
+        self.breaker_failure_threshold = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+        self.breaker_recovery_timeout = float(os.environ.get("BREAKER_RECOVERY_TIMEOUT", 30.0))
+        
+        # Batch chat endpoint
+        self.batch_max_items = int(os.environ.get("BATCH_MAX_ITEMS", 50))
+        self.batch_max_concurrency = int(os.environ.get("BATCH_MAX_CONCURRENCY", 8))
+        
+        # WebSocket chat channel (/chat/ws)
+        self.ws_heartbeat_interval = float(os.environ.get("WS_HEARTBEAT_INTERVAL", 20.0))
+        self.ws_idle_timeout = float(os.environ.get("WS_IDLE_TIMEOUT", 60.0))
+        self.ws_session_ttl = float(os.environ.get("WS_SESSION_TTL", 120.0))
+        self.ws_replay_buffer = int(os.environ.get("WS_REPLAY_BUFFER", 256))
+        self.ws_max_sessions = int(os.environ.get("WS_MAX_SESSIONS", 10000))
+        self.ws_max_in_flight = int(os.environ.get("WS_MAX_IN_FLIGHT", 4))
+        
+        # Idempotent chat requests: retries with the same Idempotency-Key (or user, message and
+        # client timestamp) attach to the first execution or replay its stored response
+        self.idempotency_enabled = os.environ.get("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+        self.idempotency_ttl = float(os.environ.get("IDEMPOTENCY_TTL", 86400.0))
+        self.idempotency_max_entries = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000))
+        self.idempotency_max_bytes = int(os.environ.get("IDEMPOTENCY_MAX_BYTES", 16 * 1024 * 1024))
+        self.idempotency_backend = os.environ.get("IDEMPOTENCY_BACKEND", shared_backend).lower()
+        self.idempotency_db_path = os.environ.get("IDEMPOTENCY_DB_PATH", "idempotency.db")
+        self.idempotency_abandon_grace = float(os.environ.get("IDEMPOTENCY_ABANDON_GRACE", 10.0))
+        # Replay window for requests without an Idempotency-Key (0 = only explicit keys are deduplicated)
+        self.idempotency_derived_ttl = float(os.environ.get("IDEMPOTENCY_DERIVED_TTL", 600.0))
+        
+        # Asynchronous chat jobs (/chat/jobs): worker pool, bounded queue, result store and webhooks
+        self.jobs_enabled = os.environ.get("JOBS_ENABLED", "true").lower() == "true"
+        self.job_workers = int(os.environ.get("JOB_WORKERS", 4))
+        self.job_max_queue = int(os.environ.get("JOB_MAX_QUEUE", 256))
+        self.job_result_ttl = float(os.environ.get("JOB_RESULT_TTL", 3600.0))
+        self.job_max_stored = int(os.environ.get("JOB_MAX_STORED", 10000))
+        self.job_max_wait = float(os.environ.get("JOB_MAX_WAIT", 30.0))
+        self.job_backend = os.environ.get("JOB_BACKEND", shared_backend).lower()
+        self.job_db_path = os.environ.get("JOB_DB_PATH", "jobs.db")
+        self.job_webhook_timeout = float(os.environ.get("JOB_WEBHOOK_TIMEOUT", 10.0))
+        self.job_webhook_attempts = int(os.environ.get("JOB_WEBHOOK_ATTEMPTS", 3))
+        self.job_webhook_secret = os.environ.get("JOB_WEBHOOK_SECRET") or None
+        self.job_webhook_allowed_hosts = [
+            host.strip() for host in os.environ.get("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+        ]
+        
+        # Per-user conversation memory ("memory", "sqlite" or "none")
+        self.conversation_backend = os.environ.get("CONVERSATION_BACKEND", shared_backend).lower()
+        self.conversation_db_path = os.environ.get("CONVERSATION_DB_PATH", "conversations.db")
+        self.conversation_max_turns = int(os.environ.get("CONVERSATION_MAX_TURNS", 20))
+        self.conversation_max_user_bytes = int(os.environ.get("CONVERSATION_MAX_USER_BYTES", 16 * 1024))
+        self.conversation_max_total_bytes = int(
+            os.environ.get("CONVERSATION_MAX_TOTAL_BYTES", 64 * 1024 * 1024)
+        )
+        self.conversation_idle_ttl = float(os.environ.get("CONVERSATION_IDLE_TTL", 6 * 3600.0))
+        self.conversation_history_tokens = int(os.environ.get("CONVERSATION_HISTORY_TOKENS", 1024))
+        
+        # Offline language detection for the auto-route endpoints
+        self.language_detection_enabled = os.environ.get("LANGUAGE_DETECTION_ENABLED", "true").lower() == "true"
+        self.language_detection_min_confidence = float(
+            os.environ.get("LANGUAGE_DETECTION_MIN_CONFIDENCE", 0.6)
+        )
+        
+        # Nearby places from the offline route POI dataset
+        self.poi_enabled = os.environ.get("POI_ENABLED", "true").lower() == "true"
+        self.poi_data_path = os.environ.get(
+            "POI_DATA_PATH", str(Path(__file__).resolve().parent.parent / "data" / "route_pois.json")
+        )
+        self.poi_radius_km = float(os.environ.get("POI_RADIUS_KM", 50.0))
+        self.poi_max_results = int(os.environ.get("POI_MAX_RESULTS", 3))
+        self.poi_cell_degrees = float(os.environ.get("POI_CELL_DEGREES", 0.25))
+        self.poi_reload_interval = float(os.environ.get("POI_RELOAD_INTERVAL", 30.0))
+        
+        # Curated knowledge passages: confident matches are answered directly, others ground the prompt
+        self.knowledge_enabled = os.environ.get("KNOWLEDGE_ENABLED", "true").lower() == "true"
+        self.knowledge_data_dir = os.environ.get(
+            "KNOWLEDGE_DATA_DIR", str(Path(__file__).resolve().parent.parent / "data" / "knowledge")
+        )
+        self.knowledge_index_dir = os.environ.get("KNOWLEDGE_INDEX_DIR", "knowledge_index")
+        self.knowledge_answer_threshold = float(os.environ.get("KNOWLEDGE_ANSWER_THRESHOLD", 0.85))
+        self.knowledge_ground_threshold = float(os.environ.get("KNOWLEDGE_GROUND_THRESHOLD", 0.35))
+        self.knowledge_max_passages = int(os.environ.get("KNOWLEDGE_MAX_PASSAGES", 3))
+        
+        # Attachment ingestion (downloads and Gemini file uploads)
+        self.attachment_max_bytes = int(os.environ.get("ATTACHMENT_MAX_BYTES", 10 * 1024 * 1024))
+        self.attachment_max_count = int(os.environ.get("ATTACHMENT_MAX_COUNT", 5))
+        self.attachment_fetch_timeout = float(os.environ.get("ATTACHMENT_FETCH_TIMEOUT", 10.0))
+        self.attachment_inline_max_bytes = int(os.environ.get("ATTACHMENT_INLINE_MAX_BYTES", 512 * 1024))
+        self.attachment_upload_ttl = float(os.environ.get("ATTACHMENT_UPLOAD_TTL", 46 * 3600.0))
+        self.attachment_allowed_hosts = [
+            host.strip() for host in os.environ.get("ATTACHMENT_ALLOWED_HOSTS", "").split(",") if host.strip()
+        ]
+        
+        # Logging: "json" or "text" records, written by a background thread
+        self.log_format = os.environ.get("LOG_FORMAT", "json").lower()
+        self.log_queue_size = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+        self.log_success_sample_rate = float(os.environ.get("LOG_SUCCESS_SAMPLE_RATE", 1.0))
+        
+        if self.chat_backend == "gemini" and not self.gemini_api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
     
     @property
@@ -68,6 +273,25 @@ class LanguageConfig:
         return language in cls.SYSTEM_INSTRUCTIONS
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Load environment variables (including ``.env``) and build the settings once.
+    
+    Returns:
+        The process-wide settings
+    """
+    load_dotenv()
+    return Settings()
+
+
+class _LazySettings:
+    """Stand-in for the settings that builds them on first attribute access."""
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+
+# Global settings instance, built when first used rather than on import
+settings = _LazySettings()
 language_config = LanguageConfig()
@@ -0,0 +1,99 @@
+"""
+Worker startup tracking.
+Following Single Responsibility Principle - handles only startup timing and readiness.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+_IMPORTED_AT = time.monotonic()
+
+# (pid, uptime) when the application finished importing
+_app_imported: Optional[Tuple[int, float]] = None
+
+
+def process_uptime() -> float:
+    """
+    Seconds since this process started.
+
+    Read from /proc on Linux so interpreter start-up is included; elsewhere
+    measured from when this module was first imported.
+    """
+    try:
+        with open("/proc/self/stat", encoding="ascii") as stat_file:
+            # Fields after the parenthesised command name; starttime is field 22
+            fields = stat_file.read().rpartition(")")[2].split()
+        with open("/proc/uptime", encoding="ascii") as uptime_file:
+            system_uptime = float(uptime_file.read().split()[0])
+        return max(0.0, system_uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _IMPORTED_AT
+
+
+def mark_imported() -> None:
+    """Record that the application code has finished loading in this process."""
+    global _app_imported
+    _app_imported = (os.getpid(), process_uptime())
+
+
+class StartupState:
+    """
+    Records when a worker reached each startup phase and whether it is ready.
+
+    Phases are stored as seconds since the process started: ``imported``
+    (application code loaded), ``serving`` (accepting connections, so
+    ``/health`` answers) and ``ready`` (warm-up finished, chat requests are
+    served without waiting).
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._ready = asyncio.Event()
+        # Forked workers inherit the code from the supervisor, so they have no import phase
+        if _app_imported is not None and _app_imported[0] == os.getpid():
+            self.phases["imported"] = round(_app_imported[1], 3)
+
+    def mark(self, phase: str) -> None:
+        """Record that a phase was reached now."""
+        self.phases[phase] = round(process_uptime(), 3)
+
+    def set_ready(self) -> None:
+        """Mark warm-up as finished."""
+        self.mark("ready")
+        self._ready.set()
+
+    def set_failed(self, error: BaseException) -> None:
+        """Mark warm-up as failed; waiting requests are released and rejected."""
+        self.error = f"{type(error).__name__}: {error}"
+        self._ready.set()
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether warm-up finished successfully."""
+        return self._ready.is_set() and self.error is None
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Wait for warm-up to finish.
+
+        Args:
+            timeout: Most seconds to wait
+
+        Returns:
+            True if the worker is ready
+        """
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return self.error is None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get startup phase timings for the metrics endpoint."""
+        stats: Dict[str, Any] = {f"{phase}_seconds": value for phase, value in self.phases.items()}
+        stats["ready"] = self.is_ready
+        return {"startup": stats}
@@ -3,12 +3,109 @@ FastAPI application factory.
 Following Single Responsibility Principle - handles only app creation and configuration.
 """
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import settings
-from .api.routes import chat, utils
-from .utils.logging import setup_logging
+from .core.startup import StartupState, mark_imported
+from .api.routes import chat, jobs, stream, utils, websocket
+from .api.middleware import RequestContextMiddleware
+from .services.factory import create_chat_components
+from .services.gemini_client import gemini_client_manager
+from .utils.logging import dropped_log_records, setup_logging
+from .utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+def _gemini_pool_stats() -> dict:
+    """Connection pool usage for the metrics endpoint."""
+    return {"gemini_pool": gemini_client_manager.pool_stats()}
+
+
+def _logging_stats() -> dict:
+    """Log queue health for the metrics endpoint."""
+    return {"log_records_dropped": dropped_log_records()}
+
+
+def configure_logging() -> None:
+    """Set up logging from settings (also called in each forked worker)."""
+    setup_logging(
+        "INFO" if not settings.debug else "DEBUG",
+        log_format=settings.log_format,
+        queue_size=settings.log_queue_size,
+        success_sample_rate=settings.log_success_sample_rate
+    )
+
+
+def _load_gemini():
+    """Import the Gemini backend and create the shared client (blocks for the SDK import)."""
+    from .services import gemini_service  # noqa: F401
+    return gemini_client_manager.start()
+
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    Build the chat components and open the upstream connection.
+    
+    Runs in the background so the worker accepts connections, and answers
+    ``/health``, while the Gemini SDK loads. Chat requests that arrive
+    first wait for it to finish.
+    """
+    startup: StartupState = app.state.startup
+    try:
+        client = await asyncio.to_thread(_load_gemini) if settings.chat_backend == "gemini" else None
+        app.state.components = create_chat_components(client)
+        app.state.chat_service = app.state.components.chat_service
+        await app.state.components.start(client)
+        registry.register_collector(app.state.components.stats)
+        if client is not None:
+            await gemini_client_manager.warm_up(settings.gemini_model)
+    except Exception as e:
+        logger.exception("Worker warm-up failed")
+        startup.set_failed(e)
+        return
+    
+    startup.set_ready()
+    logger.info("Worker ready after %.2fs", startup.phases["ready"], extra={"startup": startup.phases})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Manage worker-scoped resources.
+    
+    Starts the warm-up (Gemini client, chat components, first upstream
+    connection) in the background and returns at once so the worker can
+    accept connections. Everything is closed on shutdown. The fake backend
+    needs no client.
+    """
+    app.state.startup = StartupState()
+    registry.register_collector(app.state.startup.stats)
+    registry.register_collector(_gemini_pool_stats)
+    registry.register_collector(_logging_stats)
+    warm_up_task = asyncio.create_task(warm_up(app))
+    app.state.startup.mark("serving")
+    
+    yield
+    
+    warm_up_task.cancel()
+    try:
+        await warm_up_task
+    except asyncio.CancelledError:
+        pass
+    registry.unregister_collector(app.state.startup.stats)
+    registry.unregister_collector(_gemini_pool_stats)
+    registry.unregister_collector(_logging_stats)
+    components = getattr(app.state, "components", None)
+    if components is not None:
+        registry.unregister_collector(components.stats)
+        await components.aclose()
+    await gemini_client_manager.aclose()
 
 
 def create_app() -> FastAPI:
@@ -19,7 +116,7 @@ def create_app() -> FastAPI:
         Configured FastAPI app instance
     """
     # Setup logging
-    setup_logging("INFO" if not settings.debug else "DEBUG")
+    configure_logging()
     
     # Create FastAPI app
     app = FastAPI(
@@ -27,7 +124,8 @@ def create_app() -> FastAPI:
         description="AI-powered chatbot API for Pakistani truck drivers with multi-language support",
         version="1.0.0",
         docs_url="/docs",
-        debug=settings.debug
+        debug=settings.debug,
+        lifespan=lifespan
     )
     
     # Add CORS middleware
@@ -38,9 +136,13 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(RequestContextMiddleware)
     
     # Include routers
     app.include_router(chat.router)
+    app.include_router(stream.router)
+    app.include_router(websocket.router)
+    app.include_router(jobs.router)
     app.include_router(utils.router)
     
     return app
@@ -48,3 +150,4 @@ def create_app() -> FastAPI:
 
 # Create app instance
 app = create_app()
+mark_imported()
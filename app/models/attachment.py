@@ -0,0 +1,20 @@
+"""
+Attachment data models.
+Following Single Responsibility Principle - each model has one clear purpose.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class AttachmentContent:
+    """A fetched attachment ready to send upstream."""
+    filename: str
+    mime_type: str
+    data: bytes
+    sha256: str
+
+    @property
+    def size(self) -> int:
+        """Size in bytes."""
+        return len(self.data)
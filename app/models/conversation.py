@@ -0,0 +1,31 @@
+"""
+Conversation data models.
+Following Single Responsibility Principle - each model has one clear purpose.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass(slots=True)
+class ConversationTurn:
+    """A single stored message in a user's conversation."""
+    role: str
+    text: str
+    created_at: float = 0.0
+
+    @property
+    def size(self) -> int:
+        """Approximate stored size in bytes."""
+        return len(self.text.encode("utf-8")) + 16
+
+
+@dataclass
+class ConversationHistory:
+    """History to send upstream alongside a new message."""
+    turns: List[ConversationTurn] = field(default_factory=list)
+    summary: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        """Whether there is no prior context."""
+        return not self.turns and not self.summary
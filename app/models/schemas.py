@@ -4,7 +4,7 @@ Following Single Responsibility Principle - each model has one clear purpose.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 
@@ -57,13 +57,93 @@ class ChatResponse(BaseModel):
         )
 
 
+class WebSocketHello(BaseModel):
+    """First frame on the WebSocket channel: starts or resumes a session."""
+    language: Optional[str] = Field(None, description="Session language (detected from the first message if omitted)")
+    session_id: Optional[str] = Field(None, description="Session to resume after a reconnect")
+    last_seq: int = Field(0, description="Last event number received before the reconnect")
+
+
+class WebSocketChatMessage(BaseModel):
+    """Chat frame on the WebSocket channel."""
+    id: str = Field(..., description="Client-chosen message id, echoed on every event for the message")
+    request: ChatRequest = Field(..., description="The chat message")
+
+
+class BatchChatItem(ChatRequest):
+    """Chat request inside a batch, with an optional target language."""
+    language: Optional[str] = Field(None, description="Target language (defaults to context language)")
+
+
+class BatchChatRequest(BaseModel):
+    """Batch of chat requests processed concurrently."""
+    requests: List[BatchChatItem] = Field(..., description="Chat requests to process")
+
+
+class BatchChatResult(BaseModel):
+    """Outcome of one batch item."""
+    index: int = Field(..., description="Position of the item in the request")
+    response: Optional[ChatResponse] = Field(None, description="Chat response if the item succeeded")
+    error: Optional[Dict[str, Any]] = Field(None, description="Error details if the item failed")
+
+
+class BatchChatResponse(BaseModel):
+    """Batch chat response with results in request order."""
+    results: List[BatchChatResult] = Field(..., description="Per-item results in request order")
+
+
+class ChatJobRequest(ChatRequest):
+    """Chat request to run in the background, with an optional target language and webhook."""
+    language: Optional[str] = Field(None, description="Target language (defaults to context language)")
+    webhook_url: Optional[str] = Field(None, description="URL the finished job is POSTed to")
+
+
+class ChatJobResponse(BaseModel):
+    """State of a background chat job."""
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    user_id: str = Field(..., description="User ID from request")
+    language: str = Field(..., description="Target language")
+    created_at: str = Field(..., description="When the job was submitted")
+    updated_at: str = Field(..., description="When the job last changed")
+    response: Optional[ChatResponse] = Field(None, description="Chat response if the job succeeded")
+    error: Optional[Dict[str, Any]] = Field(None, description="Error details if the job failed")
+    webhook: Optional[str] = Field(None, description="Webhook delivery: pending, delivered or failed")
+
+
 class HealthResponse(BaseModel):
     """Health check response model."""
     status: str = Field(..., description="Health status")
     timestamp: str = Field(..., description="Check timestamp")
+    gemini_pool: Optional[Dict[str, Any]] = Field(None, description="Gemini connection pool usage")
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response model."""
+    status: str = Field(..., description="ready, starting or failed")
+    timestamp: str = Field(..., description="Check timestamp")
+    startup: Dict[str, float] = Field(default_factory=dict, description="Seconds after process start each startup phase was reached")
+    error: Optional[str] = Field(None, description="Why warm-up failed")
 
 
 class LanguagesResponse(BaseModel):
     """Supported languages response model."""
     supported_languages: List[str] = Field(..., description="List of supported language codes")
     default_language: str = Field(..., description="Default language code")
+
+
+class UserTokenUsage(BaseModel):
+    """One user's token usage within the quota window."""
+    user_id: str = Field(..., description="User identifier")
+    input_tokens: int = Field(..., description="Prompt tokens billed")
+    output_tokens: int = Field(..., description="Response tokens billed, including thinking tokens")
+    total_tokens: int = Field(..., description="Input and output tokens together")
+    calls: int = Field(..., description="Upstream model calls")
+    remaining: Optional[int] = Field(None, description="Tokens left in the quota, if one is set")
+
+
+class TokenUsageResponse(BaseModel):
+    """Token usage response model."""
+    window_seconds: float = Field(..., description="Length of the rolling quota window")
+    quota: Optional[int] = Field(None, description="Tokens each user may use per window, if limited")
+    users: List[UserTokenUsage] = Field(..., description="Usage per user, heaviest first")
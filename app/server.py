@@ -0,0 +1,261 @@
+"""
+Process management for serving the API.
+Following Single Responsibility Principle - handles only starting, supervising and reloading worker processes.
+
+With one worker the app runs in the launching process. With more, a
+supervisor imports the app once (preloading code and read-only data such as
+the language model), binds the listening socket and forks workers that share
+both. SIGHUP replaces workers one at a time: each replacement finishes
+startup before the worker it replaces stops accepting connections and drains
+its in-flight requests. SIGTERM or SIGINT drains every worker and exits.
+"""
+
+import logging
+import os
+import select
+import signal
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+
+from .core.config import settings
+from .utils.logging import shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = "app.main:app"
+
+# A worker that exits this soon after starting counts as a failed boot
+BOOT_GRACE_SECONDS = 5.0
+MAX_BOOT_FAILURES = 5
+
+# Exit code of a worker whose startup failed (matches uvicorn's)
+STARTUP_FAILURE = 3
+
+
+def _log_level() -> str:
+    return "debug" if settings.debug else "info"
+
+
+def _server_options(graceful_timeout: float) -> Dict[str, Any]:
+    """
+    Options shared by every way of starting uvicorn.
+
+    ``log_config=None`` stops uvicorn from installing its own handlers, which
+    write plain text synchronously; its records go through the app's queue
+    handler and formatter instead (see ``setup_logging``).
+    """
+    return {
+        "host": settings.host,
+        "port": settings.port,
+        "log_level": _log_level(),
+        "log_config": None,
+        "timeout_graceful_shutdown": graceful_timeout,
+    }
+
+
+def serve() -> None:
+    """Run the API with ``settings.workers`` worker processes."""
+    if settings.workers <= 1:
+        uvicorn.run(APP_PATH, reload=settings.debug, **_server_options(settings.graceful_timeout))
+        return
+
+    if not hasattr(os, "fork"):
+        # Without fork (Windows) fall back to uvicorn's own supervisor, which cannot preload
+        uvicorn.run(APP_PATH, workers=settings.workers, **_server_options(settings.graceful_timeout))
+        return
+
+    PreforkSupervisor(settings.workers, settings.graceful_timeout).run()
+
+
+class _WorkerServer(uvicorn.Server):
+    """Uvicorn server that tells the supervisor when startup has finished."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: Optional[int] = None):
+        super().__init__(config)
+        self._ready_fd = ready_fd
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self._ready_fd is not None:
+            os.write(self._ready_fd, b"1")
+            os.close(self._ready_fd)
+            self._ready_fd = None
+
+
+class PreforkSupervisor:
+    """
+    Forks and supervises uvicorn workers sharing one listening socket.
+
+    Workers that die are replaced. If workers keep failing right after
+    starting, the supervisor gives up instead of restarting them forever.
+    """
+
+    def __init__(self, workers: int, graceful_timeout: float = 30.0):
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, float] = {}
+        self._config: Optional[uvicorn.Config] = None
+        self._socket = None
+        self._stopping = False
+        self._reload_requested = False
+        self._boot_failures = 0
+
+    def run(self) -> None:
+        """Preload the app, start the workers and supervise them until stopped."""
+        from .main import app, configure_logging
+        from .services.language_detection import language_detector
+
+        # Load read-only data and the Gemini SDK once so workers share them copy-on-write
+        language_detector.model
+        if settings.chat_backend == "gemini":
+            from .services import gemini_service  # noqa: F401
+        self._configure_logging = configure_logging
+
+        self._config = uvicorn.Config(app, **_server_options(self.graceful_timeout))
+        self._socket = self._config.bind_socket()
+
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        logger.info(
+            "Starting %d workers on %s:%d (supervisor %d)",
+            self.workers, settings.host, settings.port, os.getpid()
+        )
+        try:
+            while not self._stopping:
+                self._reap()
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._rolling_restart()
+                while len(self.children) < self.workers and not self._stopping:
+                    if self._boot_failures >= MAX_BOOT_FAILURES:
+                        logger.error("Workers keep failing to start; shutting down")
+                        self._stopping = True
+                        break
+                    self._spawn()
+                time.sleep(0.2)
+        finally:
+            self._stop_workers(list(self.children))
+            self._socket.close()
+            logger.info("Supervisor stopped")
+
+    def _handle_reload(self, signum: int, frame) -> None:
+        self._reload_requested = True
+
+    def _handle_stop(self, signum: int, frame) -> None:
+        self._stopping = True
+
+    def _spawn(self, wait_ready: bool = False) -> Optional[int]:
+        """
+        Fork a worker.
+
+        Args:
+            wait_ready: Block until the worker has finished startup
+
+        Returns:
+            The worker's pid, or None if it failed to start while waited on
+        """
+        read_fd, write_fd = os.pipe() if wait_ready else (None, None)
+        # The listener thread must not be running across fork
+        shutdown_logging()
+        pid = os.fork()
+
+        if pid == 0:
+            if read_fd is not None:
+                os.close(read_fd)
+            code = 0
+            try:
+                for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+                    signal.signal(signum, signal.SIG_DFL)
+                self._configure_logging()
+                server = _WorkerServer(self._config, write_fd)
+                server.run(sockets=[self._socket])
+                code = 0 if server.started else STARTUP_FAILURE
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                shutdown_logging()
+                os._exit(code)
+
+        self._configure_logging()
+        self.children[pid] = time.monotonic()
+        if not wait_ready:
+            return pid
+
+        os.close(write_fd)
+        readable, _, _ = select.select([read_fd], [], [], self.graceful_timeout)
+        ready = bool(readable) and os.read(read_fd, 1) == b"1"
+        os.close(read_fd)
+        if not ready:
+            logger.error("Worker %d did not start", pid)
+            self._stop_workers([pid])
+            return None
+        return pid
+
+    def _reap(self) -> None:
+        """Collect exited workers."""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - started < BOOT_GRACE_SECONDS and code != 0:
+                self._boot_failures += 1
+            else:
+                self._boot_failures = 0
+            if not self._stopping:
+                logger.warning("Worker %d exited with code %d; replacing it", pid, code)
+
+    def _rolling_restart(self) -> None:
+        """Replace every worker, one at a time, without dropping connections."""
+        logger.info("Reloading %d workers", len(self.children))
+        for old_pid in list(self.children):
+            if self._stopping:
+                return
+            if self._spawn(wait_ready=True) is None:
+                logger.error("Reload aborted; keeping the remaining workers")
+                return
+            self._stop_workers([old_pid])
+
+    def _stop_workers(self, pids: List[int]) -> None:
+        """Ask workers to drain and exit, killing any still running after the grace period."""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.graceful_timeout + 5.0
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self.children.pop(pid, None)
+            time.sleep(0.05)
+
+        for pid in remaining:
+            logger.warning("Worker %d did not stop in time; killing it", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.children.pop(pid, None)
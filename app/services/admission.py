@@ -0,0 +1,359 @@
+"""
+Admission control for upstream calls.
+Following Open/Closed Principle - adds rate and concurrency limits around any ChatServiceInterface without modifying it.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils.exceptions import RateLimitExceededError, ServiceOverloadedError
+from ..utils.sqlite import DEFAULT_BUSY_TIMEOUT, connect_shared
+from .interfaces import ChatServiceInterface
+
+
+class ConcurrencyLimiter:
+    """
+    Global in-flight limit with a short, bounded wait queue.
+
+    Up to ``max_in_flight`` calls run at once. Further calls wait for a slot,
+    but only ``max_queue`` may wait and each waits at most ``queue_timeout``
+    seconds; everything beyond that is rejected immediately.
+    """
+
+    def __init__(self, max_in_flight: int = 64, max_queue: int = 32, queue_timeout: float = 2.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold an in-flight slot for the duration of the block.
+
+        Raises:
+            ServiceOverloadedError: If the queue is full or the wait times out
+        """
+        if self.in_flight >= self.max_in_flight or self.queued:
+            await self._wait_for_slot()
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _wait_for_slot(self) -> None:
+        """Queue for a slot within the queue bounds."""
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloadedError(retry_after=self.queue_timeout)
+
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ServiceOverloadedError(retry_after=self.queue_timeout)
+        finally:
+            self.queued -= 1
+            waited = time.monotonic() - started
+            self.waited += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get in-flight, queue and wait-time statistics."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.waited * 1000, 2) if self.waited else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+
+class TokenBucketRateLimiter:
+    """
+    Per-user token-bucket rate limiting.
+
+    Each user may burst up to ``burst`` requests and then refills at
+    ``rate`` requests per second. Buckets of the least recently seen users
+    are dropped beyond ``max_users``.
+    """
+
+    def __init__(self, rate: float = 20 / 60, burst: int = 10, max_users: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, user_id: str) -> None:
+        """
+        Take one token from the user's bucket.
+
+        Raises:
+            RateLimitExceededError: If the bucket is empty
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(user_id, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+
+            if tokens < 1.0:
+                self._buckets[user_id] = (tokens, now)
+                self.limited += 1
+                raise RateLimitExceededError(retry_after=(1.0 - tokens) / self.rate)
+
+            self._buckets[user_id] = (tokens - 1.0, now)
+            self.allowed += 1
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+
+    def peek(self, user_id: str) -> None:
+        """
+        Check that the user's bucket has a token, without taking it.
+
+        Raises:
+            RateLimitExceededError: If the bucket is empty
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(user_id, (float(self.burst), now))
+        self._refuse_if_empty(min(float(self.burst), tokens + (now - updated) * self.rate))
+
+    def _refuse_if_empty(self, tokens: float) -> None:
+        """Raise RateLimitExceededError if less than one token is left."""
+        if tokens < 1.0:
+            self.limited += 1
+            raise RateLimitExceededError(retry_after=(1.0 - tokens) / self.rate)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get rate limiting counters."""
+        return {
+            "tracked_users": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+class SQLiteTokenBucketRateLimiter(TokenBucketRateLimiter):
+    """
+    Per-user token buckets shared by every worker process through SQLite.
+
+    Each check is one short write transaction, so a user's limit holds no
+    matter which worker serves the request. Buckets idle long enough to
+    refill completely are equivalent to new ones and are pruned.
+    """
+
+    # Checks between prunes of full buckets
+    PRUNE_INTERVAL = 1024
+
+    def __init__(
+        self,
+        path: str = "rate_limits.db",
+        rate: float = 20 / 60,
+        burst: int = 10,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT
+    ):
+        super().__init__(rate=rate, burst=burst)
+        self.path = path
+        self._checks = 0
+        self._conn = connect_shared(path, busy_timeout)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "user_id TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def check(self, user_id: str) -> None:
+        """
+        Take one token from the user's bucket.
+
+        Raises:
+            RateLimitExceededError: If the bucket is empty
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            tokens, updated = row if row is not None else (float(self.burst), now)
+            tokens = min(float(self.burst), tokens + max(0.0, now - updated) * self.rate)
+
+            if tokens >= 1.0:
+                self._conn.execute(
+                    "INSERT INTO rate_limit_buckets (user_id, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (user_id, tokens - 1.0, now)
+                )
+                self._checks += 1
+                if self._checks % self.PRUNE_INTERVAL == 0:
+                    self._conn.execute(
+                        "DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - self.burst / self.rate,)
+                    )
+
+        self._refuse_if_empty(tokens)
+        self.allowed += 1
+
+    def peek(self, user_id: str) -> None:
+        """
+        Check that the user's bucket has a token, without taking it.
+
+        Raises:
+            RateLimitExceededError: If the bucket is empty
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        tokens, updated = row if row is not None else (float(self.burst), now)
+        self._refuse_if_empty(min(float(self.burst), tokens + max(0.0, now - updated) * self.rate))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get rate limiting counters."""
+        with self._lock:
+            tracked = self._conn.execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+        return {
+            "tracked_users": tracked,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+class RateLimitedChatService(ChatServiceInterface):
+    """Chat service decorator enforcing per-user rate limits."""
+
+    def __init__(self, inner: ChatServiceInterface, limiter: TokenBucketRateLimiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    def admit(self, message: str, language: str, user_id: str = "") -> None:
+        """Refuse the request early if the user has no token left (the token is taken when it runs)."""
+        self.limiter.peek(user_id)
+        self.inner.admit(message, language, user_id)
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response if the user is within their rate limit."""
+        self.limiter.check(user_id)
+        return self.inner.generate_response(message, language, context, user_id, history, attachments)
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response asynchronously if the user is within their rate limit."""
+        self.limiter.check(user_id)
+        return await self.inner.generate_response_async(
+            message, language, context, user_id, history, attachments
+        )
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response if the user is within their rate limit."""
+        self.limiter.check(user_id)
+        async for text in self.inner.stream_response(
+            message, language, context, user_id, history, attachments
+        ):
+            yield text
+
+
+class ConcurrencyLimitedChatService(ChatServiceInterface):
+    """Chat service decorator holding a global in-flight slot per upstream call."""
+
+    def __init__(self, inner: ChatServiceInterface, limiter: ConcurrencyLimiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response (the synchronous path is not limited)."""
+        return self.inner.generate_response(message, language, context, user_id, history, attachments)
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response once an in-flight slot is available."""
+        async with self.limiter.slot():
+            return await self.inner.generate_response_async(
+                message, language, context, user_id, history, attachments
+            )
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response while holding an in-flight slot."""
+        async with self.limiter.slot():
+            async for text in self.inner.stream_response(
+                message, language, context, user_id, history, attachments
+            ):
+                yield text
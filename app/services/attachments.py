@@ -0,0 +1,322 @@
+"""
+Attachment ingestion.
+Following Single Responsibility Principle - handles only fetching attachments and tracking their uploads.
+"""
+
+import asyncio
+import hashlib
+import mimetypes
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import httpx
+
+from ..models.attachment import AttachmentContent
+from ..models.schemas import Attachment
+from ..utils.exceptions import AttachmentError, AttachmentTooLargeError
+from ..utils.urls import Resolver, check_outbound_url, resolve_host
+
+# MIME types Gemini accepts as document or image input
+ALLOWED_MIME_PREFIXES = ("image/", "application/pdf", "text/plain")
+
+# Attachment ``type`` values clients send, for when the server gives no Content-Type
+_TYPE_TO_MIME = {
+    "pdf": "application/pdf",
+    "image": "image/jpeg",
+    "photo": "image/jpeg",
+    "text": "text/plain",
+}
+
+# Redirect hops followed per attachment (each hop's host is checked again)
+MAX_REDIRECTS = 5
+
+
+class AttachmentFetcher:
+    """
+    Downloads attachments over a pooled async HTTP client.
+
+    Bodies are streamed and abandoned as soon as they exceed ``max_bytes``;
+    each download must finish within ``timeout`` seconds. All attachments of
+    a request are fetched concurrently. Only hosts in ``allowed_hosts`` are
+    fetched from, or, without an allowlist, hosts resolving to public
+    addresses; redirects are followed by hand so every hop is checked.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 10 * 1024 * 1024,
+        max_count: int = 5,
+        timeout: float = 10.0,
+        allowed_hosts: Sequence[str] = (),
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        resolve: Resolver = resolve_host
+    ):
+        """
+        Initialize the fetcher.
+
+        Args:
+            max_bytes: Largest accepted attachment
+            max_count: Most attachments accepted per request
+            timeout: Seconds allowed per download
+            allowed_hosts: Hosts attachments may be fetched from (any public host if empty)
+            transport: Custom HTTP transport, e.g. a local stand-in for tests
+            resolve: Host resolver used for the public-address check
+        """
+        self.max_bytes = max_bytes
+        self.max_count = max_count
+        self.timeout = timeout
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        self._transport = transport
+        self._resolve = resolve
+        self._client: Optional[httpx.AsyncClient] = None
+        self.fetched = 0
+        self.bytes_fetched = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+                follow_redirects=False
+            )
+        return self._client
+
+    async def fetch_all(self, attachments: Optional[Sequence[Attachment]]) -> List[AttachmentContent]:
+        """
+        Fetch every attachment of a request.
+
+        Args:
+            attachments: Attachments from the chat request
+
+        Returns:
+            Fetched attachments in request order
+
+        Raises:
+            AttachmentError: If an attachment cannot be fetched or is not allowed
+            AttachmentTooLargeError: If an attachment exceeds the size limit
+        """
+        if not attachments:
+            return []
+        if len(attachments) > self.max_count:
+            self.rejected += 1
+            raise AttachmentError(f"At most {self.max_count} attachments are allowed per message")
+
+        tasks = [asyncio.create_task(self.fetch(attachment)) for attachment in attachments]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            # The request has failed; stop the other downloads instead of letting them run to the timeout
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def fetch(self, attachment: Attachment) -> AttachmentContent:
+        """
+        Fetch one attachment within the size and time limits.
+
+        Args:
+            attachment: Attachment reference from the chat request
+
+        Returns:
+            The downloaded attachment with its content hash
+        """
+        await self._check_url(attachment.url, attachment)
+
+        try:
+            async with asyncio.timeout(self.timeout):
+                data, content_type = await self._download(attachment)
+        except TimeoutError:
+            self.failed += 1
+            raise AttachmentError(
+                f"Timed out fetching {attachment.filename}",
+                {"filename": attachment.filename}
+            )
+        except httpx.HTTPStatusError as e:
+            self.failed += 1
+            raise AttachmentError(
+                f"Could not fetch {attachment.filename} (HTTP {e.response.status_code})",
+                {"filename": attachment.filename}
+            ) from e
+        except httpx.HTTPError as e:
+            self.failed += 1
+            raise AttachmentError(
+                f"Could not fetch {attachment.filename}: {str(e)}",
+                {"filename": attachment.filename}
+            ) from e
+
+        mime_type = self._resolve_mime_type(attachment, content_type)
+        self.fetched += 1
+        self.bytes_fetched += len(data)
+        return AttachmentContent(
+            filename=attachment.filename,
+            mime_type=mime_type,
+            data=data,
+            sha256=hashlib.sha256(data).hexdigest()
+        )
+
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get download counters."""
+        return {
+            "fetched": self.fetched,
+            "bytes_fetched": self.bytes_fetched,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    async def _download(self, attachment: Attachment) -> Tuple[bytes, str]:
+        """Stream the body, stopping as soon as it exceeds the size limit."""
+        url = attachment.url
+        for _ in range(MAX_REDIRECTS + 1):
+            async with self.client.stream("GET", url) as response:
+                if response.is_redirect:
+                    url = str(response.url.join(response.headers["location"]))
+                    await self._check_url(url, attachment)
+                    continue
+                response.raise_for_status()
+
+                declared = response.headers.get("content-length")
+                if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                    raise self._too_large(attachment)
+
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        raise self._too_large(attachment)
+
+                return bytes(body), response.headers.get("content-type", "")
+
+        raise httpx.TooManyRedirects("Too many redirects", request=response.request)
+
+    def _too_large(self, attachment: Attachment) -> AttachmentTooLargeError:
+        self.rejected += 1
+        return AttachmentTooLargeError(attachment.filename, self.max_bytes)
+
+    async def _check_url(self, url: str, attachment: Attachment) -> None:
+        """Only fetch http(s) URLs on allowed (or, without an allowlist, public) hosts."""
+        try:
+            await check_outbound_url(url, self.allowed_hosts, self._resolve)
+        except ValueError as e:
+            self.rejected += 1
+            raise AttachmentError(
+                f"Cannot fetch {attachment.filename}: {str(e)}",
+                {"filename": attachment.filename}
+            )
+
+    def _resolve_mime_type(self, attachment: Attachment, content_type: str) -> str:
+        """Pick the MIME type from the response, filename or declared type."""
+        mime_type = content_type.split(";")[0].strip().lower()
+        if not mime_type or mime_type == "application/octet-stream":
+            mime_type = (
+                mimetypes.guess_type(attachment.filename)[0]
+                or _TYPE_TO_MIME.get(attachment.type.lower(), "")
+            )
+        if not mime_type.startswith(ALLOWED_MIME_PREFIXES):
+            self.rejected += 1
+            raise AttachmentError(
+                f"Unsupported attachment type {mime_type or attachment.type} for {attachment.filename}",
+                {"filename": attachment.filename}
+            )
+        return mime_type
+
+
+class UploadCache:
+    """
+    Remembers uploaded files by content hash.
+
+    A document shared again within ``ttl`` seconds reuses the earlier upload
+    instead of being sent upstream a second time. Concurrent requests for the
+    same content wait for a single upload. The least recently used entries
+    are forgotten beyond ``max_entries``.
+    """
+
+    def __init__(self, ttl: float = 46 * 3600.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._pending: Dict[str, "asyncio.Future[Any]"] = {}
+        self.hits = 0
+        self.uploads = 0
+
+    def get(self, sha256: str) -> Optional[Any]:
+        """Get the stored upload for a content hash, if still valid."""
+        entry = self._entries.get(sha256)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[sha256]
+            return None
+        self._entries.move_to_end(sha256)
+        self.hits += 1
+        return value
+
+    def put(self, sha256: str, value: Any) -> None:
+        """Store an upload for a content hash."""
+        self._entries[sha256] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(sha256)
+        self.uploads += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, sha256: str) -> None:
+        """Forget an upload, e.g. after it was deleted upstream."""
+        self._entries.pop(sha256, None)
+
+    async def get_or_upload(self, sha256: str, upload: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get the stored upload for a content hash, uploading it if missing.
+
+        Args:
+            sha256: Content hash of the attachment
+            upload: Coroutine factory performing the upload
+
+        Returns:
+            The stored or newly uploaded value
+        """
+        value = self.get(sha256)
+        if value is not None:
+            return value
+
+        pending = self._pending.get(sha256)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._pending[sha256] = future
+        try:
+            value = await upload()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            self.put(sha256, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._pending.pop(sha256, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get upload cache counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "uploads": self.uploads,
+        }
@@ -0,0 +1,417 @@
+"""
+Token budgeting and per-user usage quotas.
+Following Open/Closed Principle - adds output caps and token quotas around any ChatServiceInterface without modifying it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..core.config import language_config
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils.exceptions import InputTooLargeError, QuotaExceededError
+from ..utils.request_context import get_request_options
+from ..utils.sqlite import DEFAULT_BUSY_TIMEOUT, connect_shared
+from ..utils.tokens import estimate_tokens
+from .interfaces import ChatServiceInterface
+
+# Gemini bills an image as 258 tokens; other attachments cost at least as much
+ATTACHMENT_TOKENS = 258
+
+
+@dataclass
+class TokenUsage:
+    """Tokens used by one user within the ledger's window."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    calls: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """Input and output tokens together."""
+        return self.input_tokens + self.output_tokens
+
+    def to_dict(self) -> Dict[str, int]:
+        """Get the counts as a dictionary, including the total."""
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "calls": self.calls,
+        }
+
+
+def usage_from_metadata(usage_metadata: Optional[Any]) -> Tuple[int, int]:
+    """
+    Read billed token counts from a Gemini usage metadata object.
+
+    Returns:
+        Tuple of input tokens and output tokens (thinking tokens count as output)
+    """
+    if usage_metadata is None:
+        return 0, 0
+    input_tokens = getattr(usage_metadata, "prompt_token_count", None) or 0
+    output_tokens = (
+        (getattr(usage_metadata, "candidates_token_count", None) or 0)
+        + (getattr(usage_metadata, "thoughts_token_count", None) or 0)
+    )
+    return input_tokens, output_tokens
+
+
+class TokenLedger:
+    """
+    Rolling per-user token usage kept in memory.
+
+    Usage is added to fixed time buckets, ``buckets`` of which cover
+    ``window`` seconds, so recording is one dictionary update and a user's
+    total is a sum over a few buckets. Users not seen recently are dropped
+    beyond ``max_users``.
+    """
+
+    def __init__(self, window: float = 86400.0, buckets: int = 24, max_users: int = 100_000):
+        self.window = window
+        self.buckets = buckets
+        self.bucket_seconds = window / buckets
+        self.max_users = max_users
+        self._users: "OrderedDict[str, Dict[int, List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.recorded_input = 0
+        self.recorded_output = 0
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _live(self, user_buckets: Dict[int, List[int]], now: float) -> Dict[int, List[int]]:
+        """Drop buckets that have left the window."""
+        oldest = self._bucket(now) - self.buckets + 1
+        for bucket in [bucket for bucket in user_buckets if bucket < oldest]:
+            del user_buckets[bucket]
+        return user_buckets
+
+    def record(self, user_id: str, input_tokens: int, output_tokens: int) -> None:
+        """Add one upstream call's tokens to a user's usage."""
+        if not user_id or not (input_tokens or output_tokens):
+            return
+        now = time.time()
+        with self._lock:
+            user_buckets = self._live(self._users.pop(user_id, {}), now)
+            counts = user_buckets.setdefault(self._bucket(now), [0, 0, 0])
+            counts[0] += input_tokens
+            counts[1] += output_tokens
+            counts[2] += 1
+            self._users[user_id] = user_buckets
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self.recorded_input += input_tokens
+        self.recorded_output += output_tokens
+
+    def usage(self, user_id: str) -> TokenUsage:
+        """Get a user's usage within the window."""
+        with self._lock:
+            user_buckets = self._users.get(user_id)
+            if not user_buckets:
+                return TokenUsage()
+            return self._total(self._live(user_buckets, time.time()).values())
+
+    @staticmethod
+    def _total(counts: Any) -> TokenUsage:
+        usage = TokenUsage()
+        for input_tokens, output_tokens, calls in counts:
+            usage.input_tokens += input_tokens
+            usage.output_tokens += output_tokens
+            usage.calls += calls
+        return usage
+
+    def retry_after(self, user_id: str) -> float:
+        """Seconds until the user's oldest usage leaves the window."""
+        with self._lock:
+            user_buckets = self._users.get(user_id)
+            oldest = min(user_buckets) if user_buckets else self._bucket(time.time())
+        return max(1.0, (oldest + self.buckets) * self.bucket_seconds - time.time())
+
+    def top_users(self, limit: int = 10) -> List[Tuple[str, TokenUsage]]:
+        """Users with the highest usage in the window, heaviest first."""
+        now = time.time()
+        with self._lock:
+            totals = [
+                (user_id, self._total(self._live(user_buckets, now).values()))
+                for user_id, user_buckets in self._users.items()
+            ]
+        totals = [(user_id, usage) for user_id, usage in totals if usage.calls]
+        totals.sort(key=lambda item: item[1].total_tokens, reverse=True)
+        return totals[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get ledger size and token counters."""
+        return {
+            "tracked_users": len(self._users),
+            "input_tokens": self.recorded_input,
+            "output_tokens": self.recorded_output,
+        }
+
+
+class SQLiteTokenLedger(TokenLedger):
+    """
+    Rolling per-user token usage shared by every worker process through SQLite.
+
+    Each upstream call adds one row update; buckets that have left the
+    window are pruned periodically.
+    """
+
+    # Records between prunes of expired buckets
+    PRUNE_INTERVAL = 1024
+
+    def __init__(
+        self,
+        path: str = "token_usage.db",
+        window: float = 86400.0,
+        buckets: int = 24,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT
+    ):
+        super().__init__(window=window, buckets=buckets)
+        self.path = path
+        self._records = 0
+        self._conn = connect_shared(path, busy_timeout)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_usage ("
+            "user_id TEXT NOT NULL, bucket INTEGER NOT NULL, input_tokens INTEGER NOT NULL, "
+            "output_tokens INTEGER NOT NULL, calls INTEGER NOT NULL, PRIMARY KEY (user_id, bucket))"
+        )
+
+    def record(self, user_id: str, input_tokens: int, output_tokens: int) -> None:
+        """Add one upstream call's tokens to a user's usage."""
+        if not user_id or not (input_tokens or output_tokens):
+            return
+        bucket = self._bucket(time.time())
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT INTO token_usage (user_id, bucket, input_tokens, output_tokens, calls) "
+                "VALUES (?, ?, ?, ?, 1) ON CONFLICT(user_id, bucket) DO UPDATE SET "
+                "input_tokens = input_tokens + excluded.input_tokens, "
+                "output_tokens = output_tokens + excluded.output_tokens, calls = calls + 1",
+                (user_id, bucket, input_tokens, output_tokens)
+            )
+            self._records += 1
+            if self._records % self.PRUNE_INTERVAL == 0:
+                self._conn.execute("DELETE FROM token_usage WHERE bucket <= ?", (bucket - self.buckets,))
+        self.recorded_input += input_tokens
+        self.recorded_output += output_tokens
+
+    def usage(self, user_id: str) -> TokenUsage:
+        """Get a user's usage within the window."""
+        oldest = self._bucket(time.time()) - self.buckets + 1
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(input_tokens), 0), COALESCE(SUM(output_tokens), 0), "
+                "COALESCE(SUM(calls), 0) FROM token_usage WHERE user_id = ? AND bucket >= ?",
+                (user_id, oldest)
+            ).fetchone()
+        return TokenUsage(*row)
+
+    def retry_after(self, user_id: str) -> float:
+        """Seconds until the user's oldest usage leaves the window."""
+        now = time.time()
+        with self._lock:
+            (oldest,) = self._conn.execute(
+                "SELECT MIN(bucket) FROM token_usage WHERE user_id = ? AND bucket >= ?",
+                (user_id, self._bucket(now) - self.buckets + 1)
+            ).fetchone()
+        if oldest is None:
+            oldest = self._bucket(now)
+        return max(1.0, (oldest + self.buckets) * self.bucket_seconds - now)
+
+    def top_users(self, limit: int = 10) -> List[Tuple[str, TokenUsage]]:
+        """Users with the highest usage in the window, heaviest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, SUM(input_tokens), SUM(output_tokens), SUM(calls) FROM token_usage "
+                "WHERE bucket >= ? GROUP BY user_id "
+                "ORDER BY SUM(input_tokens) + SUM(output_tokens) DESC LIMIT ?",
+                (self._bucket(time.time()) - self.buckets + 1, limit)
+            ).fetchall()
+        return [(user_id, TokenUsage(*counts)) for user_id, *counts in rows]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get ledger size and token counters."""
+        with self._lock:
+            tracked = self._conn.execute("SELECT COUNT(DISTINCT user_id) FROM token_usage").fetchone()[0]
+        return {
+            "tracked_users": tracked,
+            "input_tokens": self.recorded_input,
+            "output_tokens": self.recorded_output,
+        }
+
+
+class TokenBudget:
+    """
+    Token limits applied before a request reaches the model.
+
+    Output is capped at the lowest of ``output_cap``, the language's cap
+    and the cap of the longest route prefix matching the request path.
+    Requests whose estimated input exceeds ``max_input_tokens``, or that
+    would take a user past ``quota`` tokens within the ledger's window, are
+    rejected. Zero disables a limit.
+    """
+
+    def __init__(
+        self,
+        ledger: Optional[TokenLedger] = None,
+        quota: int = 0,
+        max_input_tokens: int = 0,
+        output_cap: int = 0,
+        language_caps: Optional[Dict[str, int]] = None,
+        route_caps: Optional[Dict[str, int]] = None
+    ):
+        self.ledger = ledger
+        self.quota = quota
+        self.max_input_tokens = max_input_tokens
+        self.default_output_cap = output_cap
+        self.language_caps = language_caps or {}
+        # Longest prefix first, so the most specific route wins
+        self.route_caps = sorted((route_caps or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.quota_rejections = 0
+        self.input_rejections = 0
+
+    def output_cap(self, language: str, route: str = "") -> Optional[int]:
+        """Get the output token cap for a request, or None if uncapped."""
+        route_cap = next((cap for prefix, cap in self.route_caps if route.startswith(prefix)), 0)
+        caps = [
+            cap for cap in (self.default_output_cap, self.language_caps.get(language, 0), route_cap) if cap > 0
+        ]
+        return min(caps) if caps else None
+
+    def check(self, user_id: str, estimated_input: int) -> None:
+        """
+        Admit a request against the input limit and the user's quota.
+
+        Raises:
+            InputTooLargeError: If the estimated input is over the limit
+            QuotaExceededError: If the user has too little quota left
+        """
+        if self.max_input_tokens and estimated_input > self.max_input_tokens:
+            self.input_rejections += 1
+            raise InputTooLargeError(estimated_input, self.max_input_tokens)
+
+        if self.ledger is None or not self.quota or not user_id:
+            return
+        used = self.ledger.usage(user_id).total_tokens
+        if used + estimated_input > self.quota:
+            self.quota_rejections += 1
+            raise QuotaExceededError(self.quota, used, retry_after=self.ledger.retry_after(user_id))
+
+    def remaining(self, usage: TokenUsage) -> Optional[int]:
+        """Tokens a user may still use in the window, or None without a quota."""
+        return max(0, self.quota - usage.total_tokens) if self.quota else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get limits, rejection counters and ledger totals."""
+        stats: Dict[str, Any] = {
+            "quota": self.quota,
+            "quota_rejections": self.quota_rejections,
+            "input_rejections": self.input_rejections,
+        }
+        if self.ledger is not None:
+            stats.update(self.ledger.stats())
+        return stats
+
+
+def estimate_input_tokens(
+    message: str,
+    language: str,
+    history: Optional[ConversationHistory] = None,
+    attachments: Optional[List[AttachmentContent]] = None
+) -> int:
+    """Estimate the input tokens of a request: system instruction, history, message and attachments."""
+    tokens = estimate_tokens(language_config.get_system_instruction(language)) + estimate_tokens(message)
+    if history:
+        tokens += estimate_tokens(history.summary or "")
+        tokens += sum(estimate_tokens(turn.text) for turn in history.turns)
+    return tokens + ATTACHMENT_TOKENS * len(attachments or [])
+
+
+class BudgetedChatService(ChatServiceInterface):
+    """
+    Chat service decorator enforcing token limits.
+
+    Admits each request against the input limit and the user's quota, then
+    passes the output cap down in ``context["max_output_tokens"]``, which is
+    part of the response cache key. The backends record actual usage in
+    the ledger.
+    """
+
+    def __init__(self, inner: ChatServiceInterface, budget: TokenBudget):
+        self.inner = inner
+        self.budget = budget
+
+    def admit(self, message: str, language: str, user_id: str = "") -> None:
+        """Refuse the request early on its message alone; the full check runs when it is generated."""
+        self.budget.check(user_id, estimate_input_tokens(message, language))
+
+    def _admit(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict],
+        user_id: str,
+        history: Optional[ConversationHistory],
+        attachments: Optional[List[AttachmentContent]]
+    ) -> Optional[Dict]:
+        """Check the request's limits and return its context with the output cap added."""
+        self.budget.check(user_id, estimate_input_tokens(message, language, history, attachments))
+        cap = self.budget.output_cap(language, get_request_options().route)
+        if cap is None:
+            return context
+        return {**(context or {}), "max_output_tokens": cap}
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response within the user's token budget."""
+        context = self._admit(message, language, context, user_id, history, attachments)
+        return self.inner.generate_response(message, language, context, user_id, history, attachments)
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response asynchronously within the user's token budget."""
+        context = self._admit(message, language, context, user_id, history, attachments)
+        return await self.inner.generate_response_async(
+            message, language, context, user_id, history, attachments
+        )
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response within the user's token budget."""
+        context = self._admit(message, language, context, user_id, history, attachments)
+        async for text in self.inner.stream_response(
+            message, language, context, user_id, history, attachments
+        ):
+            yield text
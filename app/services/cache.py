@@ -0,0 +1,522 @@
+"""
+Response caching for repeated questions.
+Following Open/Closed Principle - adds caching around any ChatServiceInterface without modifying it.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils.request_context import get_request_options
+from ..utils.sqlite import DEFAULT_BUSY_TIMEOUT, TOUCH_INTERVAL, connect_shared
+from .interfaces import ChatServiceInterface, ResponseCacheInterface
+
+logger = logging.getLogger(__name__)
+
+# Context fields that change the generated answer (see GeminiChatService._build_request)
+CONTEXT_KEY_FIELDS = ("screen", "entity_id", "nearby_pois", "max_output_tokens", "brief")
+
+# Words (English, Roman Urdu and Urdu script) that point back at earlier turns
+FOLLOW_UP_MARKERS = frozenset((
+    "it", "its", "that", "this", "these", "those", "they", "them", "there", "same", "again",
+    "also", "else", "another", "previous", "above",
+    "woh", "wo", "yeh", "ye", "uska", "uski", "iska", "iski", "wahan", "phir", "dobara",
+    "وہ", "یہ", "اس", "اسے", "وہاں", "پھر", "دوبارہ",
+))
+
+# Openings that continue the previous question ("and tomorrow?", "what about Multan?")
+FOLLOW_UP_PREFIXES = ("and ", "but ", "so ", "what about", "how about", "aur ", "اور ")
+
+# Shorter messages ("why?", "kitna?") only make sense after an earlier turn
+MIN_STANDALONE_WORDS = 3
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+_TRAILING_PUNCTUATION = " .!?,;:۔؟،"
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normalize message text so trivially different phrasings share a key.
+
+    Applies Unicode NFKC folding, lowercases, collapses whitespace and strips
+    trailing punctuation (including Urdu full stop and question mark).
+    """
+    text = unicodedata.normalize("NFKC", message).lower()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION)
+
+
+def is_standalone(message: str) -> bool:
+    """
+    Whether a message reads as a complete question on its own.
+
+    Messages that are very short, open like a continuation or refer back to
+    something ("is it open?", "woh kahan hai") are not; the check errs
+    towards treating a message as a follow-up.
+    """
+    text = normalize_message(message)
+    if text.startswith(FOLLOW_UP_PREFIXES):
+        return False
+    words = _WORD_RE.findall(text)
+    return len(words) >= MIN_STANDALONE_WORDS and not any(word in FOLLOW_UP_MARKERS for word in words)
+
+
+def build_request_key(
+    message: str,
+    language: str,
+    context: Optional[Dict] = None,
+    history: Optional[ConversationHistory] = None,
+    attachments: Optional[List[AttachmentContent]] = None
+) -> str:
+    """
+    Build a stable key for a chat request.
+
+    When a history is given it is part of the key, so only requests with
+    identical prior context share it; the response cache leaves it out for
+    questions that stand on their own (see CachedChatService). Attachments
+    contribute their content hashes.
+
+    Args:
+        message: The user message
+        language: Normalized language code
+        context: Request context dictionary
+        history: Prior conversation sent with the message
+        attachments: Fetched attachments sent with the message
+
+    Returns:
+        Hex digest identifying the request
+    """
+    context = context or {}
+    payload = [
+        language,
+        normalize_message(message),
+        [context.get(field) or "" for field in CONTEXT_KEY_FIELDS],
+    ]
+    if history and not history.is_empty():
+        payload.append(history.summary or "")
+        payload.append([[turn.role, turn.text] for turn in history.turns])
+    if attachments:
+        payload.append([attachment.sha256 for attachment in attachments])
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResponseCache(ResponseCacheInterface):
+    """
+    In-memory LRU cache with TTL expiry and a memory bound.
+
+    Entries are evicted least-recently-used first when either the entry count
+    or the approximate memory footprint exceeds its limit.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None on miss or expiry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds until expiry (defaults to the cache TTL)
+        """
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters and usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry; caller must hold the lock."""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+class SQLiteResponseCache(ResponseCacheInterface):
+    """
+    Response cache shared by every worker process through a local SQLite database.
+
+    Applies the same entry, size and TTL limits as ResponseCache, evicting the
+    least recently used entries first. The database runs in WAL mode so
+    workers keep reading while one of them writes. A hit only writes when
+    the entry's last-access time is over ``touch_interval`` old, and a lookup
+    or store that cannot get the database within ``busy_timeout`` counts as
+    a miss or is skipped, so a busy writer in another worker never stalls
+    requests for long. Hit and miss counters are per worker; entries and
+    bytes are shared.
+    """
+
+    def __init__(
+        self,
+        path: str = "response_cache.db",
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 3600.0,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+        touch_interval: float = TOUCH_INTERVAL
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+        self._conn = connect_shared(path, busy_timeout)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_response_cache_accessed
+                ON response_cache (accessed_at);
+            """
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None on miss or expiry
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                self._failed("read", e)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, accessed_at = row
+            if expires_at <= now:
+                self._write_quietly("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            # Recency only orders evictions, so it need not be exact
+            if now - accessed_at >= self.touch_interval:
+                self._write_quietly("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds until expiry (defaults to the cache TTL)
+        """
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO response_cache (key, value, size, expires_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, value, size, expires_at, now)
+                    )
+                    self._evict(now)
+            except sqlite3.OperationalError as e:
+                self._failed("write", e)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters and usage."""
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "errors": self.errors,
+            }
+
+    def _write_quietly(self, sql: str, parameters: Tuple[Any, ...]) -> None:
+        """Run a write the cache can do without; caller holds the lock."""
+        try:
+            self._conn.execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            self._failed("write", e)
+
+    def _failed(self, operation: str, error: sqlite3.OperationalError) -> None:
+        """Count and log a database error the cache recovers from."""
+        self.errors += 1
+        logger.warning("Response cache %s failed: %s", operation, error, extra={"path": self.path})
+
+    def _evict(self, now: float) -> None:
+        """Drop expired, then least recently used, entries beyond the limits; caller holds the lock."""
+        entries, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        expired = self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,)).rowcount
+        self.expirations += expired
+        entries, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM response_cache ORDER BY accessed_at"):
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            victims.append((key,))
+            entries -= 1
+            total_bytes -= size
+        self._conn.executemany("DELETE FROM response_cache WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+
+class CachedChatService(ChatServiceInterface):
+    """
+    Chat service decorator that answers repeated questions from a cache.
+
+    Requests are keyed on normalized message text, language and the context
+    fields used in the system instruction, without the conversation history,
+    so the same question is answered once for every driver. Messages sent
+    with a history are only cached when they stand on their own
+    (``is_standalone``) and ``standalone_follow_ups`` is on; other follow-ups
+    depend on earlier turns and always reach the model. A request can skip
+    the cache via RequestOptions.bypass_cache; its fresh answer still
+    refreshes the entry.
+    """
+
+    def __init__(
+        self,
+        inner: ChatServiceInterface,
+        cache: ResponseCacheInterface,
+        standalone_follow_ups: bool = True
+    ):
+        self.inner = inner
+        self.cache = cache
+        self.standalone_follow_ups = standalone_follow_ups
+
+    def cache_key(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> Optional[str]:
+        """
+        Get the cache key for a request.
+
+        Returns:
+            Key shared by every conversation asking the same question, or
+            None when the answer depends on earlier turns
+        """
+        if history is not None and not history.is_empty():
+            if not (self.standalone_follow_ups and is_standalone(message)):
+                return None
+        return build_request_key(message, language, context, attachments=attachments)
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response, serving repeated questions from the cache."""
+        key = self.cache_key(message, language, context, history, attachments)
+        if key is None:
+            return self.inner.generate_response(message, language, context, user_id, history, attachments)
+        if not get_request_options().bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self.inner.generate_response(message, language, context, user_id, history, attachments)
+        self._store(key, response)
+        return response
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response asynchronously, serving repeated questions from the cache."""
+        key = self.cache_key(message, language, context, history, attachments)
+        if key is None:
+            return await self.inner.generate_response_async(
+                message, language, context, user_id, history, attachments
+            )
+        if not get_request_options().bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = await self.inner.generate_response_async(
+            message, language, context, user_id, history, attachments
+        )
+        self._store(key, response)
+        return response
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response; a cache hit is emitted as a single chunk."""
+        key = self.cache_key(message, language, context, history, attachments)
+        if key is None:
+            async for text in self.inner.stream_response(
+                message, language, context, user_id, history, attachments
+            ):
+                yield text
+            return
+        if not get_request_options().bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        async for text in self.inner.stream_response(
+            message, language, context, user_id, history, attachments
+        ):
+            chunks.append(text)
+            yield text
+
+        self._store(key, "".join(chunks).strip())
+
+    def _store(self, key: str, response: str) -> None:
+        """Cache a non-empty response."""
+        if response:
+            self.cache.set(key, response)
@@ -0,0 +1,190 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+Following Open/Closed Principle - adds request sharing around any ChatServiceInterface without modifying it.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils.exceptions import UpstreamServiceError
+from .cache import build_request_key
+from .interfaces import ChatServiceInterface
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """A single upstream generation shared by every identical request."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, text: str) -> None:
+        """Append a chunk and wake every subscriber."""
+        self.chunks.append(text)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Mark the generation complete (optionally failed)."""
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """
+        Replay buffered chunks, then follow the live generation.
+
+        Late joiners receive everything produced so far before new chunks.
+        """
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+            await self._changed.wait()
+
+    def _notify(self) -> None:
+        """Release current waiters and arm a fresh event."""
+        changed = self._changed
+        self._changed = asyncio.Event()
+        changed.set()
+
+
+class CoalescingChatService(ChatServiceInterface):
+    """
+    Chat service decorator that shares one upstream generation between
+    identical concurrent requests.
+
+    Requests with the same language, normalized message and context attach
+    to the in-flight generation and receive the same chunks. The upstream
+    call is cancelled only when every waiter has gone away; a request
+    arriving after that starts a new generation.
+
+    The shared generation runs in a task started by the first request, so
+    it keeps that request's context variables (deadline, request ID, route)
+    and is charged to its ``user_id`` in the token ledger. Requests that
+    join it are bounded by the first request's deadline rather than their
+    own, and cost their own users nothing.
+    """
+
+    def __init__(self, inner: ChatServiceInterface):
+        self.inner = inner
+        self._flights: Dict[str, _Flight] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response (the synchronous path is not coalesced)."""
+        return self.inner.generate_response(message, language, context, user_id, history, attachments)
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response, sharing the upstream call with identical requests."""
+        chunks = [
+            text async for text in self.stream_response(
+                message, language, context, user_id, history, attachments
+            )
+        ]
+        return "".join(chunks).strip()
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response, attaching to an identical in-flight generation if any."""
+        key = build_request_key(message, language, context, history, attachments)
+        flight = self._flights.get(key)
+
+        if flight is None or flight.done:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(
+                self._run(key, flight, message, language, context, user_id, history, attachments)
+            )
+            self.upstream_calls += 1
+        else:
+            self.coalesced_calls += 1
+            logger.debug("Coalesced request", extra={"user_id": user_id, "language": language})
+
+        flight.subscribers += 1
+        try:
+            async for text in flight.subscribe():
+                yield text
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task is not None:
+                # Identical requests arriving from now on must not join the dying flight
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _run(
+        self,
+        key: str,
+        flight: _Flight,
+        message: str,
+        language: str,
+        context: Optional[Dict],
+        user_id: str,
+        history: Optional[ConversationHistory],
+        attachments: Optional[List[AttachmentContent]]
+    ) -> None:
+        """Drive the upstream stream and publish its chunks to the flight."""
+        try:
+            async for text in self.inner.stream_response(
+                message, language, context, user_id, history, attachments
+            ):
+                flight.publish(text)
+        except asyncio.CancelledError:
+            # Waiters get an ordinary error; the CancelledError is not theirs to raise
+            flight.finish(UpstreamServiceError("Shared generation was cancelled", retryable=True))
+            raise
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing counters."""
+        return {
+            "in_flight": len(self._flights),
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+        }
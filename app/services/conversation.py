@@ -0,0 +1,467 @@
+"""
+Per-user conversation memory.
+Following Single Responsibility Principle - handles only storing and assembling conversation history.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory, ConversationTurn
+from ..utils.sqlite import DEFAULT_BUSY_TIMEOUT, TOUCH_INTERVAL, connect_shared
+from ..utils.tokens import estimate_tokens
+from .interfaces import ChatServiceInterface, ConversationStoreInterface
+
+logger = logging.getLogger(__name__)
+
+# Longest excerpt of an older user message kept in the summary
+SUMMARY_EXCERPT_CHARS = 120
+
+
+def assemble_history(turns: List[ConversationTurn], token_budget: int) -> ConversationHistory:
+    """
+    Fit stored turns into a token budget.
+
+    The most recent turns are sent verbatim. When not everything fits,
+    a quarter of the budget is reserved for a compact summary of the older
+    turns, built from excerpts of the user's earlier questions.
+
+    Args:
+        turns: Stored turns, oldest first
+        token_budget: Maximum estimated tokens for the whole history
+
+    Returns:
+        History to send upstream
+    """
+    if not turns or token_budget <= 0:
+        return ConversationHistory()
+
+    costs = [estimate_tokens(turn.text) for turn in turns]
+    if sum(costs) <= token_budget:
+        return ConversationHistory(turns=list(turns))
+
+    summary_budget = token_budget // 4
+    verbatim_budget = token_budget - summary_budget
+
+    used = 0
+    start = len(turns)
+    while start > 0 and used + costs[start - 1] <= verbatim_budget:
+        start -= 1
+        used += costs[start]
+
+    # Upstream history must open with a user turn
+    while start < len(turns) and turns[start].role != "user":
+        start += 1
+
+    return ConversationHistory(
+        turns=list(turns[start:]),
+        summary=_summarize(turns[:start], summary_budget)
+    )
+
+
+def _summarize(turns: List[ConversationTurn], token_budget: int) -> Optional[str]:
+    """Summarize older turns as excerpts of the user's questions, newest first."""
+    excerpts: List[str] = []
+    used = 0
+    for turn in reversed(turns):
+        if turn.role != "user":
+            continue
+        excerpt = turn.text.strip().replace("\n", " ")
+        if len(excerpt) > SUMMARY_EXCERPT_CHARS:
+            excerpt = excerpt[:SUMMARY_EXCERPT_CHARS].rstrip() + "..."
+        cost = estimate_tokens(excerpt) + 1
+        if used + cost > token_budget:
+            break
+        excerpts.append(excerpt)
+        used += cost
+
+    if not excerpts:
+        return None
+
+    excerpts.reverse()
+    return "The user previously asked: " + "; ".join(excerpts)
+
+
+class _Session:
+    """Compact in-memory record of one user's conversation."""
+
+    __slots__ = ("turns", "bytes", "last_active")
+
+    def __init__(self):
+        self.turns: Deque[ConversationTurn] = deque()
+        self.bytes = 0
+        self.last_active = time.monotonic()
+
+
+class InMemoryConversationStore(ConversationStoreInterface):
+    """
+    Conversation store kept in worker memory.
+
+    Each user keeps at most ``max_turns_per_user`` turns and
+    ``max_bytes_per_user`` bytes. Sessions idle for longer than ``idle_ttl``
+    are dropped, and the least recently active sessions are evicted when
+    the store exceeds ``max_total_bytes``.
+    """
+
+    def __init__(
+        self,
+        max_turns_per_user: int = 20,
+        max_bytes_per_user: int = 16 * 1024,
+        max_total_bytes: int = 64 * 1024 * 1024,
+        idle_ttl: float = 6 * 3600.0
+    ):
+        self.max_turns_per_user = max_turns_per_user
+        self.max_bytes_per_user = max_bytes_per_user
+        self.max_total_bytes = max_total_bytes
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get_turns(self, user_id: str) -> List[ConversationTurn]:
+        """Get stored turns for a user, oldest first."""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(user_id)
+            if session is None:
+                return []
+            self._touch(user_id, session)
+            return list(session.turns)
+
+    def append_turns(self, user_id: str, turns: List[ConversationTurn]) -> None:
+        """Append turns, trimming the user's oldest turns and evicting idle sessions."""
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = _Session()
+                self._sessions[user_id] = session
+            self._touch(user_id, session)
+
+            for turn in turns:
+                session.turns.append(turn)
+                session.bytes += turn.size
+                self._total_bytes += turn.size
+
+            while session.turns and (
+                len(session.turns) > self.max_turns_per_user
+                or session.bytes > self.max_bytes_per_user
+            ):
+                dropped = session.turns.popleft()
+                session.bytes -= dropped.size
+                self._total_bytes -= dropped.size
+
+            self._evict_idle()
+            while self._total_bytes > self.max_total_bytes and len(self._sessions) > 1:
+                oldest_user = next(iter(self._sessions))
+                self._drop(oldest_user)
+                self.evictions += 1
+
+    def clear(self, user_id: str) -> None:
+        """Forget a user's conversation."""
+        with self._lock:
+            if user_id in self._sessions:
+                self._drop(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get storage usage statistics."""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._total_bytes,
+                "max_total_bytes": self.max_total_bytes,
+                "evictions": self.evictions,
+            }
+
+    def _touch(self, user_id: str, session: _Session) -> None:
+        """Mark a session as most recently active; caller must hold the lock."""
+        session.last_active = time.monotonic()
+        self._sessions.move_to_end(user_id)
+
+    def _evict_idle(self) -> None:
+        """Drop sessions idle past the TTL; caller must hold the lock."""
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if session.last_active > cutoff:
+                break
+            self._drop(user_id)
+            self.evictions += 1
+
+    def _drop(self, user_id: str) -> None:
+        """Remove a session; caller must hold the lock."""
+        session = self._sessions.pop(user_id)
+        self._total_bytes -= session.bytes
+
+
+class SQLiteConversationStore(ConversationStoreInterface):
+    """
+    Conversation store persisted in a local SQLite database.
+
+    Applies the same per-user, global and idle limits as the in-memory
+    store. The database runs in WAL mode so readers do not block writers;
+    reads refresh a session's activity time at most once per
+    ``TOUCH_INTERVAL`` (or a tenth of ``idle_ttl``), so most of them take no
+    write lock.
+    """
+
+    def __init__(
+        self,
+        path: str = "conversations.db",
+        max_turns_per_user: int = 20,
+        max_bytes_per_user: int = 16 * 1024,
+        max_total_bytes: int = 64 * 1024 * 1024,
+        idle_ttl: float = 6 * 3600.0,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT
+    ):
+        self.path = path
+        self.max_turns_per_user = max_turns_per_user
+        self.max_bytes_per_user = max_bytes_per_user
+        self.max_total_bytes = max_total_bytes
+        self.idle_ttl = idle_ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = connect_shared(path, busy_timeout)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS conversation_turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversation_turns_user
+                ON conversation_turns (user_id, id);
+            CREATE TABLE IF NOT EXISTS conversation_sessions (
+                user_id TEXT PRIMARY KEY,
+                last_active REAL NOT NULL,
+                bytes INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversation_sessions_active
+                ON conversation_sessions (last_active);
+            """
+        )
+
+    def get_turns(self, user_id: str) -> List[ConversationTurn]:
+        """Get stored turns for a user, oldest first."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.role, t.text, t.created_at, s.last_active FROM conversation_turns t "
+                "JOIN conversation_sessions s ON s.user_id = t.user_id "
+                "WHERE t.user_id = ? AND s.last_active > ? ORDER BY t.id",
+                (user_id, now - self.idle_ttl)
+            ).fetchall()
+            if rows and now - rows[0][3] >= min(TOUCH_INTERVAL, self.idle_ttl / 10):
+                try:
+                    self._conn.execute(
+                        "UPDATE conversation_sessions SET last_active = ? WHERE user_id = ?",
+                        (now, user_id)
+                    )
+                except sqlite3.OperationalError as e:
+                    # The turns appended after this read refresh it anyway
+                    logger.warning("Could not refresh conversation activity: %s", e, extra={"user_id": user_id})
+        return [ConversationTurn(role, text, created_at) for role, text, created_at, _ in rows]
+
+    def append_turns(self, user_id: str, turns: List[ConversationTurn]) -> None:
+        """Append turns, trimming the user's oldest turns and evicting idle sessions."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT INTO conversation_turns (user_id, role, text, size, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(user_id, turn.role, turn.text, turn.size, turn.created_at or now) for turn in turns]
+            )
+            self._trim_user(user_id)
+            self._conn.execute(
+                "INSERT INTO conversation_sessions (user_id, last_active, bytes) "
+                "SELECT ?, ?, COALESCE(SUM(size), 0) FROM conversation_turns WHERE user_id = ? "
+                "ON CONFLICT(user_id) DO UPDATE SET last_active = excluded.last_active, bytes = excluded.bytes",
+                (user_id, now, user_id)
+            )
+            self._evict(now, keep_user_id=user_id)
+
+    def clear(self, user_id: str) -> None:
+        """Forget a user's conversation."""
+        with self._lock, self._conn:
+            self._delete_sessions([user_id])
+
+    def stats(self) -> Dict[str, Any]:
+        """Get storage usage statistics."""
+        with self._lock:
+            sessions, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM conversation_sessions"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "bytes": total_bytes,
+            "max_total_bytes": self.max_total_bytes,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _trim_user(self, user_id: str) -> None:
+        """Delete a user's oldest turns beyond the per-user limits."""
+        rows = self._conn.execute(
+            "SELECT id, size FROM conversation_turns WHERE user_id = ? ORDER BY id DESC",
+            (user_id,)
+        ).fetchall()
+
+        kept = 0
+        kept_bytes = 0
+        cutoff_id = None
+        for turn_id, size in rows:
+            if kept + 1 > self.max_turns_per_user or kept_bytes + size > self.max_bytes_per_user:
+                cutoff_id = turn_id
+                break
+            kept += 1
+            kept_bytes += size
+
+        if cutoff_id is not None:
+            self._conn.execute(
+                "DELETE FROM conversation_turns WHERE user_id = ? AND id <= ?",
+                (user_id, cutoff_id)
+            )
+
+    def _evict(self, now: float, keep_user_id: str) -> None:
+        """Drop idle sessions, then least recently active ones over the global cap."""
+        idle = [
+            row[0] for row in self._conn.execute(
+                "SELECT user_id FROM conversation_sessions WHERE last_active <= ?",
+                (now - self.idle_ttl,)
+            )
+        ]
+        self._delete_sessions(idle)
+
+        (total_bytes,) = self._conn.execute(
+            "SELECT COALESCE(SUM(bytes), 0) FROM conversation_sessions"
+        ).fetchone()
+        if total_bytes <= self.max_total_bytes:
+            return
+
+        victims = []
+        for user_id, size in self._conn.execute(
+            "SELECT user_id, bytes FROM conversation_sessions WHERE user_id != ? ORDER BY last_active",
+            (keep_user_id,)
+        ):
+            if total_bytes <= self.max_total_bytes:
+                break
+            victims.append(user_id)
+            total_bytes -= size
+        self._delete_sessions(victims)
+
+    def _delete_sessions(self, user_ids: List[str]) -> None:
+        """Delete sessions and their turns."""
+        if not user_ids:
+            return
+        params = [(user_id,) for user_id in user_ids]
+        self._conn.executemany("DELETE FROM conversation_turns WHERE user_id = ?", params)
+        self._conn.executemany("DELETE FROM conversation_sessions WHERE user_id = ?", params)
+        self.evictions += len(user_ids)
+
+
+class ConversationalChatService(ChatServiceInterface):
+    """
+    Chat service decorator that gives each user a running conversation.
+
+    Loads the user's stored turns, fits them into the history token budget,
+    passes them to the inner service and records the new exchange once the
+    response is complete.
+    """
+
+    def __init__(
+        self,
+        inner: ChatServiceInterface,
+        store: ConversationStoreInterface,
+        token_budget: int = 1024
+    ):
+        self.inner = inner
+        self.store = store
+        self.token_budget = token_budget
+
+    def admit(self, message: str, language: str, user_id: str = "") -> None:
+        """Check the request's limits in the wrapped service."""
+        self.inner.admit(message, language, user_id)
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response with the user's conversation history."""
+        history = history or self._load_history(user_id)
+        response = self.inner.generate_response(message, language, context, user_id, history, attachments)
+        self._record(user_id, message, response)
+        return response
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response asynchronously with the user's conversation history."""
+        history = history or self._load_history(user_id)
+        response = await self.inner.generate_response_async(
+            message, language, context, user_id, history, attachments
+        )
+        self._record(user_id, message, response)
+        return response
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response with the user's conversation history."""
+        history = history or self._load_history(user_id)
+        chunks = []
+        async for text in self.inner.stream_response(
+            message, language, context, user_id, history, attachments
+        ):
+            chunks.append(text)
+            yield text
+        self._record(user_id, message, "".join(chunks).strip())
+
+    def _load_history(self, user_id: str) -> Optional[ConversationHistory]:
+        """Load and budget the user's history."""
+        if not user_id:
+            return None
+        return assemble_history(self.store.get_turns(user_id), self.token_budget)
+
+    def _record(self, user_id: str, message: str, response: str) -> None:
+        """Store a completed exchange."""
+        if not user_id or not response:
+            return
+        now = time.time()
+        try:
+            self.store.append_turns(user_id, [
+                ConversationTurn("user", message, now),
+                ConversationTurn("model", response, now),
+            ])
+        except Exception as e:
+            logger.warning("Failed to store conversation: %s", e, extra={"user_id": user_id})
@@ -0,0 +1,158 @@
+"""
+Request deadlines.
+Following Open/Closed Principle - holds any ChatServiceInterface to the client's deadline without modifying it.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils import metrics
+from ..utils.exceptions import DeadlineExceededError
+from ..utils.request_context import get_request_options
+from .interfaces import ChatServiceInterface
+
+
+class DeadlineChatService(ChatServiceInterface):
+    """
+    Chat service decorator enforcing the request deadline.
+
+    Requests arriving with less than ``min_remaining`` seconds left are
+    rejected without an upstream call. With less than ``brief_below``
+    seconds left, the answer is degraded: ``context["brief"]`` asks for a
+    short reply and the output cap drops to ``brief_max_tokens``. Work
+    still running at the deadline is cancelled (closing the upstream
+    stream) and raises DeadlineExceededError. Requests without a deadline
+    pass through unchanged.
+    """
+
+    def __init__(
+        self,
+        inner: ChatServiceInterface,
+        brief_below: float = 8.0,
+        brief_max_tokens: int = 256,
+        min_remaining: float = 0.5
+    ):
+        self.inner = inner
+        self.brief_below = brief_below
+        self.brief_max_tokens = brief_max_tokens
+        self.min_remaining = min_remaining
+        self.degraded = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _admit(self, context: Optional[Dict]) -> Optional[Dict]:
+        """Reject requests already out of time and mark those close to it as brief."""
+        options = get_request_options()
+        remaining = options.deadline - time.monotonic()
+        if remaining < self.min_remaining:
+            self.rejected += 1
+            metrics.REQUESTS_CANCELLED.labels(options.route, "deadline").inc()
+            raise DeadlineExceededError(max(remaining, 0.0))
+        if remaining >= self.brief_below:
+            return context
+
+        self.degraded += 1
+        metrics.REQUESTS_DEGRADED.labels(options.route).inc()
+        cap = (context or {}).get("max_output_tokens")
+        return {
+            **(context or {}),
+            "brief": True,
+            "max_output_tokens": min(cap, self.brief_max_tokens) if cap else self.brief_max_tokens
+        }
+
+    def _timed_out(self) -> DeadlineExceededError:
+        options = get_request_options()
+        self.timed_out += 1
+        metrics.REQUESTS_CANCELLED.labels(options.route, "deadline").inc()
+        return DeadlineExceededError()
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response (the synchronous path cannot be cut off, only degraded)."""
+        if get_request_options().deadline is not None:
+            context = self._admit(context)
+        return self.inner.generate_response(message, language, context, user_id, history, attachments)
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response asynchronously, cancelled at the deadline."""
+        deadline = get_request_options().deadline
+        if deadline is None:
+            return await self.inner.generate_response_async(
+                message, language, context, user_id, history, attachments
+            )
+
+        context = self._admit(context)
+        timeout = asyncio.timeout(deadline - time.monotonic())
+        try:
+            async with timeout:
+                return await self.inner.generate_response_async(
+                    message, language, context, user_id, history, attachments
+                )
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            raise self._timed_out() from None
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response, cut off at the deadline."""
+        deadline = get_request_options().deadline
+        stream = self.inner.stream_response(
+            message, language, self._admit(context) if deadline is not None else context,
+            user_id, history, attachments
+        )
+        if deadline is None:
+            async for text in stream:
+                yield text
+            return
+
+        iterator = stream.__aiter__()
+        try:
+            while True:
+                # The timeout covers each wait for a chunk, never the consumer's handling of one
+                timeout = asyncio.timeout(deadline - time.monotonic())
+                try:
+                    async with timeout:
+                        text = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    if not timeout.expired():
+                        raise
+                    raise self._timed_out() from None
+                yield text
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get deadline counters."""
+        return {
+            "degraded": self.degraded,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
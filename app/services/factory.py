@@ -0,0 +1,593 @@
+"""
+Chat service composition.
+Following Dependency Inversion Principle - routes receive a ChatServiceInterface built here.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from ..core.config import language_config, settings
+from .admission import (
+    ConcurrencyLimitedChatService,
+    ConcurrencyLimiter,
+    RateLimitedChatService,
+    SQLiteTokenBucketRateLimiter,
+    TokenBucketRateLimiter,
+)
+from .attachments import AttachmentFetcher, UploadCache
+from .budget import BudgetedChatService, SQLiteTokenLedger, TokenBudget, TokenLedger
+from .cache import CachedChatService, ResponseCache, SQLiteResponseCache
+from .coalescing import CoalescingChatService
+from .deadline import DeadlineChatService
+from .fake_service import FakeChatService
+from .idempotency import IdempotencyGuard
+from .conversation import (
+    ConversationalChatService,
+    InMemoryConversationStore,
+    SQLiteConversationStore,
+)
+from .interfaces import (
+    ChatServiceInterface,
+    ConversationStoreInterface,
+    JobStoreInterface,
+    ResponseCacheInterface,
+)
+from .jobs import InMemoryJobStore, JobManager, SQLiteJobStore
+from .knowledge import KnowledgeBase, KnowledgeChatService
+from .poi import LocationAwareChatService, POIDirectory
+from .resilience import CircuitBreaker, ResilientChatService, RetryPolicy
+from .routing import TIER_FAST, TIER_STRONG, ModelRouterChatService
+from .sessions import SessionRegistry
+
+if TYPE_CHECKING:
+    # The Gemini backend (and its SDK) is imported only when it is built
+    from google import genai
+
+    from .prompts import PromptRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatComponents:
+    """Worker-scoped chat service and the layers it is composed of."""
+    chat_service: ChatServiceInterface
+    prompt_registries: Dict[str, "PromptRegistry"] = field(default_factory=dict)
+    model_router: Optional[ModelRouterChatService] = None
+    response_cache: Optional[ResponseCacheInterface] = None
+    coalescer: Optional[CoalescingChatService] = None
+    conversation_store: Optional[ConversationStoreInterface] = None
+    concurrency_limiter: Optional[ConcurrencyLimiter] = None
+    rate_limiter: Optional[TokenBucketRateLimiter] = None
+    token_budget: Optional[TokenBudget] = None
+    deadline: Optional[DeadlineChatService] = None
+    resilience: Optional[ResilientChatService] = None
+    attachment_fetcher: Optional[AttachmentFetcher] = None
+    upload_cache: Optional[UploadCache] = None
+    poi_directory: Optional[POIDirectory] = None
+    knowledge: Optional[KnowledgeBase] = None
+    sessions: Optional[SessionRegistry] = None
+    jobs: Optional[JobManager] = None
+    idempotency: Optional[IdempotencyGuard] = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get statistics from every layer that keeps them."""
+        stats: Dict[str, Any] = {}
+        if len(self.prompt_registries) == 1:
+            stats["prompts"] = next(iter(self.prompt_registries.values())).stats()
+        elif self.prompt_registries:
+            stats["prompts"] = {tier: registry.stats() for tier, registry in self.prompt_registries.items()}
+        if self.model_router is not None:
+            stats["model_router"] = self.model_router.stats()
+        if self.response_cache is not None:
+            stats["response_cache"] = self.response_cache.stats()
+        if self.coalescer is not None:
+            stats["coalescing"] = self.coalescer.stats()
+        if self.conversation_store is not None:
+            stats["conversations"] = self.conversation_store.stats()
+        if self.concurrency_limiter is not None:
+            stats["concurrency"] = self.concurrency_limiter.stats()
+        if self.rate_limiter is not None:
+            stats["rate_limit"] = self.rate_limiter.stats()
+        if self.token_budget is not None:
+            stats["token_budget"] = self.token_budget.stats()
+        if self.deadline is not None:
+            stats["deadline"] = self.deadline.stats()
+        if self.resilience is not None:
+            stats["resilience"] = self.resilience.stats()
+        if self.attachment_fetcher is not None:
+            stats["attachments"] = self.attachment_fetcher.stats()
+        if self.upload_cache is not None:
+            stats["uploads"] = self.upload_cache.stats()
+        if self.poi_directory is not None:
+            stats["pois"] = self.poi_directory.stats()
+        if self.knowledge is not None:
+            stats["knowledge"] = self.knowledge.stats()
+        if self.sessions is not None:
+            stats["websocket"] = self.sessions.stats()
+        if self.jobs is not None:
+            stats["jobs"] = self.jobs.stats()
+        if self.idempotency is not None:
+            stats["idempotency"] = self.idempotency.stats()
+        return stats
+
+    async def start(self, client: Optional["genai.Client"]) -> None:
+        """Start background work owned by the layers."""
+        if client is not None:
+            for prompt_registry in self.prompt_registries.values():
+                await prompt_registry.start(client)
+        if self.poi_directory is not None:
+            await self.poi_directory.start()
+        if self.jobs is not None:
+            await self.jobs.start()
+
+    async def aclose(self) -> None:
+        """Release resources held by the layers."""
+        if self.jobs is not None:
+            await self.jobs.stop()
+        if self.sessions is not None:
+            await self.sessions.aclose()
+        for prompt_registry in self.prompt_registries.values():
+            await prompt_registry.stop()
+        if self.poi_directory is not None:
+            await self.poi_directory.stop()
+        if self.attachment_fetcher is not None:
+            await self.attachment_fetcher.aclose()
+        if self.knowledge is not None:
+            self.knowledge.close()
+        token_ledger = self.token_budget.ledger if self.token_budget is not None else None
+        job_store = self.jobs.store if self.jobs is not None else None
+        idempotency_store = self.idempotency.store if self.idempotency is not None else None
+        stores = (
+            self.conversation_store,
+            self.response_cache,
+            self.rate_limiter,
+            token_ledger,
+            job_store,
+            idempotency_store,
+        )
+        for store in stores:
+            if isinstance(
+                store,
+                (
+                    SQLiteConversationStore,
+                    SQLiteResponseCache,
+                    SQLiteTokenBucketRateLimiter,
+                    SQLiteTokenLedger,
+                    SQLiteJobStore,
+                )
+            ):
+                store.close()
+
+
+def create_response_cache() -> Optional[ResponseCacheInterface]:
+    """
+    Build the response cache from settings.
+
+    Returns:
+        Response cache (in memory, or shared across workers in SQLite), or None when caching is disabled
+    """
+    if not settings.response_cache_enabled:
+        return None
+
+    limits = dict(
+        max_entries=settings.response_cache_max_entries,
+        max_bytes=settings.response_cache_max_bytes,
+        ttl=settings.response_cache_ttl,
+    )
+    if settings.response_cache_backend == "sqlite":
+        return SQLiteResponseCache(
+            settings.response_cache_db_path, busy_timeout=settings.sqlite_busy_timeout, **limits
+        )
+    return ResponseCache(**limits)
+
+
+def create_idempotency_guard() -> Optional[IdempotencyGuard]:
+    """
+    Build the idempotent-request guard from settings.
+
+    Returns:
+        Guard whose replay store is in memory or shared across workers in SQLite, or None when disabled
+    """
+    if not settings.idempotency_enabled:
+        return None
+
+    limits = dict(
+        max_entries=settings.idempotency_max_entries,
+        max_bytes=settings.idempotency_max_bytes,
+        ttl=settings.idempotency_ttl,
+    )
+    if settings.idempotency_backend == "sqlite":
+        store: ResponseCacheInterface = SQLiteResponseCache(
+            settings.idempotency_db_path, busy_timeout=settings.sqlite_busy_timeout, **limits
+        )
+    else:
+        store = ResponseCache(**limits)
+    return IdempotencyGuard(
+        store,
+        ttl=settings.idempotency_ttl,
+        abandon_grace=settings.idempotency_abandon_grace,
+        derived_ttl=settings.idempotency_derived_ttl
+    )
+
+
+def create_rate_limiter() -> Optional[TokenBucketRateLimiter]:
+    """
+    Build the per-user rate limiter from settings.
+
+    Returns:
+        Rate limiter (in memory, or shared across workers in SQLite), or None when rate limiting is disabled
+    """
+    if not settings.rate_limit_enabled:
+        return None
+
+    rate = settings.rate_limit_per_minute / 60
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteTokenBucketRateLimiter(
+            settings.rate_limit_db_path,
+            rate=rate,
+            burst=settings.rate_limit_burst,
+            busy_timeout=settings.sqlite_busy_timeout
+        )
+    return TokenBucketRateLimiter(rate=rate, burst=settings.rate_limit_burst)
+
+
+def create_token_ledger() -> Optional[TokenLedger]:
+    """
+    Build the per-user token ledger from settings.
+
+    Returns:
+        Token ledger (in memory, or shared across workers in SQLite), or None when usage is not tracked
+    """
+    if settings.token_ledger_backend == "memory":
+        return TokenLedger(window=settings.token_quota_window)
+    if settings.token_ledger_backend == "sqlite":
+        return SQLiteTokenLedger(
+            settings.token_ledger_db_path,
+            window=settings.token_quota_window,
+            busy_timeout=settings.sqlite_busy_timeout
+        )
+    return None
+
+
+def create_token_budget(ledger: Optional[TokenLedger]) -> TokenBudget:
+    """Build the token budget (output caps, input limit and quotas) from settings."""
+    return TokenBudget(
+        ledger,
+        quota=settings.token_quota,
+        max_input_tokens=settings.token_max_input,
+        output_cap=settings.token_output_cap,
+        language_caps=settings.token_language_output_caps,
+        route_caps=settings.token_route_output_caps
+    )
+
+
+def create_conversation_store() -> Optional[ConversationStoreInterface]:
+    """
+    Build the conversation store from settings.
+
+    Returns:
+        Conversation store, or None when conversation memory is disabled
+    """
+    limits = dict(
+        max_turns_per_user=settings.conversation_max_turns,
+        max_bytes_per_user=settings.conversation_max_user_bytes,
+        max_total_bytes=settings.conversation_max_total_bytes,
+        idle_ttl=settings.conversation_idle_ttl,
+    )
+
+    if settings.conversation_backend == "memory":
+        return InMemoryConversationStore(**limits)
+    if settings.conversation_backend == "sqlite":
+        return SQLiteConversationStore(
+            settings.conversation_db_path, busy_timeout=settings.sqlite_busy_timeout, **limits
+        )
+    return None
+
+
+def create_job_store() -> JobStoreInterface:
+    """
+    Build the job record store from settings.
+
+    Returns:
+        Job store (in memory, or shared across workers in SQLite)
+    """
+    if settings.job_backend == "sqlite":
+        return SQLiteJobStore(
+            settings.job_db_path, max_jobs=settings.job_max_stored, busy_timeout=settings.sqlite_busy_timeout
+        )
+    return InMemoryJobStore(max_jobs=settings.job_max_stored)
+
+
+def create_job_manager(
+    chat_service: ChatServiceInterface,
+    attachment_fetcher: AttachmentFetcher
+) -> Optional[JobManager]:
+    """
+    Build the background job runner from settings.
+
+    Args:
+        chat_service: Fully composed chat service jobs are run through
+        attachment_fetcher: Fetcher for job attachments
+
+    Returns:
+        Job manager, or None when asynchronous jobs are disabled
+    """
+    if not settings.jobs_enabled:
+        return None
+
+    return JobManager(
+        chat_service,
+        create_job_store(),
+        attachment_fetcher=attachment_fetcher,
+        workers=settings.job_workers,
+        max_queue=settings.job_max_queue,
+        result_ttl=settings.job_result_ttl,
+        webhook_timeout=settings.job_webhook_timeout,
+        webhook_attempts=settings.job_webhook_attempts,
+        webhook_secret=settings.job_webhook_secret,
+        webhook_allowed_hosts=settings.job_webhook_allowed_hosts
+    )
+
+
+def create_attachment_fetcher() -> AttachmentFetcher:
+    """Build the attachment fetcher from settings."""
+    return AttachmentFetcher(
+        max_bytes=settings.attachment_max_bytes,
+        max_count=settings.attachment_max_count,
+        timeout=settings.attachment_fetch_timeout,
+        allowed_hosts=settings.attachment_allowed_hosts
+    )
+
+
+def create_poi_directory() -> Optional[POIDirectory]:
+    """
+    Build the nearby-places directory from settings and load its dataset.
+
+    Returns:
+        POI directory, or None when location context is disabled
+    """
+    if not settings.poi_enabled:
+        return None
+
+    directory = POIDirectory(
+        settings.poi_data_path,
+        radius_km=settings.poi_radius_km,
+        max_results=settings.poi_max_results,
+        cell_degrees=settings.poi_cell_degrees,
+        reload_interval=settings.poi_reload_interval
+    )
+    try:
+        directory.load()
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        # Serve without nearby places; the watcher loads the file once it changes
+        logger.warning("Could not load POI dataset: %s", e, extra={"path": settings.poi_data_path})
+    return directory
+
+
+def create_knowledge_base() -> Optional[KnowledgeBase]:
+    """
+    Build the knowledge base from settings and open its indexes.
+
+    Returns:
+        Knowledge base, or None when it is disabled
+    """
+    if not settings.knowledge_enabled:
+        return None
+
+    knowledge = KnowledgeBase(
+        Path(settings.knowledge_data_dir),
+        Path(settings.knowledge_index_dir),
+        fallback_language=language_config.DEFAULT_LANGUAGE,
+        answer_threshold=settings.knowledge_answer_threshold,
+        ground_threshold=settings.knowledge_ground_threshold,
+        max_passages=settings.knowledge_max_passages
+    )
+    knowledge.load()
+    return knowledge
+
+
+def create_model_service(
+    client: Optional["genai.Client"],
+    model: str,
+    upload_cache: Optional[UploadCache] = None,
+    usage_ledger: Optional[TokenLedger] = None
+) -> Tuple[ChatServiceInterface, Optional["PromptRegistry"]]:
+    """
+    Build the backend for one model, as selected by ``CHAT_BACKEND``.
+
+    Args:
+        client: Shared Gemini client (unused by the fake backend)
+        model: Gemini model name
+        upload_cache: Cache of attachment uploads for the Gemini backend
+        usage_ledger: Per-user token ledger the backend records usage in
+
+    Returns:
+        Tuple of backend service and its prompt registry, if any
+    """
+    if settings.chat_backend == "fake":
+        return FakeChatService(
+            first_chunk_ms=settings.fake_first_chunk_ms,
+            sigma=settings.fake_latency_sigma,
+            chunk_interval_ms=settings.fake_chunk_interval_ms,
+            chunks=settings.fake_chunks,
+            error_rate=settings.fake_error_rate,
+            model=f"fake-{model}",
+            usage_ledger=usage_ledger
+        ), None
+
+    from .gemini_service import GeminiChatService
+    from .prompts import PromptRegistry
+
+    prompt_registry = PromptRegistry(
+        model,
+        cache_enabled=settings.context_cache_enabled,
+        cache_ttl=settings.context_cache_ttl,
+        refresh_margin=settings.context_cache_refresh_margin,
+        min_cache_tokens=settings.context_cache_min_tokens
+    )
+    service = GeminiChatService(
+        client,
+        prompt_registry,
+        uploads=upload_cache,
+        inline_max_bytes=settings.attachment_inline_max_bytes,
+        model=model,
+        usage_ledger=usage_ledger
+    )
+    return service, prompt_registry
+
+
+def create_backend_service(
+    client: Optional["genai.Client"],
+    upload_cache: Optional[UploadCache] = None,
+    usage_ledger: Optional[TokenLedger] = None
+) -> Tuple[ChatServiceInterface, Dict[str, "PromptRegistry"], Optional[ModelRouterChatService]]:
+    """
+    Build the innermost chat service: one model, or a router across the fast and strong models.
+
+    Args:
+        client: Shared Gemini client (unused by the fake backend)
+        upload_cache: Cache of attachment uploads for the Gemini backend
+        usage_ledger: Per-user token ledger the backends record usage in
+
+    Returns:
+        Tuple of backend service, prompt registries by tier and the router, if any
+    """
+    tiers = {TIER_STRONG: settings.gemini_model}
+    if settings.model_router_enabled and settings.gemini_fast_model != settings.gemini_model:
+        tiers[TIER_FAST] = settings.gemini_fast_model
+
+    services: Dict[str, ChatServiceInterface] = {}
+    prompt_registries: Dict[str, "PromptRegistry"] = {}
+    for tier, model in tiers.items():
+        services[model], prompt_registry = create_model_service(client, model, upload_cache, usage_ledger)
+        if prompt_registry is not None:
+            prompt_registries[tier] = prompt_registry
+
+    if len(services) == 1:
+        return services[settings.gemini_model], prompt_registries, None
+
+    router = ModelRouterChatService(
+        services,
+        fast_model=settings.gemini_fast_model,
+        strong_model=settings.gemini_model,
+        fast_max_chars=settings.router_fast_max_chars,
+        first_chunk_timeout=settings.router_first_chunk_timeout,
+        max_error_rate=settings.router_max_error_rate,
+        slow_first_chunk=settings.router_slow_first_chunk,
+        min_samples=settings.router_min_samples,
+        recovery_timeout=settings.router_recovery_timeout
+    )
+    return router, prompt_registries, router
+
+
+def create_chat_components(client: Optional["genai.Client"]) -> ChatComponents:
+    """
+    Build the chat service used by every request in this worker.
+
+    Layers, outermost first: conversation memory, per-user rate limit,
+    token budget, request deadline, nearby places, curated knowledge,
+    response cache, single-flight coalescing, retries/hedging/circuit
+    breaker, global concurrency limit, model router, backend (Gemini or the
+    local fake).
+
+    Args:
+        client: Shared Gemini client, or None with the fake backend
+
+    Returns:
+        Chat service and its layers
+    """
+    upload_cache = UploadCache(ttl=settings.attachment_upload_ttl)
+    token_budget = create_token_budget(create_token_ledger())
+    service, prompt_registries, model_router = create_backend_service(client, upload_cache, token_budget.ledger)
+
+    concurrency_limiter = ConcurrencyLimiter(
+        max_in_flight=settings.max_in_flight,
+        max_queue=settings.max_queue,
+        queue_timeout=settings.queue_timeout
+    )
+    service = ConcurrencyLimitedChatService(service, concurrency_limiter)
+
+    resilience = ResilientChatService(
+        service,
+        retry_policy=RetryPolicy(
+            max_attempts=settings.retry_max_attempts,
+            base_delay=settings.retry_base_delay,
+            max_delay=settings.retry_max_delay
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=settings.breaker_failure_threshold,
+            recovery_timeout=settings.breaker_recovery_timeout
+        ),
+        hedge_percentile=settings.hedge_percentile if settings.hedge_enabled else None,
+        hedge_min_samples=settings.hedge_min_samples
+    )
+    service = resilience
+
+    coalescer = None
+    if settings.coalescing_enabled:
+        coalescer = CoalescingChatService(service)
+        service = coalescer
+
+    response_cache = create_response_cache()
+    if response_cache is not None:
+        service = CachedChatService(
+            service, response_cache, standalone_follow_ups=settings.response_cache_standalone_follow_ups
+        )
+
+    knowledge = create_knowledge_base()
+    if knowledge is not None:
+        service = KnowledgeChatService(service, knowledge)
+
+    poi_directory = create_poi_directory()
+    if poi_directory is not None:
+        service = LocationAwareChatService(service, poi_directory)
+
+    deadline = DeadlineChatService(
+        service,
+        brief_below=settings.deadline_brief_below,
+        brief_max_tokens=settings.deadline_brief_max_tokens,
+        min_remaining=settings.deadline_min_remaining
+    )
+    service = BudgetedChatService(deadline, token_budget)
+
+    rate_limiter = create_rate_limiter()
+    if rate_limiter is not None:
+        service = RateLimitedChatService(service, rate_limiter)
+
+    conversation_store = create_conversation_store()
+    if conversation_store is not None:
+        service = ConversationalChatService(
+            service,
+            conversation_store,
+            token_budget=settings.conversation_history_tokens
+        )
+
+    attachment_fetcher = create_attachment_fetcher()
+
+    return ChatComponents(
+        chat_service=service,
+        prompt_registries=prompt_registries,
+        model_router=model_router,
+        response_cache=response_cache,
+        coalescer=coalescer,
+        conversation_store=conversation_store,
+        concurrency_limiter=concurrency_limiter,
+        rate_limiter=rate_limiter,
+        token_budget=token_budget,
+        deadline=deadline,
+        resilience=resilience,
+        attachment_fetcher=attachment_fetcher,
+        upload_cache=upload_cache if settings.chat_backend == "gemini" else None,
+        poi_directory=poi_directory,
+        knowledge=knowledge,
+        sessions=SessionRegistry(
+            ttl=settings.ws_session_ttl,
+            replay_size=settings.ws_replay_buffer,
+            max_sessions=settings.ws_max_sessions
+        ),
+        jobs=create_job_manager(service, attachment_fetcher),
+        idempotency=create_idempotency_guard()
+    )
@@ -0,0 +1,165 @@
+"""
+Local fake chat backend.
+Following Liskov Substitution Principle - a drop-in ChatServiceInterface that needs no API key or network.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils import metrics
+from ..utils.exceptions import UpstreamServiceError
+from ..utils.tokens import estimate_tokens
+from .budget import TokenLedger, estimate_input_tokens
+from .interfaces import ChatServiceInterface
+
+logger = logging.getLogger(__name__)
+
+FAKE_MODEL = "fake"
+
+_WORDS = {
+    "english": "drive safely keep distance check tyres rest every two hours at a safe stop".split(),
+    "urdu": "احتیاط سے گاڑی چلائیں فاصلہ رکھیں ٹائر چیک کریں ہر دو گھنٹے آرام کریں".split(),
+}
+
+
+class FakeChatService(ChatServiceInterface):
+    """
+    Simulated Gemini backend for load testing and local development.
+
+    Time to first chunk follows a log-normal distribution around
+    ``first_chunk_ms`` (spread ``sigma``); the remaining chunks arrive every
+    ``chunk_interval_ms`` with ±50% jitter. ``error_rate`` of calls fail with
+    a retryable upstream error before the first chunk. Output stops at
+    ``context["max_output_tokens"]`` and estimated usage is recorded in
+    ``usage_ledger``, as the Gemini backend does with reported usage.
+    """
+
+    def __init__(
+        self,
+        first_chunk_ms: float = 400.0,
+        sigma: float = 0.5,
+        chunk_interval_ms: float = 40.0,
+        chunks: int = 12,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        model: str = FAKE_MODEL,
+        usage_ledger: Optional[TokenLedger] = None
+    ):
+        self.first_chunk_ms = first_chunk_ms
+        self.sigma = sigma
+        self.chunk_interval_ms = chunk_interval_ms
+        self.chunks = chunks
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.model = model
+        self.usage_ledger = usage_ledger
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a simulated response, blocking for the simulated latency."""
+        delays, parts = self._plan(language)
+        if parts is None:
+            time.sleep(delays[0])
+            raise self._simulated_error()
+        for delay in delays:
+            time.sleep(delay)
+        return "".join(parts).strip()
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a simulated response."""
+        chunks = [
+            text async for text in self.stream_response(
+                message, language, context, user_id, history, attachments
+            )
+        ]
+        return "".join(chunks).strip()
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream simulated chunks with realistic pacing."""
+        started = time.perf_counter()
+        delays, parts = self._plan(language)
+        if parts is None:
+            await asyncio.sleep(delays[0])
+            raise self._simulated_error()
+
+        max_output_tokens = (context or {}).get("max_output_tokens")
+        output_tokens = 0
+        try:
+            for index, (delay, text) in enumerate(zip(delays, parts)):
+                if max_output_tokens and output_tokens >= max_output_tokens:
+                    metrics.UPSTREAM_MAX_TOKENS.labels(self.model, language).inc()
+                    break
+                await asyncio.sleep(delay)
+                if index == 0:
+                    metrics.UPSTREAM_FIRST_CHUNK.labels(self.model, language).observe(
+                        time.perf_counter() - started
+                    )
+                output_tokens += estimate_tokens(text)
+                yield text
+
+            metrics.UPSTREAM_LATENCY.labels(self.model, language).observe(time.perf_counter() - started)
+            metrics.UPSTREAM_CHUNKS.labels(self.model).observe(len(parts))
+        except (GeneratorExit, asyncio.CancelledError):
+            metrics.UPSTREAM_CANCELLED.labels(self.model).inc()
+            raise
+        finally:
+            if self.usage_ledger is not None:
+                self.usage_ledger.record(
+                    user_id, estimate_input_tokens(message, language, history, attachments), output_tokens
+                )
+
+    def _plan(self, language: str) -> Tuple[List[float], Optional[List[str]]]:
+        """
+        Draw chunk delays and texts for one call.
+
+        Returns:
+            Tuple of per-chunk delays in seconds and chunk texts; texts are
+            None when the call should fail after the first delay
+        """
+        first_delay = self._random.lognormvariate(0, self.sigma) * self.first_chunk_ms / 1000
+        if self._random.random() < self.error_rate:
+            return [first_delay / 2], None
+
+        delays = [first_delay] + [
+            self.chunk_interval_ms / 1000 * self._random.uniform(0.5, 1.5)
+            for _ in range(self.chunks - 1)
+        ]
+        words = _WORDS.get(language, _WORDS["english"])
+        parts = [
+            " ".join(self._random.choice(words) for _ in range(3)) + " "
+            for _ in range(self.chunks)
+        ]
+        return delays, parts
+
+    @staticmethod
+    def _simulated_error() -> UpstreamServiceError:
+        logger.warning("Fake backend returning a simulated upstream error")
+        return UpstreamServiceError("Simulated upstream error", retryable=True, status_code=503)
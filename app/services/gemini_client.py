@@ -0,0 +1,163 @@
+"""
+Gemini client lifecycle management.
+Following Single Responsibility Principle - handles only the shared Gemini client and its connection pool.
+"""
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import httpx
+
+from ..core.config import settings
+
+if TYPE_CHECKING:
+    # The SDK takes about half a second to import, so it is loaded when the client is created
+    from google import genai
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClientManager:
+    """
+    Owns the process-wide Gemini client.
+
+    One client is created per worker process so that every request reuses the
+    same keep-alive HTTP connection pool instead of paying for a new session
+    and TLS handshake.
+    """
+
+    def __init__(self):
+        self._client: Optional["genai.Client"] = None
+
+    @property
+    def is_started(self) -> bool:
+        """Whether the client has been created."""
+        return self._client is not None
+
+    @property
+    def client(self) -> "genai.Client":
+        """Get the shared client, creating it on first use."""
+        if self._client is None:
+            self.start()
+        return self._client
+
+    def start(self) -> "genai.Client":
+        """
+        Import the SDK and create the shared Gemini client with a tuned connection pool.
+
+        Returns:
+            The shared client instance
+        """
+        if self._client is not None:
+            return self._client
+
+        from google import genai
+        from google.genai import types
+
+        limits = httpx.Limits(
+            max_connections=settings.gemini_max_connections,
+            max_keepalive_connections=settings.gemini_max_keepalive_connections,
+            keepalive_expiry=settings.gemini_keepalive_expiry,
+        )
+        http_options = types.HttpOptions(
+            client_args={"limits": limits},
+            async_client_args={"limits": limits},
+        )
+
+        try:
+            self._client = genai.Client(
+                api_key=settings.gemini_api_key,
+                http_options=http_options
+            )
+            logger.info(
+                "Gemini client initialized (max_connections=%s, max_keepalive=%s)",
+                limits.max_connections,
+                limits.max_keepalive_connections
+            )
+        except Exception as e:
+            logger.error("Failed to initialize Gemini client: %s", e)
+            raise
+
+        return self._client
+
+    async def warm_up(self, model: str) -> bool:
+        """
+        Open a connection to the API ahead of the first chat request.
+
+        Fetches the model's metadata through the async client, which leaves a
+        TLS connection in the keep-alive pool and checks the key and model.
+
+        Args:
+            model: Model to look up
+
+        Returns:
+            True if the request succeeded; failures are logged and left for
+            the first chat request to surface
+        """
+        started = time.perf_counter()
+        try:
+            await self.client.aio.models.get(model=model)
+        except Exception as e:
+            logger.warning("Gemini warm-up request failed: %s", e, extra={"model": model})
+            return False
+        logger.info(
+            "Gemini connection warmed up in %.0f ms", (time.perf_counter() - started) * 1000,
+            extra={"model": model}
+        )
+        return True
+
+    async def aclose(self) -> None:
+        """Close both the sync and async connection pools."""
+        if self._client is None:
+            return
+
+        api_client = self._client._api_client
+        try:
+            api_client._httpx_client.close()
+            await api_client._async_httpx_client.aclose()
+            logger.info("Gemini client closed")
+        except Exception as e:
+            logger.warning("Error while closing Gemini client: %s", e)
+        finally:
+            self._client = None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Get connection pool usage for health reporting.
+
+        Returns:
+            Dictionary with pool limits and connection counts
+        """
+        stats: Dict[str, Any] = {
+            "started": self.is_started,
+            "max_connections": settings.gemini_max_connections,
+            "max_keepalive_connections": settings.gemini_max_keepalive_connections,
+        }
+        if self._client is None:
+            return stats
+
+        api_client = self._client._api_client
+        stats["sync"] = self._describe_pool(api_client._httpx_client)
+        stats["async"] = self._describe_pool(api_client._async_httpx_client)
+        return stats
+
+    @staticmethod
+    def _describe_pool(http_client: Any) -> Dict[str, int]:
+        """Summarize an httpx client's connection pool."""
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        if pool is None:
+            return {}
+
+        connections = list(pool.connections)
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "pending_requests": len(getattr(pool, "_requests", [])),
+        }
+
+
+# Global client manager instance (one per worker process)
+gemini_client_manager = GeminiClientManager()
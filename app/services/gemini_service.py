@@ -3,37 +3,94 @@ Gemini AI service implementation.
 Following Single Responsibility Principle - handles only Gemini AI interactions.
 """
 
+import asyncio
+import dataclasses
+import io
 import logging
-from typing import Dict, Optional
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 
-from ..core.config import settings, language_config
+from ..core.config import settings
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from .gemini_client import gemini_client_manager
+from .attachments import UploadCache
+from .budget import TokenLedger, usage_from_metadata
 from .interfaces import ChatServiceInterface
+from ..utils import metrics
+from ..utils.exceptions import UpstreamServiceError
+from .prompts import PromptRegistry, PromptRequest
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Upstream HTTP statuses worth retrying
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Statuses meaning a cached instruction or uploaded file is gone or invalid; only these retry inline
+STALE_REFERENCE_STATUS_CODES = {400, 404}
+
+
+def _to_upstream_error(error: Exception) -> UpstreamServiceError:
+    """Classify a Gemini SDK or transport error."""
+    if isinstance(error, UpstreamServiceError):
+        return error
+    
+    if isinstance(error, errors.APIError):
+        return UpstreamServiceError(
+            f"Error generating response: {str(error)}",
+            retryable=error.code in RETRYABLE_STATUS_CODES,
+            status_code=error.code
+        )
+    
+    if isinstance(error, httpx.TransportError):
+        return UpstreamServiceError(f"Error generating response: {str(error)}", retryable=True)
+    
+    return UpstreamServiceError(f"Error generating response: {str(error)}")
+
 
 class GeminiChatService(ChatServiceInterface):
     """Gemini AI chat service implementation."""
     
-    def __init__(self):
-        """Initialize Gemini client."""
-        try:
-            self.client = genai.Client(api_key=settings.gemini_api_key)
-            self.model = settings.gemini_model
-            logger.info("Gemini client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini client: {str(e)}")
-            raise
+    def __init__(
+        self, 
+        client: Optional[genai.Client] = None, 
+        prompts: Optional[PromptRegistry] = None,
+        uploads: Optional[UploadCache] = None,
+        inline_max_bytes: int = 512 * 1024,
+        model: Optional[str] = None,
+        usage_ledger: Optional[TokenLedger] = None
+    ):
+        """
+        Initialize the service.
+        
+        Args:
+            client: Gemini client to use (defaults to the shared pooled client)
+            prompts: Precompiled system instructions (built on demand if omitted)
+            uploads: Cache of uploaded attachments (attachments are sent inline if omitted)
+            inline_max_bytes: Attachments up to this size are sent inline, larger ones uploaded
+            model: Gemini model to call (defaults to ``GEMINI_MODEL``)
+            usage_ledger: Per-user token ledger to record each call's usage in
+        """
+        self.client = client or gemini_client_manager.client
+        self.model = model or settings.gemini_model
+        self.prompts = prompts or PromptRegistry(self.model)
+        self.uploads = uploads
+        self.inline_max_bytes = inline_max_bytes
+        self.usage_ledger = usage_ledger
     
     def generate_response(
         self, 
         message: str, 
         language: str, 
         context: Optional[Dict] = None, 
-        user_id: str = ""
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
     ) -> str:
         """
         Generate AI response using Google Gemini.
@@ -43,55 +100,286 @@ class GeminiChatService(ChatServiceInterface):
             language: Language code for response
             context: Additional context information
             user_id: User identifier for logging
+            history: Prior conversation to include
+            attachments: Fetched attachments to send with the message
             
         Returns:
             Generated response text
             
         Raises:
-            Exception: If response generation fails
+            UpstreamServiceError: If response generation fails
         """
+        usage_metadata = None
         try:
-            # Get system instruction based on language
-            system_instruction_text = language_config.get_system_instruction(language)
-            
-            # Add context information if available
-            if context:
-                context_info = self._format_context(context)
-                system_instruction_text += context_info
-            
-            # Create system instruction
-            system_instruction = types.Content(
-                role="system",
-                parts=[types.Part(text=system_instruction_text)]
-            )
-            
-            # Create user message
-            user_content = types.Content(
-                role="user",
-                parts=[types.Part(text=message)]
-            )
-            
-            # Generate configuration
-            config = types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                response_mime_type="text/plain"
-            )
+            attachment_parts = self._attachment_parts_sync(attachments)
+            contents, prompt = self._build_request(message, language, context, history, attachment_parts)
             
             # Generate response
             response_text = ""
             for chunk in self.client.models.generate_content_stream(
                 model=self.model,
-                contents=[user_content],
-                config=config,
+                contents=contents,
+                config=prompt.config,
             ):
                 response_text += chunk.text or ""
+                usage_metadata = chunk.usage_metadata or usage_metadata
             
-            logger.info(f"Generated response for user {user_id} in {language}")
+            logger.debug("Generated response", extra={"user_id": user_id, "language": language})
             return response_text.strip()
             
         except Exception as e:
-            logger.error(f"Error generating response for user {user_id}: {str(e)}")
-            raise Exception(f"Error generating response: {str(e)}")
+            # Logged once by the route that handles the error
+            raise _to_upstream_error(e) from e
+        
+        finally:
+            self._record_usage(user_id, usage_metadata)
+    
+    async def generate_response_async(
+        self, 
+        message: str, 
+        language: str, 
+        context: Optional[Dict] = None, 
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """
+        Generate AI response using the Gemini async client.
+        
+        Uses ``client.aio`` so the event loop keeps serving other requests
+        while waiting on the upstream stream.
+        
+        Args:
+            message: The user message
+            language: Language code for response
+            context: Additional context information
+            user_id: User identifier for logging
+            history: Prior conversation to include
+            attachments: Fetched attachments to send with the message
+            
+        Returns:
+            Generated response text
+            
+        Raises:
+            UpstreamServiceError: If response generation fails
+        """
+        chunks = [
+            text async for text in self.stream_response(
+                message, language, context, user_id, history, attachments
+            )
+        ]
+        return "".join(chunks).strip()
+    
+    async def stream_response(
+        self, 
+        message: str, 
+        language: str, 
+        context: Optional[Dict] = None, 
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream AI response chunks from Gemini as they arrive.
+        
+        Args:
+            message: The user message
+            language: Language code for response
+            context: Additional context information
+            user_id: User identifier for logging
+            history: Prior conversation to include
+            attachments: Fetched attachments to send with the message
+            
+        Yields:
+            Response text chunks
+            
+        Raises:
+            UpstreamServiceError: If response generation fails
+        """
+        started = time.perf_counter()
+        in_flight = metrics.UPSTREAM_IN_FLIGHT.labels(self.model)
+        in_flight.inc()
+        usage_metadata = None
+        stream = None
+        try:
+            attachment_parts = await self._attachment_parts(attachments)
+            contents, prompt = self._build_request(message, language, context, history, attachment_parts)
+            
+            try:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.model,
+                    contents=contents,
+                    config=prompt.config,
+                )
+            except errors.APIError as e:
+                uploaded = self._uploaded(attachments)
+                if e.code not in STALE_REFERENCE_STATUS_CODES or (not prompt.uses_cache and not uploaded):
+                    raise
+                # Cached instruction or uploaded file expired upstream; retry without them
+                self.prompts.invalidate(language)
+                for attachment in uploaded:
+                    self.uploads.invalidate(attachment.sha256)
+                attachment_parts = await self._attachment_parts(attachments)
+                contents, prompt = self._build_request(message, language, context, history, attachment_parts)
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.model,
+                    contents=contents,
+                    config=prompt.config,
+                )
+            
+            chunk_count = 0
+            finish_reason = None
+            async for chunk in stream:
+                if chunk_count == 0:
+                    metrics.UPSTREAM_FIRST_CHUNK.labels(self.model, language).observe(
+                        time.perf_counter() - started
+                    )
+                chunk_count += 1
+                usage_metadata = chunk.usage_metadata or usage_metadata
+                if chunk.candidates:
+                    finish_reason = chunk.candidates[0].finish_reason or finish_reason
+                if chunk.text:
+                    yield chunk.text
+            
+            metrics.UPSTREAM_LATENCY.labels(self.model, language).observe(time.perf_counter() - started)
+            metrics.UPSTREAM_CHUNKS.labels(self.model).observe(chunk_count)
+            metrics.record_usage(self.model, language, usage_metadata)
+            if finish_reason == types.FinishReason.MAX_TOKENS:
+                metrics.UPSTREAM_MAX_TOKENS.labels(self.model, language).inc()
+            logger.debug(
+                "Generated response",
+                extra={
+                    "user_id": user_id,
+                    "language": language,
+                    "model": self.model,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "chunks": chunk_count
+                }
+            )
+            
+        except (GeneratorExit, asyncio.CancelledError):
+            # Client went away or the deadline passed; stop the upstream generation too
+            metrics.UPSTREAM_CANCELLED.labels(self.model).inc()
+            raise
+        
+        except Exception as e:
+            # Logged once by the route that handles the error
+            raise _to_upstream_error(e) from e
+        
+        finally:
+            close = getattr(stream, "aclose", None)
+            if close is not None:
+                await close()
+            in_flight.dec()
+            # Also charges streams cut short, with the usage reported so far
+            self._record_usage(user_id, usage_metadata)
+    
+    def _record_usage(
+        self,
+        user_id: str,
+        usage_metadata: Optional[types.GenerateContentResponseUsageMetadata]
+    ) -> None:
+        """Charge a call's reported token usage to the user."""
+        if self.usage_ledger is not None:
+            self.usage_ledger.record(user_id, *usage_from_metadata(usage_metadata))
+    
+    def _build_request(
+        self, 
+        message: str, 
+        language: str, 
+        context: Optional[Dict] = None,
+        history: Optional[ConversationHistory] = None,
+        attachment_parts: Optional[List[types.Part]] = None
+    ) -> Tuple[List[types.Content], PromptRequest]:
+        """Build the contents and generation config for a request."""
+        # Only the request-specific part of the system instruction is built here
+        suffix = self._format_context(context) if context else ""
+        
+        # Add summary of older turns that did not fit the history budget
+        if history and history.summary:
+            suffix += f"\nSummary of earlier conversation: {history.summary}"
+        
+        prompt = self.prompts.build(language, suffix)
+        
+        # Output cap chosen by the token budget layer; the prebuilt configs are shared, so copy
+        max_output_tokens = context.get('max_output_tokens') if context else None
+        if max_output_tokens:
+            prompt = dataclasses.replace(
+                prompt, config=prompt.config.model_copy(update={"max_output_tokens": max_output_tokens})
+            )
+        
+        # Create user message
+        user_content = types.Content(
+            role="user",
+            parts=[*prompt.prefix_parts, *(attachment_parts or []), types.Part(text=message)]
+        )
+        
+        # Prior turns go before the new message
+        contents = []
+        if history:
+            contents = [
+                types.Content(role=turn.role, parts=[types.Part(text=turn.text)])
+                for turn in history.turns
+            ]
+        contents.append(user_content)
+        
+        return contents, prompt
+    
+    def _uploaded(self, attachments: Optional[List[AttachmentContent]]) -> List[AttachmentContent]:
+        """Attachments sent as uploaded files rather than inline."""
+        if self.uploads is None or not attachments:
+            return []
+        return [attachment for attachment in attachments if attachment.size > self.inline_max_bytes]
+    
+    async def _attachment_parts(self, attachments: Optional[List[AttachmentContent]]) -> List[types.Part]:
+        """
+        Convert attachments to content parts.
+        
+        Small attachments are sent inline; larger ones are uploaded once per
+        content hash and referenced by URI.
+        """
+        parts = []
+        for attachment in attachments or []:
+            if self.uploads is None or attachment.size <= self.inline_max_bytes:
+                parts.append(types.Part.from_bytes(data=attachment.data, mime_type=attachment.mime_type))
+                continue
+            
+            async def upload(attachment: AttachmentContent = attachment) -> Tuple[str, str]:
+                uploaded = await self.client.aio.files.upload(
+                    file=io.BytesIO(attachment.data),
+                    config=types.UploadFileConfig(
+                        mime_type=attachment.mime_type,
+                        display_name=attachment.filename
+                    )
+                )
+                return uploaded.uri, uploaded.mime_type or attachment.mime_type
+            
+            file_uri, mime_type = await self.uploads.get_or_upload(attachment.sha256, upload)
+            parts.append(types.Part.from_uri(file_uri=file_uri, mime_type=mime_type))
+        return parts
+    
+    def _attachment_parts_sync(self, attachments: Optional[List[AttachmentContent]]) -> List[types.Part]:
+        """Blocking variant of ``_attachment_parts`` for the synchronous path."""
+        parts = []
+        for attachment in attachments or []:
+            if self.uploads is None or attachment.size <= self.inline_max_bytes:
+                parts.append(types.Part.from_bytes(data=attachment.data, mime_type=attachment.mime_type))
+                continue
+            
+            cached = self.uploads.get(attachment.sha256)
+            if cached is None:
+                uploaded = self.client.files.upload(
+                    file=io.BytesIO(attachment.data),
+                    config=types.UploadFileConfig(
+                        mime_type=attachment.mime_type,
+                        display_name=attachment.filename
+                    )
+                )
+                cached = (uploaded.uri, uploaded.mime_type or attachment.mime_type)
+                self.uploads.put(attachment.sha256, cached)
+            file_uri, mime_type = cached
+            parts.append(types.Part.from_uri(file_uri=file_uri, mime_type=mime_type))
+        return parts
     
     def _format_context(self, context: Dict) -> str:
         """Format context information for system instruction."""
@@ -103,7 +391,25 @@ class GeminiChatService(ChatServiceInterface):
         if context.get('entity_id'):
             context_parts.append(f"Entity ID: {context['entity_id']}")
         
-        if context_parts:
-            return f"\nAdditional context: {', '.join(context_parts)}"
+        formatted = f"\nAdditional context: {', '.join(context_parts)}" if context_parts else ""
+        
+        if context.get('nearby_pois'):
+            formatted += (
+                "\nNearest places to the driver's current GPS position (straight-line distance): "
+                + "; ".join(context['nearby_pois'])
+            )
+        
+        if context.get('brief'):
+            formatted += (
+                "\nThe driver needs an answer right away: reply in one or two short sentences "
+                "with only the essential information."
+            )
+        
+        if context.get('knowledge'):
+            formatted += (
+                "\nReference notes from the curated trucking knowledge base (use them where relevant; "
+                "do not state rules or figures they do not contain as fact): "
+                + " | ".join(context['knowledge'])
+            )
         
-        return ""
+        return formatted
@@ -0,0 +1,237 @@
+"""
+Idempotent chat requests.
+Following Single Responsibility Principle - handles only running a retried request once and replaying its response.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..models.schemas import ChatRequest, ChatResponse
+from ..utils.exceptions import IdempotencyConflictError
+from .interfaces import ResponseCacheInterface
+
+logger = logging.getLogger(__name__)
+
+# Longest client-supplied Idempotency-Key that is accepted
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def build_idempotency_key(
+    route: str,
+    request: ChatRequest,
+    language: str,
+    client_key: Optional[str] = None,
+    derive: bool = True
+) -> Optional[str]:
+    """
+    Build the key a chat request is deduplicated on.
+
+    An explicit ``Idempotency-Key`` is scoped to the user and route. Without
+    one, the key is derived from the user, route, language, message and the
+    client's ``timestamp``, which mobile clients keep the same on retries.
+
+    Args:
+        route: Request path
+        request: Chat request
+        language: Target language
+        client_key: Idempotency-Key header, if sent
+        derive: Whether requests without an Idempotency-Key get a derived key
+
+    Returns:
+        Hex digest identifying the request, or None if no key can be derived
+    """
+    if client_key:
+        return _digest(["key", request.user_id, route, client_key])
+    if derive and request.timestamp:
+        return _digest(["derived", request.user_id, route, language, request.message, request.timestamp])
+    return None
+
+
+def build_request_fingerprint(request: ChatRequest, language: str) -> str:
+    """
+    Fingerprint the parts of a request that decide its answer.
+
+    Location and timestamp are left out: retries may carry a fresher GPS fix
+    or send time without being a different question.
+
+    Args:
+        request: Chat request
+        language: Target language
+
+    Returns:
+        Hex digest of the request body
+    """
+    return _digest([language, request.dict(exclude={"location", "timestamp"})])
+
+
+class _Execution:
+    """The single in-flight run of an idempotent request and the clients waiting on it."""
+
+    def __init__(self, fingerprint: Optional[str], task: "asyncio.Task[ChatResponse]"):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.waiters = 0
+        self.abandon_timer: Optional[asyncio.TimerHandle] = None
+
+
+class IdempotencyGuard:
+    """
+    Runs each idempotent chat request once and replays its response to retries.
+
+    A retry arriving while the first request is in flight waits for that
+    execution; a retry after it succeeded gets the stored ``ChatResponse``
+    back unchanged. Failures are not stored, so a retry after an error runs
+    again. The execution runs in its own task. When every waiting client has
+    gone away it keeps running for ``abandon_grace`` seconds, so a client
+    that timed out and retried still gets the answer, and is cancelled if
+    no retry attaches by then. Reusing an explicit key for a different
+    request raises ``IdempotencyConflictError``.
+
+    Stored responses live in a response cache backend (bounded, TTL-evicted);
+    in-flight executions are tracked per worker. As ``timestamp`` is
+    required, every request has a derived key and each success is one store
+    write; those responses are kept for the shorter ``derived_ttl``, which
+    only has to cover a client's retries.
+    """
+
+    def __init__(
+        self,
+        store: ResponseCacheInterface,
+        ttl: float = 86400.0,
+        abandon_grace: float = 10.0,
+        derived_ttl: float = 600.0
+    ):
+        """
+        Initialize the guard.
+
+        Args:
+            store: Where responses are kept for replay
+            ttl: Seconds a response to an explicit Idempotency-Key can be replayed
+            abandon_grace: Seconds an execution nobody waits for keeps running for a retry
+            derived_ttl: Seconds a response to a derived key can be replayed (0 disables derived keys)
+        """
+        self.store = store
+        self.ttl = ttl
+        self.abandon_grace = abandon_grace
+        self.derived_ttl = derived_ttl
+        self._in_flight: Dict[str, _Execution] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.attached = 0
+        self.conflicts = 0
+        self.abandoned = 0
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: Optional[str],
+        work: Callable[[], Awaitable[ChatResponse]],
+        ttl: Optional[float] = None
+    ) -> Tuple[ChatResponse, bool]:
+        """
+        Run a request once per key.
+
+        Args:
+            key: Idempotency key (see build_idempotency_key)
+            fingerprint: Request fingerprint checked against earlier uses of the key (None skips the check)
+            work: Produces the response when the request has not run before
+            ttl: Seconds the response can be replayed (defaults to the guard's ttl)
+
+        Returns:
+            The response, and whether it came from an earlier execution
+
+        Raises:
+            IdempotencyConflictError: If the key was used for a different request
+        """
+        stored = self.store.get(key)
+        if stored is not None:
+            record = json.loads(stored)
+            self._check(record.get("fingerprint"), fingerprint)
+            self.replayed += 1
+            return ChatResponse(**record["response"]), True
+
+        execution = self._in_flight.get(key)
+        if execution is not None and execution.task.cancelling():
+            # Abandoned just now; run the request afresh
+            execution = None
+        replayed = execution is not None
+        if execution is not None:
+            self._check(execution.fingerprint, fingerprint)
+            self.attached += 1
+        else:
+            execution = _Execution(
+                fingerprint,
+                asyncio.create_task(self._execute(key, fingerprint, work, self.ttl if ttl is None else ttl))
+            )
+            self._in_flight[key] = execution
+            execution.task.add_done_callback(lambda done: self._finished(key, done))
+            self.executed += 1
+
+        execution.waiters += 1
+        if execution.abandon_timer is not None:
+            execution.abandon_timer.cancel()
+            execution.abandon_timer = None
+        try:
+            return await asyncio.shield(execution.task), replayed
+        finally:
+            execution.waiters -= 1
+            if execution.waiters == 0 and not execution.task.done():
+                execution.abandon_timer = asyncio.get_running_loop().call_later(
+                    self.abandon_grace, self._abandon, execution
+                )
+
+    async def _execute(
+        self,
+        key: str,
+        fingerprint: Optional[str],
+        work: Callable[[], Awaitable[ChatResponse]],
+        ttl: float
+    ) -> ChatResponse:
+        """Produce the response and store it for replay."""
+        response = await work()
+        record = {"fingerprint": fingerprint, "response": response.dict()}
+        self.store.set(key, json.dumps(record, ensure_ascii=False), ttl)
+        return response
+
+    def _abandon(self, execution: _Execution) -> None:
+        """Cancel an execution no client has waited for during the grace period."""
+        execution.abandon_timer = None
+        if execution.waiters == 0 and not execution.task.done():
+            self.abandoned += 1
+            execution.task.cancel()
+
+    def _finished(self, key: str, task: "asyncio.Task[ChatResponse]") -> None:
+        """Forget a finished execution; its outcome has been delivered to every waiter."""
+        execution = self._in_flight.get(key)
+        if execution is not None and execution.task is task:
+            del self._in_flight[key]
+            if execution.abandon_timer is not None:
+                execution.abandon_timer.cancel()
+        if not task.cancelled():
+            # Mark the error retrieved even when every waiter has gone away
+            task.exception()
+
+    def _check(self, expected: Optional[str], fingerprint: Optional[str]) -> None:
+        if expected is not None and fingerprint is not None and expected != fingerprint:
+            self.conflicts += 1
+            raise IdempotencyConflictError()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get execution and replay counters."""
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "attached": self.attached,
+            "conflicts": self.conflicts,
+            "abandoned": self.abandoned,
+            "store": self.store.stats(),
+        }
@@ -4,7 +4,10 @@ Following Dependency Inversion Principle - depend on abstractions, not concretio
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory, ConversationTurn
 
 
 class ChatServiceInterface(ABC):
@@ -16,10 +19,42 @@ class ChatServiceInterface(ABC):
         message: str, 
         language: str, 
         context: Optional[Dict] = None, 
-        user_id: str = ""
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
     ) -> str:
         """Generate a chat response."""
         pass
+    
+    @abstractmethod
+    async def generate_response_async(
+        self, 
+        message: str, 
+        language: str, 
+        context: Optional[Dict] = None, 
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a chat response without blocking the event loop."""
+        pass
+    
+    @abstractmethod
+    def stream_response(
+        self, 
+        message: str, 
+        language: str, 
+        context: Optional[Dict] = None, 
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a chat response as text chunks while it is generated."""
+        pass
+    
+    def admit(self, message: str, language: str, user_id: str = "") -> None:
+        """Check a request against rate and quota limits before work done ahead of generation (admits by default)."""
+        pass
 
 
 class LanguageServiceInterface(ABC):
@@ -36,6 +71,73 @@ class LanguageServiceInterface(ABC):
         pass
     
     @abstractmethod
-    def normalize_language(self, language: Optional[str]) -> str:
-        """Normalize language code to supported language."""
+    def normalize_language(self, language: Optional[str], text: Optional[str] = None) -> str:
+        """Normalize language code to supported language, detecting it from text if missing."""
+        pass
+
+
+class ConversationStoreInterface(ABC):
+    """Abstract interface for per-user conversation storage."""
+    
+    @abstractmethod
+    def get_turns(self, user_id: str) -> List[ConversationTurn]:
+        """Get stored turns for a user, oldest first."""
+        pass
+    
+    @abstractmethod
+    def append_turns(self, user_id: str, turns: List[ConversationTurn]) -> None:
+        """Append turns to a user's conversation."""
+        pass
+    
+    @abstractmethod
+    def clear(self, user_id: str) -> None:
+        """Forget a user's conversation."""
+        pass
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get storage usage statistics."""
+        pass
+
+
+class ResponseCacheInterface(ABC):
+    """Abstract interface for response caches."""
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached value, or None on miss or expiry."""
+        pass
+    
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Store a value (expiring after the cache TTL unless ``ttl`` is given)."""
+        pass
+    
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all entries."""
+        pass
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters and usage."""
+        pass
+
+
+class JobStoreInterface(ABC):
+    """Abstract interface for background chat job records."""
+    
+    @abstractmethod
+    def save(self, job_id: str, record: Dict[str, Any], ttl: float) -> None:
+        """Store a job's current record, replacing any earlier one, for ``ttl`` seconds."""
+        pass
+    
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's record, or None if it is unknown or expired."""
+        pass
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get storage usage statistics."""
         pass
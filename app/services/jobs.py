@@ -0,0 +1,578 @@
+"""
+Asynchronous chat jobs.
+Following Single Responsibility Principle - handles only queueing chat requests, keeping their results and notifying clients.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+
+from ..models.schemas import ChatRequest, ChatResponse
+from ..utils import metrics
+from ..utils.exceptions import ServiceOverloadedError, handle_service_error, log_request_error
+from ..utils.logging import log_request_success
+from ..utils.request_context import RequestOptions, set_request_options
+from ..utils.sqlite import DEFAULT_BUSY_TIMEOUT, connect_shared
+from ..utils.urls import Resolver, check_outbound_url, resolve_host
+from .attachments import AttachmentFetcher
+from .interfaces import ChatServiceInterface, JobStoreInterface
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+WEBHOOK_PENDING = "pending"
+WEBHOOK_DELIVERED = "delivered"
+WEBHOOK_FAILED = "failed"
+
+# How often a waiting poll re-reads a job another worker is running
+WAIT_POLL_INTERVAL = 0.25
+
+
+class InMemoryJobStore(JobStoreInterface):
+    """
+    Job records kept in this worker's memory.
+
+    Records expire ``ttl`` seconds after their last update; beyond
+    ``max_jobs`` the least recently updated records are dropped first.
+    """
+
+    def __init__(self, max_jobs: int = 10000):
+        self.max_jobs = max_jobs
+        self._records: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def save(self, job_id: str, record: Dict[str, Any], ttl: float) -> None:
+        """Store a job's record and drop expired or excess ones."""
+        now = time.time()
+        self._records[job_id] = (record, now + ttl)
+        self._records.move_to_end(job_id)
+        while self._records:
+            oldest_id, (_, expires_at) = next(iter(self._records.items()))
+            if expires_at <= now:
+                self.expirations += 1
+            elif len(self._records) > self.max_jobs:
+                self.evictions += 1
+            else:
+                break
+            del self._records[oldest_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's record, or None if it is unknown or expired."""
+        entry = self._records.get(job_id)
+        if entry is None:
+            return None
+        record, expires_at = entry
+        if expires_at <= time.time():
+            del self._records[job_id]
+            self.expirations += 1
+            return None
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        """Get storage usage and eviction counters."""
+        return {
+            "stored": len(self._records),
+            "max_jobs": self.max_jobs,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteJobStore(JobStoreInterface):
+    """
+    Job records shared by every worker process through a local SQLite database.
+
+    A job queued on one worker can be polled through any other. Expired
+    records are purged on writes; beyond ``max_jobs`` the least recently
+    updated records are dropped first.
+    """
+
+    def __init__(self, path: str = "jobs.db", max_jobs: int = 10000, busy_timeout: float = DEFAULT_BUSY_TIMEOUT):
+        self.path = path
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self._conn = connect_shared(path, busy_timeout)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chat_jobs (
+                job_id TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chat_jobs_updated
+                ON chat_jobs (updated_at);
+            """
+        )
+
+    def save(self, job_id: str, record: Dict[str, Any], ttl: float) -> None:
+        """Store a job's record and purge expired or excess ones."""
+        now = time.time()
+        value = json.dumps(record, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_jobs (job_id, record, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, value, now + ttl, now)
+            )
+            self.expirations += self._conn.execute(
+                "DELETE FROM chat_jobs WHERE expires_at <= ?", (now,)
+            ).rowcount
+            (stored,) = self._conn.execute("SELECT COUNT(*) FROM chat_jobs").fetchone()
+            if stored > self.max_jobs:
+                self.evictions += self._conn.execute(
+                    "DELETE FROM chat_jobs WHERE job_id IN "
+                    "(SELECT job_id FROM chat_jobs ORDER BY updated_at LIMIT ?)",
+                    (stored - self.max_jobs,)
+                ).rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's record, or None if it is unknown or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, expires_at FROM chat_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get storage usage and eviction counters."""
+        with self._lock:
+            (stored,) = self._conn.execute("SELECT COUNT(*) FROM chat_jobs").fetchone()
+        return {
+            "stored": stored,
+            "max_jobs": self.max_jobs,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+@dataclass
+class ChatJob:
+    """A queued chat request and what has happened to it so far."""
+    job_id: str
+    request: ChatRequest
+    language: str
+    context: Optional[Dict]
+    webhook_url: Optional[str] = None
+    bypass_cache: bool = False
+    request_id: str = ""
+    status: str = JOB_QUEUED
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    updated_at: str = ""
+    response: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    webhook: Optional[str] = None
+
+    def record(self) -> Dict[str, Any]:
+        """Get the client-facing record stored for polling and sent to the webhook."""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "user_id": self.request.user_id,
+            "language": self.language,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at or self.created_at,
+            "response": self.response,
+            "error": self.error,
+            "webhook": self.webhook,
+        }
+
+
+class JobManager:
+    """
+    Runs chat requests in the background for clients that poll or take a webhook.
+
+    Submitted jobs wait in a bounded queue (submissions beyond it are
+    rejected as overloaded) and a fixed pool of worker tasks runs them
+    through the full chat service. Records are kept in the job store for
+    ``result_ttl`` seconds. When a job has a webhook, its final record is
+    POSTed there, retried with backoff on network errors and 5xx/408/429
+    responses; with a secret, the body is signed as
+    ``X-Signature: sha256=<hex HMAC>``. Without ``webhook_allowed_hosts``,
+    webhooks may only target hosts that resolve to public addresses.
+    """
+
+    def __init__(
+        self,
+        chat_service: ChatServiceInterface,
+        store: JobStoreInterface,
+        attachment_fetcher: Optional[AttachmentFetcher] = None,
+        workers: int = 4,
+        max_queue: int = 256,
+        result_ttl: float = 3600.0,
+        webhook_timeout: float = 10.0,
+        webhook_attempts: int = 3,
+        webhook_secret: Optional[str] = None,
+        webhook_allowed_hosts: Sequence[str] = (),
+        route: str = "/chat/jobs",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        resolve: Resolver = resolve_host
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            chat_service: Chat service jobs are run through
+            store: Where job records are kept for polling
+            attachment_fetcher: Fetcher for request attachments (attachments are ignored if None)
+            workers: Jobs run at once by this worker process
+            max_queue: Jobs allowed to wait before submissions are rejected
+            result_ttl: Seconds a job record is kept after its last update
+            webhook_timeout: Seconds allowed per webhook delivery attempt
+            webhook_attempts: Delivery attempts before a webhook is marked failed
+            webhook_secret: Key used to sign webhook bodies (unsigned if None)
+            webhook_allowed_hosts: Hosts webhooks may be sent to (any public host if empty)
+            route: Route label for metrics and logs
+            transport: Custom HTTP transport, e.g. a local stand-in for tests
+            resolve: Host resolver used for the public-address check
+        """
+        self.chat_service = chat_service
+        self.store = store
+        self.attachment_fetcher = attachment_fetcher
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.webhook_timeout = webhook_timeout
+        self.webhook_attempts = webhook_attempts
+        self.webhook_secret = webhook_secret.encode("utf-8") if webhook_secret else None
+        self.webhook_allowed_hosts = {host.lower() for host in webhook_allowed_hosts}
+        self.route = route
+        self._transport = transport
+        self._resolve = resolve
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queue: "asyncio.Queue[ChatJob]" = asyncio.Queue(maxsize=max_queue)
+        self._worker_tasks: List["asyncio.Task[None]"] = []
+        self._webhook_tasks: Set["asyncio.Task[None]"] = set()
+        self._running: Dict[str, ChatJob] = {}
+        self._finished: Dict[str, asyncio.Event] = {}
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.webhooks_delivered = 0
+        self.webhooks_failed = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the pooled webhook HTTP client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=httpx.Timeout(self.webhook_timeout),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=5),
+                follow_redirects=False
+            )
+        return self._client
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        if not self._worker_tasks:
+            self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        Stop the workers and pending webhook deliveries.
+
+        Jobs still queued or running are recorded as failed so polling
+        clients are not left waiting on work that will never finish.
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+        for task in list(self._webhook_tasks):
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, *self._webhook_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        abandoned = list(self._running.values())
+        while not self._queue.empty():
+            abandoned.append(self._queue.get_nowait())
+        for job in abandoned:
+            job.error = {"message": "Server shut down before the job finished", "type": "shutdown"}
+            self._finish(job, JOB_FAILED)
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def check_webhook_url(self, url: str) -> None:
+        """
+        Check that a webhook URL may be used.
+
+        Args:
+            url: Webhook URL from the client
+
+        Raises:
+            ValueError: If the URL is not http(s), or its host is not allowed
+                or (without an allowlist) not a public address
+        """
+        try:
+            await check_outbound_url(url, self.webhook_allowed_hosts, self._resolve)
+        except ValueError as e:
+            raise ValueError(f"Invalid webhook URL: {e}")
+
+    def submit(
+        self,
+        request: ChatRequest,
+        language: str,
+        context: Optional[Dict] = None,
+        webhook_url: Optional[str] = None,
+        options: Optional[RequestOptions] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a chat request.
+
+        Args:
+            request: Chat request
+            language: Target language
+            context: Service context built from the request
+            webhook_url: Where to POST the final record (checked with check_webhook_url)
+            options: Options of the submitting request, carried over to the job
+
+        Returns:
+            The new job's record
+
+        Raises:
+            ServiceOverloadedError: If the queue is full
+        """
+        if self._queue.full():
+            self.rejected += 1
+            raise ServiceOverloadedError(retry_after=1.0)
+
+        options = options or RequestOptions()
+        job = ChatJob(
+            job_id=secrets.token_urlsafe(16),
+            request=request,
+            language=language,
+            context=context,
+            webhook_url=webhook_url,
+            bypass_cache=options.bypass_cache,
+            request_id=options.request_id,
+            webhook=WEBHOOK_PENDING if webhook_url else None
+        )
+        self._finished[job.job_id] = asyncio.Event()
+        self._save(job)
+        self._queue.put_nowait(job)
+        self.submitted += 1
+        return job.record()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's record.
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            The job's record, or None if it is unknown or expired
+        """
+        return self.store.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's record once it has finished, or after ``timeout`` seconds.
+
+        Jobs run by this worker are awaited directly; jobs queued on other
+        workers are re-read from the shared store.
+
+        Args:
+            job_id: Job identifier
+            timeout: Longest time to wait
+
+        Returns:
+            The job's latest record, or None if it is unknown or expired
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            record = self.store.get(job_id)
+            remaining = deadline - time.monotonic()
+            if record is None or record["status"] in FINISHED_STATUSES or remaining <= 0:
+                return record
+
+            event = self._finished.get(job_id)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(WAIT_POLL_INTERVAL, remaining))
+
+    async def _worker(self) -> None:
+        """Run queued jobs one at a time."""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Errors outside the chat call (e.g. the job store) must not
+                # stop the worker or leave the job "running" forever
+                logger.exception("Job %s failed unexpectedly", job.job_id, extra={"job_id": job.job_id})
+                if job.status not in FINISHED_STATUSES:
+                    job.error = {"message": f"Job failed: {type(e).__name__}", "type": "internal_error"}
+                    self._finish(job, JOB_FAILED)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ChatJob) -> None:
+        """Run a job through the chat service and record the outcome."""
+        set_request_options(RequestOptions(
+            bypass_cache=job.bypass_cache,
+            request_id=job.request_id,
+            route=self.route
+        ))
+        request = job.request
+        self._running[job.job_id] = job
+        job.status = JOB_RUNNING
+        self._save(job)
+
+        started = time.perf_counter()
+        in_flight = metrics.REQUESTS_IN_FLIGHT.labels(self.route)
+        in_flight.inc()
+        try:
+            attachments = None
+            if self.attachment_fetcher is not None:
+                if request.attachments:
+                    # Refuse over-limit jobs before downloading anything for them
+                    self.chat_service.admit(request.message, job.language, request.user_id)
+                attachments = await self.attachment_fetcher.fetch_all(request.attachments)
+            response_text = await self.chat_service.generate_response_async(
+                message=request.message,
+                language=job.language,
+                context=job.context,
+                user_id=request.user_id,
+                attachments=attachments
+            )
+            log_request_success(self.route, request.user_id, job.language, time.perf_counter() - started)
+            job.response = ChatResponse.create(
+                response=response_text,
+                language=job.language,
+                user_id=request.user_id
+            ).dict()
+            status = JOB_SUCCEEDED
+        except Exception as e:
+            log_request_error(self.route, request.user_id, e, job.language, time.perf_counter() - started)
+            job.error = handle_service_error(e, request.user_id).detail
+            status = JOB_FAILED
+        finally:
+            in_flight.dec()
+            metrics.observe_request(self.route, job.language, time.perf_counter() - started)
+
+        self._finish(job, status)
+
+    def _finish(self, job: ChatJob, status: str) -> None:
+        """Record a job's final status, wake waiting polls and schedule its webhook."""
+        job.status = status
+        self._running.pop(job.job_id, None)
+        if status == JOB_SUCCEEDED:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self._save_quietly(job)
+
+        event = self._finished.pop(job.job_id, None)
+        if event is not None:
+            event.set()
+
+        if job.webhook_url and self._worker_tasks:
+            task = asyncio.create_task(self._deliver(job))
+            self._webhook_tasks.add(task)
+            task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _deliver(self, job: ChatJob) -> None:
+        """POST the job's final record to its webhook, retrying transient failures."""
+        body = json.dumps(job.record(), ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", "X-Job-ID": job.job_id}
+        if job.request_id:
+            headers["X-Request-ID"] = job.request_id
+        if self.webhook_secret is not None:
+            signature = hmac.new(self.webhook_secret, body, hashlib.sha256).hexdigest()
+            headers["X-Signature"] = f"sha256={signature}"
+
+        outcome = "no attempts"
+        for attempt in range(self.webhook_attempts):
+            if attempt:
+                await asyncio.sleep(min(2 ** (attempt - 1), 30))
+            try:
+                # Checked again before each attempt, as the host's DNS may have changed
+                await self.check_webhook_url(job.webhook_url)
+            except ValueError as e:
+                outcome = str(e)
+                break
+            try:
+                response = await self.client.post(job.webhook_url, content=body, headers=headers)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+                continue
+            if response.status_code < 300:
+                job.webhook = WEBHOOK_DELIVERED
+                self.webhooks_delivered += 1
+                self._save_quietly(job)
+                return
+            outcome = f"HTTP {response.status_code}"
+            if response.status_code < 500 and response.status_code not in (408, 429):
+                break
+
+        logger.warning(
+            "Webhook delivery failed for job %s: %s",
+            job.job_id,
+            outcome,
+            extra={"job_id": job.job_id}
+        )
+        job.webhook = WEBHOOK_FAILED
+        self.webhooks_failed += 1
+        self._save_quietly(job)
+
+    def _save(self, job: ChatJob) -> None:
+        """Stamp and store the job's current record."""
+        job.updated_at = datetime.now().isoformat()
+        self.store.save(job.job_id, job.record(), self.result_ttl)
+
+    def _save_quietly(self, job: ChatJob) -> None:
+        """Store the job's record, logging instead of raising if the store fails."""
+        try:
+            self._save(job)
+        except Exception:
+            logger.exception("Could not store job %s", job.job_id, extra={"job_id": job.job_id})
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue, outcome and webhook counters."""
+        return {
+            "workers": len(self._worker_tasks),
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "webhooks_delivered": self.webhooks_delivered,
+            "webhooks_failed": self.webhooks_failed,
+            "webhooks_pending": len(self._webhook_tasks),
+            "store": self.store.stats(),
+        }
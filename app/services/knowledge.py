@@ -0,0 +1,497 @@
+"""
+Local knowledge base of curated trucking answers.
+Following Open/Closed Principle - answers or grounds questions around any ChatServiceInterface without modifying it.
+
+Each language's passages (``app/data/knowledge/<language>.json``) are
+compiled into a compact BM25 index file that is memory-mapped read-only, so
+every worker process shares one copy through the page cache and opening it
+costs only a header read. The index is rebuilt when its source file
+changes.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from .interfaces import ChatServiceInterface
+from .poi import categories_for
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DIR = Path(__file__).resolve().parent.parent / "data" / "knowledge"
+
+# Index file layout (little-endian):
+#   header
+#   document lengths         n_docs x u32
+#   term table               n_terms x (blob offset u32, blob length u32, first posting u32, df u32),
+#                            sorted by the term's UTF-8 bytes
+#   term blob                UTF-8 terms
+#   postings                 (document u32, term frequency u32) per entry
+#   document table           n_docs x (blob offset u32, blob length u32)
+#   document blob            UTF-8 JSON {"id", "topic", "answer"} per document
+INDEX_MAGIC = b"KBX1"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<4sI20sIId6I")
+_U32 = struct.Struct("<I")
+_TERM = struct.Struct("<4I")
+_POSTING = struct.Struct("<2I")
+_DOC = struct.Struct("<2I")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# The best passage must outscore the runner-up by this factor to be answered directly
+ANSWER_MARGIN = 1.25
+# One-word messages are too ambiguous to answer directly
+MIN_ANSWER_TERMS = 2
+
+_TOKEN_RE = re.compile(r"\w+")
+_DIACRITICS_RE = re.compile("[\u064b-\u065f\u0670]")
+_ARABIC_VARIANTS = str.maketrans({"ي": "ی", "ك": "ک", "ى": "ی", "ة": "ہ", "ۀ": "ہ"})
+
+# Function words (English, Roman Urdu and Urdu script) that carry no topic
+STOPWORDS = frozenset((
+    "a", "an", "the", "is", "are", "am", "be", "was", "of", "to", "in", "on", "at", "for", "and", "or",
+    "it", "my", "me", "i", "you", "your", "do", "does", "can", "should", "what", "how", "which",
+    "if", "with", "there", "this", "that",
+    "ka", "ki", "ke", "ko", "se", "mein", "main", "hai", "hain", "kya", "kaise", "aur", "ya", "ho",
+    "to", "bhi", "ne", "par", "pe", "mujhe", "mera", "meri", "aap", "ap", "kar", "karein",
+    "کا", "کی", "کے", "کو", "سے", "میں", "ہے", "ہیں", "کیا", "اور", "یا", "ہو", "تو", "بھی", "نے",
+    "پر", "مجھے", "میرا", "میری", "آپ", "کر", "کریں", "کیسے",
+))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+
+    Lower-cases, unifies Arabic-script letter variants and drops diacritics
+    and function words; Latin-script plurals ending in "s" are reduced to
+    the singular.
+    """
+    text = unicodedata.normalize("NFKC", text).lower().translate(_ARABIC_VARIANTS)
+    text = _DIACRITICS_RE.sub("", text)
+    terms = []
+    for token in _TOKEN_RE.findall(text):
+        if token in STOPWORDS or (len(token) < 2 and token.isascii()):
+            continue
+        if token.isascii() and len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+@dataclass(frozen=True, slots=True)
+class Passage:
+    """A curated answer."""
+    id: str
+    topic: str
+    answer: str
+
+
+@dataclass(frozen=True, slots=True)
+class KnowledgeMatch:
+    """A passage matching a query."""
+    passage: Passage
+    score: float
+    # Share of the query's weight (summed IDF) found in the passage
+    coverage: float
+
+
+def build_index(source_path: Path, index_path: Path) -> None:
+    """
+    Compile a passages file into an index file.
+
+    The index is written to a temporary file and renamed into place, so
+    processes that already have the old index mapped keep a consistent copy.
+
+    Args:
+        source_path: JSON file with a ``passages`` list
+        index_path: Where to write the index
+    """
+    source = source_path.read_bytes()
+    passages = json.loads(source)["passages"]
+
+    postings: Dict[str, Dict[int, int]] = {}
+    doc_lengths = []
+    doc_blobs = []
+    for doc_id, passage in enumerate(passages):
+        text = " ".join([passage["topic"], *passage.get("questions", []), passage["answer"]])
+        terms = tokenize(text)
+        doc_lengths.append(len(terms))
+        for term in terms:
+            counts = postings.setdefault(term, {})
+            counts[doc_id] = counts.get(doc_id, 0) + 1
+        doc_blobs.append(json.dumps(
+            {"id": passage["id"], "topic": passage["topic"], "answer": passage["answer"]},
+            ensure_ascii=False
+        ).encode("utf-8"))
+
+    terms = sorted(postings, key=lambda term: term.encode("utf-8"))
+    term_table = bytearray()
+    term_blob = bytearray()
+    posting_data = bytearray()
+    first_posting = 0
+    for term in terms:
+        encoded = term.encode("utf-8")
+        counts = postings[term]
+        term_table += _TERM.pack(len(term_blob), len(encoded), first_posting, len(counts))
+        term_blob += encoded
+        for doc_id in sorted(counts):
+            posting_data += _POSTING.pack(doc_id, counts[doc_id])
+        first_posting += len(counts)
+
+    doc_table = bytearray()
+    doc_blob = bytearray()
+    for blob in doc_blobs:
+        doc_table += _DOC.pack(len(doc_blob), len(blob))
+        doc_blob += blob
+
+    sections = [
+        b"".join(_U32.pack(length) for length in doc_lengths),
+        bytes(term_table), bytes(term_blob), bytes(posting_data), bytes(doc_table), bytes(doc_blob),
+    ]
+    offsets = []
+    position = _HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+
+    avgdl = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+    header = _HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, hashlib.sha1(source).digest(), len(passages), len(terms), avgdl, *offsets
+    )
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=index_path.parent, prefix=f".{index_path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as index_file:
+            index_file.write(header)
+            for section in sections:
+                index_file.write(section)
+        os.replace(temp_path, index_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def source_digest(source_path: Path) -> bytes:
+    """SHA-1 of a passages file, as recorded in the header of its index."""
+    return hashlib.sha1(source_path.read_bytes()).digest()
+
+
+class KnowledgeIndex:
+    """Read-only BM25 index over a memory-mapped index file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as index_file:
+            self._map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, version, self.digest, self.n_docs, self.n_terms, self.avgdl,
+            self._lengths_at, self._terms_at, self._term_blob_at, self._postings_at,
+            self._docs_at, self._doc_blob_at
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} knowledge index")
+
+    def _term(self, position: int) -> bytes:
+        offset, length, _, _ = _TERM.unpack_from(self._map, self._terms_at + position * _TERM.size)
+        start = self._term_blob_at + offset
+        return self._map[start:start + length]
+
+    def _lookup(self, term: str) -> Optional[Tuple[int, int]]:
+        """Binary search for a term; returns (first posting, document frequency)."""
+        target = term.encode("utf-8")
+        low, high = 0, self.n_terms
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_terms and self._term(low) == target:
+            _, _, first_posting, df = _TERM.unpack_from(self._map, self._terms_at + low * _TERM.size)
+            return first_posting, df
+        return None
+
+    def _idf(self, df: int) -> float:
+        # BM25+ style IDF, always positive
+        return math.log((self.n_docs - df + 0.5) / (df + 0.5) + 1.0)
+
+    def passage(self, doc_id: int) -> Passage:
+        """Read one passage."""
+        offset, length = _DOC.unpack_from(self._map, self._docs_at + doc_id * _DOC.size)
+        start = self._doc_blob_at + offset
+        fields = json.loads(self._map[start:start + length].decode("utf-8"))
+        return Passage(fields["id"], fields["topic"], fields["answer"])
+
+    def search(self, query: str, limit: int = 3) -> List[KnowledgeMatch]:
+        """
+        Rank passages against a query.
+
+        Args:
+            query: Question text
+            limit: Most passages to return
+
+        Returns:
+            Matching passages, best first
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.n_docs:
+            return []
+
+        scores: Dict[int, float] = {}
+        matched_weight: Dict[int, float] = {}
+        total_weight = 0.0
+        for term in terms:
+            found = self._lookup(term)
+            if found is None:
+                # Unknown words count at full weight, lowering every passage's coverage
+                total_weight += self._idf(0)
+                continue
+            first_posting, df = found
+            idf = self._idf(df)
+            total_weight += idf
+            for index in range(first_posting, first_posting + df):
+                doc_id, tf = _POSTING.unpack_from(self._map, self._postings_at + index * _POSTING.size)
+                (length,) = _U32.unpack_from(self._map, self._lengths_at + doc_id * _U32.size)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matched_weight[doc_id] = matched_weight.get(doc_id, 0.0) + idf
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [
+            KnowledgeMatch(self.passage(doc_id), scores[doc_id], matched_weight[doc_id] / total_weight)
+            for doc_id in ranked
+        ]
+
+    def close(self) -> None:
+        """Unmap the index file."""
+        self._map.close()
+
+
+
+@dataclass(frozen=True)
+class KnowledgeResult:
+    """Outcome of a knowledge lookup: a direct answer, grounding passages, or neither."""
+    answer: Optional[str] = None
+    passages: Tuple[str, ...] = ()
+
+
+class KnowledgeBase:
+    """
+    Curated passages per language, searched before the model is called.
+
+    A question matched with high confidence in its own language's passages
+    is answered with the passage as written. Weaker matches are returned
+    as grounding for the model's prompt; languages without their own
+    passages are grounded from ``fallback_language``'s, which the model
+    translates.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path = KNOWLEDGE_DIR,
+        index_dir: Path = Path("knowledge_index"),
+        fallback_language: str = "english",
+        answer_threshold: float = 0.85,
+        ground_threshold: float = 0.35,
+        max_passages: int = 3
+    ):
+        self.data_dir = Path(data_dir)
+        self.index_dir = Path(index_dir)
+        self.fallback_language = fallback_language
+        self.answer_threshold = answer_threshold
+        self.ground_threshold = ground_threshold
+        self.max_passages = max_passages
+        self.indexes: Dict[str, KnowledgeIndex] = {}
+        self.lookups = 0
+        self.answered = 0
+        self.grounded = 0
+        self.misses = 0
+        self.rebuilt = 0
+
+    def load(self) -> None:
+        """Open every language's index, compiling those that are missing or out of date."""
+        for source_path in sorted(self.data_dir.glob("*.json")):
+            language = source_path.stem
+            try:
+                self.indexes[language] = self._open(source_path, self.index_dir / f"{language}.kbx")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(
+                    "Could not load knowledge passages: %s", e, extra={"path": str(source_path)}
+                )
+        logger.info(
+            "Knowledge base loaded",
+            extra={"languages": sorted(self.indexes), "rebuilt": self.rebuilt}
+        )
+
+    def _open(self, source_path: Path, index_path: Path) -> KnowledgeIndex:
+        digest = source_digest(source_path)
+        try:
+            index = KnowledgeIndex(index_path)
+            if index.digest == digest:
+                return index
+            index.close()
+        except (OSError, ValueError, struct.error):
+            pass
+        build_index(source_path, index_path)
+        self.rebuilt += 1
+        return KnowledgeIndex(index_path)
+
+    def _confident(self, message: str, matches: List[KnowledgeMatch]) -> bool:
+        if len(set(tokenize(message))) < MIN_ANSWER_TERMS:
+            return False
+        best = matches[0]
+        if best.coverage < self.answer_threshold:
+            return False
+        return len(matches) == 1 or best.score >= ANSWER_MARGIN * matches[1].score
+
+    def lookup(self, message: str, language: str, allow_answer: bool = True) -> KnowledgeResult:
+        """
+        Search the passages for a message.
+
+        Args:
+            message: The driver's message
+            language: Language code of the response
+            allow_answer: Whether a confident match may be returned as the answer
+
+        Returns:
+            The direct answer, or passages to ground the model with (possibly none)
+        """
+        self.lookups += 1
+        index = self.indexes.get(language)
+        if index is not None:
+            matches = index.search(message, self.max_passages)
+            if allow_answer and matches and self._confident(message, matches):
+                self.answered += 1
+                return KnowledgeResult(answer=matches[0].passage.answer)
+        else:
+            fallback = self.indexes.get(self.fallback_language)
+            matches = fallback.search(message, self.max_passages) if fallback is not None else []
+
+        passages = tuple(
+            f"{match.passage.topic}: {match.passage.answer}"
+            for match in matches if match.coverage >= self.ground_threshold
+        )
+        if passages:
+            self.grounded += 1
+        else:
+            self.misses += 1
+        return KnowledgeResult(passages=passages)
+
+    def close(self) -> None:
+        """Unmap every index."""
+        for index in self.indexes.values():
+            index.close()
+        self.indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get passage counts and lookup outcomes."""
+        return {
+            "languages": len(self.indexes),
+            "passages": sum(index.n_docs for index in self.indexes.values()),
+            "lookups": self.lookups,
+            "answered": self.answered,
+            "grounded": self.grounded,
+            "misses": self.misses,
+            "rebuilt": self.rebuilt,
+        }
+
+
+class KnowledgeChatService(ChatServiceInterface):
+    """
+    Chat service decorator that answers from the knowledge base when it can.
+
+    Confident matches are returned without calling the layers below.
+    Otherwise the best passages are added to ``context["knowledge"]`` for
+    the prompt. Messages with attachments, and messages asking for a kind
+    of place when nearby places are known, are never answered directly:
+    the question is about the attachment or the places.
+    """
+
+    def __init__(self, inner: ChatServiceInterface, knowledge: KnowledgeBase):
+        self.inner = inner
+        self.knowledge = knowledge
+
+    def _consult(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict],
+        attachments: Optional[List[AttachmentContent]]
+    ) -> Tuple[Optional[str], Optional[Dict]]:
+        """Look a message up; returns the direct answer, or the context with grounding added."""
+        asks_for_places = bool(context and context.get("nearby_pois") and categories_for(message))
+        result = self.knowledge.lookup(message, language, allow_answer=not attachments and not asks_for_places)
+        if result.answer is not None:
+            return result.answer, context
+        if result.passages:
+            context = {**(context or {}), "knowledge": list(result.passages)}
+        return None, context
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Answer from the knowledge base, or generate a grounded response."""
+        answer, context = self._consult(message, language, context, attachments)
+        if answer is not None:
+            return answer
+        return self.inner.generate_response(message, language, context, user_id, history, attachments)
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Answer from the knowledge base, or generate a grounded response asynchronously."""
+        answer, context = self._consult(message, language, context, attachments)
+        if answer is not None:
+            return answer
+        return await self.inner.generate_response_async(
+            message, language, context, user_id, history, attachments
+        )
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream the knowledge base's answer as one chunk, or a grounded response."""
+        answer, context = self._consult(message, language, context, attachments)
+        if answer is not None:
+            yield answer
+            return
+        async for text in self.inner.stream_response(
+            message, language, context, user_id, history, attachments
+        ):
+            yield text
@@ -0,0 +1,203 @@
+"""
+Offline language detection.
+Following Single Responsibility Principle - handles only guessing the language of a message.
+
+Two cheap signals, no network calls:
+
+- Script analysis: Arabic-script text is split between Urdu, Pushto, Balochi,
+  Saraiki and Shahmukhi Punjabi by letters only some of them use and by
+  common function words; Gurmukhi text is Punjabi.
+- Romanized (Latin) text is scored by a naive Bayes character trigram model
+  trained on a small bundled corpus of English, Roman Urdu and Roman Punjabi.
+"""
+
+import json
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / "data" / "language_corpus.json"
+
+ARABIC_RANGES = ((0x0600, 0x06FF), (0x0750, 0x077F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF))
+GURMUKHI_RANGE = (0x0A00, 0x0A7F)
+
+# Letters used by one Arabic-script language and not (or rarely) by Urdu
+DISTINCTIVE_LETTERS: Dict[str, str] = {
+    "pushto": "ټډړږښځڅۍېګڼ",
+    "saraiki": "ٻڄݙڳݨ",
+    "balochi": "ۏێ",
+}
+
+# Common words that tell the Arabic-script languages apart
+FUNCTION_WORDS: Dict[str, frozenset] = {
+    "urdu": frozenset(
+        "ہے ہیں کا کی کے کو سے میں کیا آپ ہم کہاں کیسے نہیں مجھے ساتھ اور یہ وہ رہا رہی تھا کریں".split()
+    ),
+    "punjabi": frozenset(
+        "اے نیں دا دی دے نوں وچ نال تسی تسیں اسی کتھے کیویں ساڈا تہاڈا مینوں ہن سی گئی کی".split()
+    ),
+    "saraiki": frozenset("ساکوں تساں کوں ہاں ہئی کتھاں ونڄ ڳیا اساں تیکوں میکوں".split()),
+    "pushto": frozenset("زه ته چې د په دی دي شو کړئ څنګه چېرته غواړم مې یم هم".split()),
+    "balochi": frozenset("من انت بوتگ منی چون کجا ئے بیت کنگ مئے شما".split()),
+}
+
+# Weight of one distinctive letter relative to one function word
+LETTER_WEIGHT = 3.0
+
+# Prior evidence for Urdu, the most common Arabic-script language among users
+URDU_PRIOR = 1.0
+
+_NON_LETTERS_RE = re.compile(r"[^a-z]+")
+
+# Arabic letter forms folded to the Perso-Arabic forms used in the word lists
+_ARABIC_VARIANTS = str.maketrans({"ي": "ی", "ك": "ک", "ى": "ی"})
+
+
+@dataclass(frozen=True)
+class DetectionResult:
+    """Detected language with a confidence between 0 and 1."""
+    language: Optional[str]
+    confidence: float
+    method: str
+
+
+def _in_ranges(codepoint: int, ranges: Iterable[Tuple[int, int]]) -> bool:
+    return any(low <= codepoint <= high for low, high in ranges)
+
+
+def _softmax(scores: Dict[str, float]) -> Dict[str, float]:
+    top = max(scores.values())
+    weights = {key: math.exp(value - top) for key, value in scores.items()}
+    total = sum(weights.values())
+    return {key: weight / total for key, weight in weights.items()}
+
+
+def _trigrams(text: str) -> List[str]:
+    """Character trigrams of lowercased Latin text, words padded with spaces."""
+    cleaned = " " + _NON_LETTERS_RE.sub(" ", text.lower()).strip() + " "
+    return [cleaned[i:i + 3] for i in range(len(cleaned) - 2)]
+
+
+class TrigramModel:
+    """Naive Bayes classifier over character trigrams with add-one smoothing."""
+
+    def __init__(self, corpus: Dict[str, List[str]]):
+        self.languages = list(corpus)
+        counts = {language: Counter(g for text in texts for g in _trigrams(text))
+                  for language, texts in corpus.items()}
+        vocabulary = set().union(*counts.values())
+        self._log_probs: Dict[str, Dict[str, float]] = {}
+        self._unseen: Dict[str, float] = {}
+        for language, counter in counts.items():
+            denominator = sum(counter.values()) + len(vocabulary) + 1
+            self._log_probs[language] = {
+                gram: math.log((count + 1) / denominator) for gram, count in counter.items()
+            }
+            self._unseen[language] = math.log(1 / denominator)
+
+    @classmethod
+    def from_file(cls, path: Path = CORPUS_PATH) -> "TrigramModel":
+        """Train on a JSON file mapping language codes to sample sentences."""
+        with open(path, encoding="utf-8") as corpus_file:
+            return cls(json.load(corpus_file))
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Score text against every language.
+
+        Returns:
+            Tuple of best language (None without letters) and its posterior probability
+        """
+        grams = _trigrams(text)
+        if not grams or not text.strip():
+            return None, 0.0
+        scores = {}
+        for language in self.languages:
+            table, unseen = self._log_probs[language], self._unseen[language]
+            scores[language] = sum(table.get(gram, unseen) for gram in grams)
+        posterior = _softmax(scores)
+        best = max(posterior, key=posterior.get)
+        return best, posterior[best]
+
+
+class LanguageDetector:
+    """
+    Guesses the language of a chat message.
+
+    Confidence combines how much of the text is in the detected script with
+    how clearly the evidence favours one language within that script.
+    """
+
+    def __init__(self, model: Optional[TrigramModel] = None):
+        self._model = model
+
+    @property
+    def model(self) -> TrigramModel:
+        """Get the romanized-text model, training it on first use."""
+        if self._model is None:
+            self._model = TrigramModel.from_file()
+        return self._model
+
+    def detect(self, text: str) -> DetectionResult:
+        """
+        Detect the language of a message.
+
+        Args:
+            text: Message text
+
+        Returns:
+            Detected language (None if there are no letters) and confidence
+        """
+        arabic = gurmukhi = latin = 0
+        for char in text:
+            if not char.isalpha():
+                continue
+            codepoint = ord(char)
+            if codepoint < 0x0250:
+                latin += 1
+            elif _in_ranges(codepoint, ARABIC_RANGES):
+                arabic += 1
+            elif GURMUKHI_RANGE[0] <= codepoint <= GURMUKHI_RANGE[1]:
+                gurmukhi += 1
+
+        letters = arabic + gurmukhi + latin
+        if letters == 0:
+            return DetectionResult(None, 0.0, "none")
+
+        if arabic >= latin and arabic >= gurmukhi:
+            language, probability = self._detect_arabic_script(text)
+            return DetectionResult(language, round(arabic / letters * (0.5 + 0.5 * probability), 3), "script")
+
+        if gurmukhi > latin:
+            return DetectionResult("punjabi", round(gurmukhi / letters, 3), "script")
+
+        language, probability = self.model.predict(text)
+        return DetectionResult(language, round(latin / letters * probability, 3), "ngram")
+
+    def _detect_arabic_script(self, text: str) -> Tuple[str, float]:
+        """Pick among the Arabic-script languages from letters and function words."""
+        text = unicodedata.normalize("NFC", text).translate(_ARABIC_VARIANTS)
+        scores = {language: 0.0 for language in FUNCTION_WORDS}
+        scores["urdu"] = URDU_PRIOR
+
+        for language, letters in DISTINCTIVE_LETTERS.items():
+            scores[language] += LETTER_WEIGHT * sum(text.count(letter) for letter in letters)
+
+        for word in re.findall(r"\w+", text):
+            for language, words in FUNCTION_WORDS.items():
+                if word in words:
+                    scores[language] += 1.0
+        # Balochi marks many case endings with a standalone hamza
+        scores["balochi"] += text.count("ءَ") + text.count(" ء ")
+
+        probabilities = _softmax(scores)
+        best = max(probabilities, key=probabilities.get)
+        return best, probabilities[best]
+
+
+# Shared detector (the trigram model is trained lazily on first romanized message)
+language_detector = LanguageDetector()
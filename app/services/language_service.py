@@ -4,8 +4,9 @@ Following Single Responsibility Principle - handles only language operations.
 """
 
 from typing import Optional
-from ..core.config import language_config
+from ..core.config import language_config, settings
 from .interfaces import LanguageServiceInterface
+from .language_detection import DetectionResult, language_detector
 
 
 class LanguageService(LanguageServiceInterface):
@@ -19,22 +20,41 @@ class LanguageService(LanguageServiceInterface):
         """Get default language code."""
         return language_config.DEFAULT_LANGUAGE
     
-    def normalize_language(self, language: Optional[str]) -> str:
+    def detect_language(self, text: str) -> DetectionResult:
+        """
+        Detect the language of a message offline.
+        
+        Args:
+            text: Message text
+            
+        Returns:
+            Detected language and confidence
+        """
+        return language_detector.detect(text)
+    
+    def normalize_language(self, language: Optional[str], text: Optional[str] = None) -> str:
         """
         Normalize language code to supported language.
         
         Args:
             language: Language code from request
+            text: Message text, used to detect the language when no valid code is given
             
         Returns:
-            Normalized language code (defaults to English if invalid)
+            Normalized language code (detected, or English if unknown)
         """
-        if not language:
-            return self.get_default_language()
-        
-        normalized = language.lower().strip()
+        if language:
+            normalized = language.lower().strip()
+            if language_config.is_language_supported(normalized):
+                return normalized
         
-        if language_config.is_language_supported(normalized):
-            return normalized
+        if text and settings.language_detection_enabled:
+            detected = self.detect_language(text)
+            if (
+                detected.language is not None
+                and detected.confidence >= settings.language_detection_min_confidence
+                and language_config.is_language_supported(detected.language)
+            ):
+                return detected.language
         
         return self.get_default_language()
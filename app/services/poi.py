@@ -0,0 +1,371 @@
+"""
+Location-aware context from an offline dataset of route points of interest.
+Following Open/Closed Principle - adds nearby places around any ChatServiceInterface without modifying it.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from .interfaces import ChatServiceInterface
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Words (English, Roman Urdu/Punjabi and Urdu script) that ask for a kind of place
+CATEGORY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "fuel": ("fuel", "petrol", "diesel", "pump", "cng", "پٹرول", "پیٹرول", "ڈیزل", "پمپ"),
+    "weigh_station": ("weigh", "kanta", "kaanta", "کانٹا", "وزن"),
+    "dhaba": ("dhaba", "food", "khana", "roti", "hotel", "restaurant", "ڈھابہ", "کھانا", "ہوٹل"),
+    "mechanic": ("mechanic", "mistri", "workshop", "puncture", "tyre", "tire", "مستری", "پنکچر", "ٹائر"),
+    "rest_area": ("rest", "parking", "park", "sleep", "adda", "aaram", "آرام", "پارکنگ", "اڈا"),
+    "toll_plaza": ("toll", "ٹول"),
+    "police": ("police", "پولیس"),
+}
+
+CATEGORY_LABELS = {
+    "fuel": "fuel station",
+    "weigh_station": "weigh station",
+    "dhaba": "dhaba",
+    "mechanic": "mechanic",
+    "rest_area": "rest area",
+    "toll_plaza": "toll plaza",
+    "police": "police",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class PointOfInterest:
+    """A place along a route."""
+    name: str
+    category: str
+    latitude: float
+    longitude: float
+    road: str = ""
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def categories_for(message: str) -> Set[str]:
+    """Categories of place a message asks about (empty if none)."""
+    text = message.lower()
+    return {
+        category
+        for category, keywords in CATEGORY_KEYWORDS.items()
+        if any(keyword in text for keyword in keywords)
+    }
+
+
+class GridIndex:
+    """
+    Immutable spatial index bucketing points into square lat/lon cells.
+
+    Nearest-neighbour queries scan rings of cells outward from the query
+    cell and stop once no unvisited cell can hold a closer point, so a
+    lookup touches a handful of cells regardless of dataset size.
+    """
+
+    def __init__(self, pois: Iterable[PointOfInterest], cell_degrees: float = 0.25):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], List[PointOfInterest]] = {}
+        self.size = 0
+        for poi in pois:
+            self._cells.setdefault(self._cell(poi.latitude, poi.longitude), []).append(poi)
+            self.size += 1
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 3,
+        radius_km: float = 50.0,
+        categories: Optional[Set[str]] = None
+    ) -> List[Tuple[PointOfInterest, float]]:
+        """
+        Find the closest points to a coordinate.
+
+        Args:
+            latitude: Query latitude
+            longitude: Query longitude
+            k: Most points returned
+            radius_km: Points further away are ignored
+            categories: Only return these categories (any if empty)
+
+        Returns:
+            (point, distance in km) pairs, nearest first
+        """
+        if not self._cells or k <= 0:
+            return []
+
+        row, col = self._cell(latitude, longitude)
+        # Narrowest cell side within the search radius bounds the distance to each ring
+        max_lat = min(89.0, abs(latitude) + radius_km / KM_PER_DEGREE + self.cell_degrees)
+        cell_km = self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(max_lat))
+        max_ring = int(radius_km / cell_km) + 1
+
+        found: List[Tuple[PointOfInterest, float]] = []
+        for ring in range(max_ring + 1):
+            if len(found) >= k and found[k - 1][1] <= (ring - 1) * cell_km:
+                break
+            for cell in self._ring(row, col, ring):
+                for poi in self._cells.get(cell, ()):
+                    if categories and poi.category not in categories:
+                        continue
+                    distance = haversine_km(latitude, longitude, poi.latitude, poi.longitude)
+                    if distance <= radius_km:
+                        found.append((poi, distance))
+            found.sort(key=lambda pair: pair[1])
+        return found[:k]
+
+    @staticmethod
+    def _ring(row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+        """Cells on the square ring ``ring`` cells away from (row, col)."""
+        if ring == 0:
+            yield row, col
+            return
+        for offset in range(-ring, ring + 1):
+            yield row - ring, col + offset
+            yield row + ring, col + offset
+        for offset in range(-ring + 1, ring):
+            yield row + offset, col - ring
+            yield row + offset, col + ring
+
+
+def load_index(path: str, cell_degrees: float = 0.25) -> GridIndex:
+    """
+    Build an index from a JSON file of ``{"pois": [{name, category, latitude, longitude, road}]}``.
+
+    Args:
+        path: Dataset file
+        cell_degrees: Grid cell size in degrees
+
+    Returns:
+        Index over every point in the file
+    """
+    with open(path, encoding="utf-8") as data_file:
+        records = json.load(data_file)["pois"]
+    return GridIndex(
+        (
+            PointOfInterest(
+                name=record["name"],
+                category=record["category"],
+                latitude=float(record["latitude"]),
+                longitude=float(record["longitude"]),
+                road=record.get("road", "")
+            )
+            for record in records
+        ),
+        cell_degrees
+    )
+
+
+class POIDirectory:
+    """
+    Serves nearby-place lookups from the current index.
+
+    Reloads build a new index in a worker thread and swap it in with a
+    single reference assignment, so lookups never wait on a reload. When
+    ``reload_interval`` is set, the dataset file is checked for changes in
+    the background.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        radius_km: float = 50.0,
+        max_results: int = 3,
+        cell_degrees: float = 0.25,
+        reload_interval: float = 30.0
+    ):
+        self.path = path
+        self.radius_km = radius_km
+        self.max_results = max_results
+        self.cell_degrees = cell_degrees
+        self.reload_interval = reload_interval
+        self._index = GridIndex((), cell_degrees)
+        self._mtime: Optional[float] = None
+        self._reload_lock = asyncio.Lock()
+        self._watch_task: Optional["asyncio.Task[None]"] = None
+        self.lookups = 0
+        self.reloads = 0
+        self.reload_failures = 0
+
+    def load(self) -> None:
+        """Load the dataset synchronously (used once at startup)."""
+        self._mtime = os.path.getmtime(self.path)
+        self._index = load_index(self.path, self.cell_degrees)
+        self.reloads += 1
+
+    async def reload(self) -> bool:
+        """
+        Rebuild the index off the event loop and swap it in.
+
+        Returns:
+            True if the new dataset was loaded; on failure the previous
+            index keeps serving
+        """
+        async with self._reload_lock:
+            try:
+                # Remembered even on failure so a broken file is retried only once it changes
+                self._mtime = os.path.getmtime(self.path)
+                index = await asyncio.to_thread(load_index, self.path, self.cell_degrees)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.reload_failures += 1
+                logger.warning("POI reload failed: %s", e, extra={"path": self.path})
+                return False
+            self._index = index
+            self.reloads += 1
+            logger.info("Loaded %s POIs", index.size, extra={"path": self.path})
+            return True
+
+    async def start(self) -> None:
+        """Watch the dataset file for changes in the background."""
+        if self.reload_interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self) -> None:
+        """Stop watching the dataset file."""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch_loop(self) -> None:
+        """Reload whenever the dataset file's modification time changes."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                changed = os.path.getmtime(self.path) != self._mtime
+            except OSError:
+                changed = False
+            if changed:
+                await self.reload()
+
+    def nearby(self, message: str, latitude: float, longitude: float) -> List[str]:
+        """
+        Describe the places nearest to the driver.
+
+        Places of the kind the message asks about are preferred; without
+        such words the nearest places of any kind are returned.
+
+        Args:
+            message: The user message
+            latitude: Driver latitude
+            longitude: Driver longitude
+
+        Returns:
+            One short description per place, nearest first
+        """
+        self.lookups += 1
+        results = self._index.nearest(
+            latitude, longitude, self.max_results, self.radius_km, categories_for(message)
+        )
+        return [self._describe(poi, distance) for poi, distance in results]
+
+    @staticmethod
+    def _describe(poi: PointOfInterest, distance: float) -> str:
+        label = CATEGORY_LABELS.get(poi.category, poi.category)
+        road = f", {poi.road}" if poi.road else ""
+        return f"{poi.name} ({label}{road}, {distance:.0f} km)"
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index size and lookup counters."""
+        return {
+            "pois": self._index.size,
+            "lookups": self.lookups,
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+        }
+
+
+class LocationAwareChatService(ChatServiceInterface):
+    """
+    Chat service decorator that turns the driver's GPS position into a list
+    of nearby places for the prompt.
+
+    Routes put the coordinates in ``context["location"]``; this layer
+    replaces them with ``context["nearby_pois"]``, which is part of the
+    response cache key, so the raw position never reaches the layers below.
+    """
+
+    def __init__(self, inner: ChatServiceInterface, directory: POIDirectory):
+        self.inner = inner
+        self.directory = directory
+
+    def _enrich(self, message: str, context: Optional[Dict]) -> Optional[Dict]:
+        """Replace the location in a context with the places near it."""
+        location = context.get("location") if context else None
+        if not location:
+            return context
+
+        context = {key: value for key, value in context.items() if key != "location"}
+        nearby = self.directory.nearby(message, location["latitude"], location["longitude"])
+        if nearby:
+            context["nearby_pois"] = nearby
+        return context
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response with nearby places in the context."""
+        context = self._enrich(message, context)
+        return self.inner.generate_response(message, language, context, user_id, history, attachments)
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response asynchronously with nearby places in the context."""
+        context = self._enrich(message, context)
+        return await self.inner.generate_response_async(
+            message, language, context, user_id, history, attachments
+        )
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response with nearby places in the context."""
+        context = self._enrich(message, context)
+        async for text in self.inner.stream_response(
+            message, language, context, user_id, history, attachments
+        ):
+            yield text
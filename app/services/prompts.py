@@ -0,0 +1,235 @@
+"""
+Precompiled per-language prompts and Gemini context caching.
+Following Single Responsibility Principle - handles only building and caching system instructions.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from google import genai
+from google.genai import types
+
+from ..core.config import language_config
+from ..utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_MIME_TYPE = "text/plain"
+
+# Smallest content Gemini accepts for explicit context caching (Flash models; Pro needs more)
+MIN_CACHED_TOKENS = 1024
+
+
+@dataclass
+class LanguagePrompt:
+    """Prebuilt request objects for one language."""
+    language: str
+    system_part: types.Part
+    inline_config: types.GenerateContentConfig
+    cacheable: bool = False
+    cached_config: Optional[types.GenerateContentConfig] = None
+    cache_name: Optional[str] = None
+    cache_expires_at: float = 0.0
+    cache_retry_at: float = 0.0
+
+
+@dataclass
+class PromptRequest:
+    """Generation config plus any parts to prepend to the user's message."""
+    config: types.GenerateContentConfig
+    prefix_parts: List[types.Part]
+    uses_cache: bool
+
+
+class PromptRegistry:
+    """
+    Builds system instruction objects once per language and reuses them.
+
+    When context caching is enabled, each language's system instruction of
+    at least ``min_cache_tokens`` is stored with Gemini's cached-content API
+    and refreshed before its TTL expires. Shorter instructions are below
+    Gemini's minimum and are always sent inline, without a cache call.
+    Requests fall back to the inline instruction whenever a cache is
+    missing, expired or could not be created.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        cache_enabled: bool = False,
+        cache_ttl: float = 3600.0,
+        refresh_margin: float = 300.0,
+        retry_interval: float = 900.0,
+        min_cache_tokens: int = MIN_CACHED_TOKENS
+    ):
+        self.model = model
+        self.cache_enabled = cache_enabled
+        self.min_cache_tokens = min_cache_tokens
+        self.cache_ttl = cache_ttl
+        self.refresh_margin = min(refresh_margin, cache_ttl / 2)
+        self.retry_interval = retry_interval
+        self._client: Optional[genai.Client] = None
+        self._refresh_task: Optional["asyncio.Task[None]"] = None
+        self._prompts: Dict[str, LanguagePrompt] = {
+            language: self._compile(language)
+            for language in language_config.get_supported_languages()
+        }
+
+    def build(self, language: str, suffix: str = "") -> PromptRequest:
+        """
+        Get the generation config for a request.
+
+        The static instruction is never copied: with no suffix the prebuilt
+        config is returned as-is, otherwise the prebuilt Part is reused next
+        to a small Part holding only the suffix.
+
+        Args:
+            language: Normalized language code
+            suffix: Request-specific text (context, history summary)
+
+        Returns:
+            Config and user-message prefix parts for the request
+        """
+        prompt = self._prompts.get(language) or self._prompts[language_config.DEFAULT_LANGUAGE]
+
+        if prompt.cached_config is not None and prompt.cache_expires_at > time.time():
+            prefix_parts = [types.Part(text=suffix.strip())] if suffix else []
+            return PromptRequest(prompt.cached_config, prefix_parts, uses_cache=True)
+
+        if not suffix:
+            return PromptRequest(prompt.inline_config, [], uses_cache=False)
+
+        config = types.GenerateContentConfig(
+            system_instruction=types.Content(
+                role="system",
+                parts=[prompt.system_part, types.Part(text=suffix)]
+            ),
+            response_mime_type=RESPONSE_MIME_TYPE
+        )
+        return PromptRequest(config, [], uses_cache=False)
+
+    def invalidate(self, language: str) -> None:
+        """Stop using a language's cached content until it is recreated."""
+        prompt = self._prompts.get(language)
+        if prompt is not None and prompt.cached_config is not None:
+            logger.warning("Cached system instruction for %s rejected; using inline instruction", language)
+            prompt.cached_config = None
+            prompt.cache_name = None
+            prompt.cache_expires_at = 0.0
+
+    async def start(self, client: genai.Client) -> None:
+        """Begin creating and refreshing cached content in the background."""
+        if not self.cache_enabled or self._refresh_task is not None:
+            return
+        if not any(prompt.cacheable for prompt in self._prompts.values()):
+            logger.info(
+                "System instructions are below the %d-token context cache minimum; sending them inline",
+                self.min_cache_tokens
+            )
+            return
+        self._client = client
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop refreshing and delete cached content."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+        if self._client is None:
+            return
+        for prompt in self._prompts.values():
+            if prompt.cache_name:
+                try:
+                    await self._client.aio.caches.delete(name=prompt.cache_name)
+                except Exception as e:
+                    logger.debug("Failed to delete cached content %s: %s", prompt.cache_name, e)
+                prompt.cached_config = None
+                prompt.cache_name = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cached-content status per language."""
+        now = time.time()
+        return {
+            "cache_enabled": self.cache_enabled,
+            "languages": {
+                language: {
+                    "cacheable": prompt.cacheable,
+                    "cached": prompt.cached_config is not None and prompt.cache_expires_at > now,
+                    "expires_in": max(0, round(prompt.cache_expires_at - now)),
+                }
+                for language, prompt in self._prompts.items()
+            },
+        }
+
+    def _compile(self, language: str) -> LanguagePrompt:
+        """Build the static request objects for a language."""
+        instruction = language_config.get_system_instruction(language)
+        system_part = types.Part(text=instruction)
+        inline_config = types.GenerateContentConfig(
+            system_instruction=types.Content(role="system", parts=[system_part]),
+            response_mime_type=RESPONSE_MIME_TYPE
+        )
+        return LanguagePrompt(
+            language, system_part, inline_config,
+            cacheable=estimate_tokens(instruction) >= self.min_cache_tokens
+        )
+
+    async def _refresh_loop(self) -> None:
+        """Keep every language's cached content ahead of expiry."""
+        cacheable = [prompt for prompt in self._prompts.values() if prompt.cacheable]
+        while True:
+            now = time.time()
+            due = [
+                prompt for prompt in cacheable
+                if prompt.cache_expires_at - self.refresh_margin <= now and prompt.cache_retry_at <= now
+            ]
+            await asyncio.gather(*(self._create_cache(prompt) for prompt in due))
+
+            next_times = [
+                max(prompt.cache_expires_at - self.refresh_margin, prompt.cache_retry_at)
+                for prompt in cacheable
+            ]
+            await asyncio.sleep(max(1.0, min(next_times) - time.time()))
+
+    async def _create_cache(self, prompt: LanguagePrompt) -> None:
+        """Create (or replace) the cached content for one language."""
+        previous_name = prompt.cache_name
+        try:
+            cached = await self._client.aio.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"system-instruction-{prompt.language}",
+                    system_instruction=types.Content(role="system", parts=[prompt.system_part]),
+                    ttl=f"{int(self.cache_ttl)}s",
+                )
+            )
+        except Exception as e:
+            prompt.cache_retry_at = time.time() + self.retry_interval
+            logger.warning(
+                "Could not cache system instruction for %s, using inline instruction: %s",
+                prompt.language,
+                e
+            )
+            return
+
+        prompt.cache_name = cached.name
+        prompt.cache_expires_at = time.time() + self.cache_ttl
+        prompt.cached_config = types.GenerateContentConfig(
+            cached_content=cached.name,
+            response_mime_type=RESPONSE_MIME_TYPE
+        )
+        logger.info("Cached system instruction for %s as %s", prompt.language, cached.name)
+
+        if previous_name:
+            try:
+                await self._client.aio.caches.delete(name=previous_name)
+            except Exception as e:
+                logger.debug("Failed to delete cached content %s: %s", previous_name, e)
@@ -0,0 +1,458 @@
+"""
+Resilient upstream calls.
+Following Open/Closed Principle - adds retries, hedging and circuit breaking around any ChatServiceInterface without modifying it.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils.exceptions import CircuitOpenError, UpstreamServiceError
+from .interfaces import ChatServiceInterface
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is a transient upstream failure."""
+    return isinstance(error, UpstreamServiceError) and error.retryable
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 2.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """
+        Get the wait before a retry.
+
+        Args:
+            attempt: Number of attempts made so far (1 for the first retry)
+
+        Returns:
+            Seconds to wait, drawn uniformly up to the capped exponential delay
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the upstream looks unhealthy.
+
+    Opens after ``failure_threshold`` consecutive transient failures. After
+    ``recovery_timeout`` seconds one trial call is let through (half-open);
+    success closes the circuit, failure opens it again. A trial that ends
+    without an outcome (cancelled) must be released with ``release``; a
+    trial still unresolved after another ``recovery_timeout`` is assumed
+    lost and a new one is let through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_progress = False
+        self._trial_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        Returns:
+            True if the call is the half-open trial (release it if it is cancelled)
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+
+            now = time.monotonic()
+            remaining = self.opened_at + self.recovery_timeout - now
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                self._trial_in_progress = False
+
+            if self.state == self.HALF_OPEN and (
+                not self._trial_in_progress or now - self._trial_started_at > self.recovery_timeout
+            ):
+                self._trial_in_progress = True
+                self._trial_started_at = now
+                return True
+
+            self.rejected += 1
+            raise CircuitOpenError(retry_after=max(remaining, 1.0))
+
+    def release(self) -> None:
+        """Free the half-open trial slot after the trial call ended without an outcome."""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Upstream circuit closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_progress = False
+
+    def record_failure(self, error: BaseException) -> None:
+        """Record a failed call; only transient upstream failures count."""
+        with self._lock:
+            if not is_retryable(error):
+                self._trial_in_progress = False
+                return
+
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        "Upstream circuit opened after %d failures", self.consecutive_failures
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_progress = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    """Rolling window of call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        """Add a latency sample."""
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Get a latency percentile, or None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class _StreamAttempt:
+    """
+    One upstream stream driven to completion in its own task.
+
+    Chunks, a final error or the end marker (None) are queued for the
+    consumer, so racing attempts never resume a generator from another task.
+    """
+
+    def __init__(self, chunks: AsyncIterator[str]):
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self.task = asyncio.create_task(self._pump(chunks))
+
+    async def _pump(self, chunks: AsyncIterator[str]) -> None:
+        try:
+            async for text in chunks:
+                self.queue.put_nowait(text)
+        except Exception as e:
+            self.queue.put_nowait(e)
+        else:
+            self.queue.put_nowait(None)
+
+
+class ResilientChatService(ChatServiceInterface):
+    """
+    Chat service decorator that retries, hedges and circuit-breaks upstream calls.
+
+    - Transient upstream errors are retried with jittered exponential backoff.
+    - With hedging enabled, a second request is started when the first has
+      not finished by the tracked latency percentile; the first to succeed
+      wins and the other is cancelled. Streams are hedged on their time to
+      first chunk, which is what every chat route waits on.
+    - A circuit breaker rejects calls immediately while the upstream is
+      failing. Cancelled calls release the breaker's half-open trial.
+
+    Streams are retried only until their first chunk has been yielded.
+    """
+
+    def __init__(
+        self,
+        inner: ChatServiceInterface,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 50
+    ):
+        self.inner = inner
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self.first_chunk = LatencyTracker()
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response with retries and circuit breaking."""
+        attempt = 1
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                response = self.inner.generate_response(
+                    message, language, context, user_id, history, attachments
+                )
+            except Exception as e:
+                self.breaker.record_failure(e)
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                if trial:
+                    self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return response
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response with retries, optional hedging and circuit breaking."""
+        def call() -> Awaitable[str]:
+            return self.inner.generate_response_async(
+                message, language, context, user_id, history, attachments
+            )
+
+        attempt = 1
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                response = await self._call_with_hedge(call)
+            except Exception as e:
+                self.breaker.record_failure(e)
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                if trial:
+                    self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return response
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response, retrying failures that happen before the first chunk."""
+        def open_stream() -> AsyncIterator[str]:
+            return self.inner.stream_response(
+                message, language, context, user_id, history, attachments
+            )
+
+        attempt = 1
+        while True:
+            trial = self.breaker.before_call()
+            yielded = False
+            try:
+                async for text in self._stream_with_hedge(open_stream):
+                    yielded = True
+                    yield text
+            except Exception as e:
+                self.breaker.record_failure(e)
+                if yielded or not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled or closed by the consumer: no verdict on the upstream
+                if trial:
+                    self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        """Get retry, hedging and breaker statistics."""
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency_p95_ms": ms(self.latency.percentile(0.95)),
+            "first_chunk_p95_ms": ms(self.first_chunk.percentile(0.95)),
+            "circuit": self.breaker.stats(),
+        }
+
+    def _should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Decide whether to retry after a failed attempt."""
+        if attempt >= self.retry_policy.max_attempts or not is_retryable(error):
+            return False
+        self.retries += 1
+        logger.warning("Retrying upstream call (attempt %d): %s", attempt + 1, error)
+        return True
+
+    def _hedge_delay(self, latency: LatencyTracker) -> Optional[float]:
+        """Get how long to wait before hedging, or None if hedging is off."""
+        if self.hedge_percentile is None or len(latency) < self.hedge_min_samples:
+            return None
+        return latency.percentile(self.hedge_percentile)
+
+    async def _call_with_hedge(self, call: Callable[[], Awaitable[str]]) -> str:
+        """Run a call, racing a second copy if it is slower than the hedge delay."""
+        started = time.monotonic()
+        hedge_after = self._hedge_delay(self.latency)
+        primary = asyncio.ensure_future(call())
+        tasks = [primary]
+
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    self.hedges += 1
+                    tasks.append(asyncio.ensure_future(call()))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self.latency.record(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _stream_with_hedge(self, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Stream a response, racing a second stream if the first chunk is slower than the hedge delay."""
+        started = time.monotonic()
+        hedge_after = self._hedge_delay(self.first_chunk)
+        if hedge_after is None:
+            stream = open_stream()
+            first = True
+            try:
+                async for text in stream:
+                    if first:
+                        self.first_chunk.record(time.monotonic() - started)
+                        first = False
+                    yield text
+            finally:
+                await stream.aclose()
+            return
+
+        attempts = [_StreamAttempt(open_stream())]
+        try:
+            winner, item = await self._first_item(attempts, hedge_after, open_stream)
+            if isinstance(item, BaseException):
+                raise item
+            if item is not None:
+                self.first_chunk.record(time.monotonic() - started)
+            if winner is not attempts[0]:
+                self.hedge_wins += 1
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.task.cancel()
+
+            while item is not None:
+                yield item
+                item = await winner.queue.get()
+                if isinstance(item, BaseException):
+                    raise item
+        finally:
+            # Each stream closes in its own task once cancelled
+            for attempt in attempts:
+                attempt.task.cancel()
+
+    async def _first_item(
+        self,
+        attempts: List[_StreamAttempt],
+        hedge_after: float,
+        open_stream: Callable[[], AsyncIterator[str]]
+    ) -> Tuple[_StreamAttempt, Any]:
+        """Wait for the first chunk (or the end) from any attempt, hedging once after ``hedge_after``."""
+        getters = {asyncio.ensure_future(attempts[0].queue.get()): attempts[0]}
+        try:
+            done, _ = await asyncio.wait(getters, timeout=hedge_after)
+            if not done:
+                self.hedges += 1
+                attempts.append(_StreamAttempt(open_stream()))
+                getters[asyncio.ensure_future(attempts[1].queue.get())] = attempts[1]
+
+            pending = set(getters)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for getter in done:
+                    item = getter.result()
+                    if not isinstance(item, BaseException):
+                        return getters[getter], item
+                    error = item
+            return attempts[0], error
+        finally:
+            for getter in getters:
+                getter.cancel()
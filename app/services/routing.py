@@ -0,0 +1,337 @@
+"""
+Routing between a fast and a strong model.
+Following Open/Closed Principle - picks a backend per request from any set of ChatServiceInterface models.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from ..models.attachment import AttachmentContent
+from ..models.conversation import ConversationHistory
+from ..utils.exceptions import UpstreamServiceError
+from .interfaces import ChatServiceInterface
+from .resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+# Words (English, Roman Urdu and Urdu script) that signal a question needing reasoning
+COMPLEX_MARKERS = (
+    "why", "explain", "compare", "difference", "calculate", "plan", "step by step",
+    "kyun", "kyon", "wajah", "farq", "hisaab", "samjha",
+    "کیوں", "وجہ", "فرق", "حساب", "سمجھا",
+)
+
+# Upstream statuses meaning this model is unavailable, so another may work
+MODEL_UNAVAILABLE_STATUS_CODES = {403, 404}
+
+
+class ModelHealth:
+    """Rolling outcomes and time to first chunk of one model."""
+
+    def __init__(self, model: str, window: int = 100):
+        self.model = model
+        self.first_chunk = LatencyTracker(window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.updated_at = 0.0
+
+    def record_first_chunk(self, seconds: float) -> None:
+        """Record how long the model took to start answering."""
+        self.first_chunk.record(seconds)
+
+    def record_outcome(self, success: bool, timed_out: bool = False) -> None:
+        """Record a finished call."""
+        self.requests += 1
+        self.updated_at = time.monotonic()
+        self._outcomes.append(success)
+        if not success:
+            self.failures += 1
+        if timed_out:
+            self.timeouts += 1
+
+    def error_rate(self) -> Optional[float]:
+        """Share of recent calls that failed, or None without samples."""
+        if not self._outcomes:
+            return None
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+
+class ModelRouterChatService(ChatServiceInterface):
+    """
+    Chat service that sends each request to a fast or a strong model.
+
+    Short, simple messages go to the fast model; long messages, messages
+    with attachments and questions that need reasoning go to the strong
+    one, unless the request is short of time and asks for a brief answer
+    (``context["brief"]``). A model whose recent error rate or median time to first chunk is
+    over its limit is tried after the others; once it has had no calls for
+    ``recovery_timeout`` seconds it is given traffic again. When the
+    chosen model fails, or does not start answering within
+    ``first_chunk_timeout``, the request falls back to the next model.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, ChatServiceInterface],
+        fast_model: str,
+        strong_model: str,
+        fast_max_chars: int = 160,
+        first_chunk_timeout: float = 10.0,
+        max_error_rate: float = 0.5,
+        slow_first_chunk: float = 6.0,
+        min_samples: int = 20,
+        recovery_timeout: float = 30.0,
+        window: int = 100
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            models: Chat service per model name, in fallback order
+            fast_model: Model for short, simple messages
+            strong_model: Model for long or complex messages
+            fast_max_chars: Longest message sent to the fast model
+            first_chunk_timeout: Seconds to wait for a first chunk before falling back (0 waits forever)
+            max_error_rate: Recent error rate above which a model is tried last
+            slow_first_chunk: Median seconds to first chunk above which a model is tried last
+            min_samples: Calls observed before a model can be demoted
+            recovery_timeout: Seconds after its last call before a demoted model is tried first again
+            window: Calls kept per model for the rolling statistics
+        """
+        self.models = models
+        self.tier_models = {TIER_FAST: fast_model, TIER_STRONG: strong_model}
+        self.fast_max_chars = fast_max_chars
+        self.first_chunk_timeout = first_chunk_timeout
+        self.max_error_rate = max_error_rate
+        self.slow_first_chunk = slow_first_chunk
+        self.min_samples = min_samples
+        self.recovery_timeout = recovery_timeout
+        self.health = {model: ModelHealth(model, window) for model in models}
+        self.decisions = {TIER_FAST: 0, TIER_STRONG: 0}
+        self.demotions = 0
+        self.fallbacks = 0
+
+    def classify(
+        self,
+        message: str,
+        attachments: Optional[List[AttachmentContent]] = None,
+        brief: bool = False
+    ) -> str:
+        """
+        Decide which tier a message needs.
+
+        Args:
+            message: The user message
+            attachments: Fetched attachments sent with the message
+            brief: Whether a short answer was asked for because the deadline is near
+
+        Returns:
+            TIER_FAST or TIER_STRONG
+        """
+        if brief and not attachments:
+            return TIER_FAST
+        if attachments or len(message) > self.fast_max_chars:
+            return TIER_STRONG
+        text = message.lower()
+        if any(marker in text for marker in COMPLEX_MARKERS):
+            return TIER_STRONG
+        return TIER_FAST
+
+    def is_degraded(self, model: str) -> bool:
+        """Whether a model's recent errors or latency are over their limits."""
+        health = self.health[model]
+        if health.samples() < self.min_samples:
+            return False
+        if time.monotonic() - health.updated_at > self.recovery_timeout:
+            return False
+        error_rate = health.error_rate()
+        if error_rate is not None and error_rate > self.max_error_rate:
+            return True
+        median = health.first_chunk.percentile(0.5)
+        return median is not None and median > self.slow_first_chunk
+
+    def candidates(self, tier: str) -> List[str]:
+        """
+        Order models for a request: the tier's model first, degraded models last.
+
+        Args:
+            tier: Tier chosen by ``classify``
+
+        Returns:
+            Model names in the order they should be tried
+        """
+        preferred = self.tier_models[tier]
+        ordered = [preferred] + [model for model in self.models if model != preferred]
+        return sorted(ordered, key=self.is_degraded)
+
+    def _route(
+        self,
+        message: str,
+        context: Optional[Dict],
+        attachments: Optional[List[AttachmentContent]],
+        user_id: str
+    ) -> List[str]:
+        """Classify a request and count the decision."""
+        tier = self.classify(message, attachments, bool((context or {}).get("brief")))
+        self.decisions[tier] += 1
+        models = self.candidates(tier)
+        if models[0] != self.tier_models[tier]:
+            self.demotions += 1
+        logger.debug("Routed request", extra={"user_id": user_id, "tier": tier, "model": models[0]})
+        return models
+
+    def _can_fall_back(self, error: BaseException, remaining: int) -> bool:
+        """Whether another model is worth trying after an error."""
+        if remaining == 0 or not isinstance(error, UpstreamServiceError):
+            return False
+        return error.retryable or error.status_code in MODEL_UNAVAILABLE_STATUS_CODES
+
+    def _fall_back(self, model: str, reason: Any) -> None:
+        self.fallbacks += 1
+        logger.warning("Falling back from %s: %s", model, reason, extra={"model": model})
+
+    def generate_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response from the routed model, falling back on failure."""
+        models = self._route(message, context, attachments, user_id)
+        for index, model in enumerate(models):
+            health = self.health[model]
+            started = time.perf_counter()
+            try:
+                response = self.models[model].generate_response(
+                    message, language, context, user_id, history, attachments
+                )
+            except Exception as e:
+                health.record_outcome(False)
+                if not self._can_fall_back(e, len(models) - index - 1):
+                    raise
+                self._fall_back(model, e)
+                continue
+            health.record_first_chunk(time.perf_counter() - started)
+            health.record_outcome(True)
+            return response
+        raise AssertionError("unreachable")
+
+    async def generate_response_async(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> str:
+        """Generate a response from the routed model, falling back on failure or slowness."""
+        chunks = [
+            text async for text in self.stream_response(
+                message, language, context, user_id, history, attachments
+            )
+        ]
+        return "".join(chunks).strip()
+
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        context: Optional[Dict] = None,
+        user_id: str = "",
+        history: Optional[ConversationHistory] = None,
+        attachments: Optional[List[AttachmentContent]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the routed model.
+
+        Falls back to the next model only before the first chunk; once text
+        has been sent, errors are raised to the caller.
+        """
+        models = self._route(message, context, attachments, user_id)
+        for index, model in enumerate(models):
+            health = self.health[model]
+            remaining = len(models) - index - 1
+            timeout = self.first_chunk_timeout if remaining and self.first_chunk_timeout > 0 else None
+            stream = self.models[model].stream_response(
+                message, language, context, user_id, history, attachments
+            )
+            iterator = stream.__aiter__()
+            started = time.perf_counter()
+
+            # Awaited in this task: moving __anext__ to another task would break
+            # inner layers that hold cancel scopes or context across a yield
+            timer = asyncio.timeout(timeout)
+            try:
+                async with timer:
+                    first = await iterator.__anext__()
+            except StopAsyncIteration:
+                health.record_outcome(True)
+                return
+            except TimeoutError:
+                if not timer.expired():
+                    health.record_outcome(False)
+                    raise
+                health.record_outcome(False, timed_out=True)
+                await stream.aclose()
+                self._fall_back(model, f"no first chunk after {timeout:.1f}s")
+                continue
+            except Exception as e:
+                health.record_outcome(False)
+                if not self._can_fall_back(e, remaining):
+                    raise
+                self._fall_back(model, e)
+                continue
+
+            health.record_first_chunk(time.perf_counter() - started)
+            try:
+                yield first
+                async for text in iterator:
+                    yield text
+            except Exception:
+                health.record_outcome(False)
+                raise
+            finally:
+                await stream.aclose()
+            health.record_outcome(True)
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        """Get routing decisions and rolling statistics per tier's model."""
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        models = {}
+        for tier, model in self.tier_models.items():
+            health = self.health[model]
+            error_rate = health.error_rate()
+            models[tier] = {
+                "model": model,
+                "requests": health.requests,
+                "failures": health.failures,
+                "timeouts": health.timeouts,
+                "error_rate": round(error_rate, 3) if error_rate is not None else None,
+                "first_chunk_p50_ms": ms(health.first_chunk.percentile(0.5)),
+                "first_chunk_p95_ms": ms(health.first_chunk.percentile(0.95)),
+                "degraded": self.is_degraded(model),
+            }
+        return {
+            "decisions": dict(self.decisions),
+            "demotions": self.demotions,
+            "fallbacks": self.fallbacks,
+            "models": models,
+        }
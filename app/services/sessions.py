@@ -0,0 +1,213 @@
+"""
+Resumable chat sessions for the WebSocket channel.
+Following Single Responsibility Principle - handles only session state, event replay and expiry.
+"""
+
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Coroutine, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Sender = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class ChatSession:
+    """
+    One driver's session: negotiated language, in-flight messages and recent events.
+
+    Every event sent for a message (chunks, the final response, errors) is
+    numbered and kept in a bounded buffer, so a client that reconnects can
+    ask for everything after the last number it saw. Messages keep running
+    while no connection is attached; their events are buffered for the
+    next one.
+    """
+
+    def __init__(self, session_id: str, language: Optional[str], replay_size: int = 256):
+        self.session_id = session_id
+        self.language = language
+        self.next_seq = 1
+        self.detached_at: Optional[float] = None
+        self.tasks: Dict[str, "asyncio.Task[None]"] = {}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=replay_size)
+        self._send: Optional[Sender] = None
+
+    @property
+    def attached(self) -> bool:
+        """Whether a connection is currently receiving this session's events."""
+        return self._send is not None
+
+    def attach(self, send: Sender) -> None:
+        """Deliver new events through a connection."""
+        self._send = send
+        self.detached_at = None
+
+    def detach(self, send: Sender) -> bool:
+        """
+        Stop delivering events through a connection.
+
+        Args:
+            send: The connection's sender; ignored if another connection has taken over
+
+        Returns:
+            True if the session is now detached
+        """
+        if self._send is not send:
+            return False
+        self._send = None
+        self.detached_at = time.monotonic()
+        return True
+
+    async def emit(self, event: Dict[str, Any]) -> None:
+        """Number an event, buffer it for replay and send it if a connection is attached."""
+        event["seq"] = self.next_seq
+        self.next_seq += 1
+        self._events.append(event)
+
+        send = self._send
+        if send is None:
+            return
+        try:
+            await send(event)
+        except Exception as e:
+            # The connection is gone; the event stays buffered for a resume
+            logger.debug("Dropped live event for session %s: %s", self.session_id, e)
+
+    def replay(self, last_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events numbered after ``last_seq``.
+
+        Returns:
+            The missed events in order, or None if some have already been
+            dropped from the buffer
+        """
+        if last_seq >= self.next_seq - 1:
+            return []
+        if not self._events or self._events[0]["seq"] > last_seq + 1:
+            return None
+        return [event for event in self._events if event["seq"] > last_seq]
+
+    def start(self, message_id: str, work: Coroutine[Any, Any, None]) -> None:
+        """Run a message's work in the background, tracked by its id."""
+        task = asyncio.create_task(work)
+        self.tasks[message_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(message_id, None))
+
+    def cancel(self, message_id: Optional[str] = None) -> int:
+        """
+        Cancel one in-flight message, or all of them.
+
+        Returns:
+            Number of messages cancelled
+        """
+        ids = [message_id] if message_id is not None else list(self.tasks)
+        cancelled = 0
+        for key in ids:
+            task = self.tasks.get(key)
+            if task is not None and not task.done():
+                task.cancel()
+                cancelled += 1
+        return cancelled
+
+
+class SessionRegistry:
+    """
+    Sessions of this worker, kept for ``ttl`` seconds after their connection drops.
+
+    Expired sessions are removed (and their messages cancelled) whenever a
+    session is created or resumed. When ``max_sessions`` is reached the
+    longest-detached session is dropped first.
+    """
+
+    def __init__(self, ttl: float = 120.0, replay_size: int = 256, max_sessions: int = 10000):
+        self.ttl = ttl
+        self.replay_size = replay_size
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self.created = 0
+        self.resumed = 0
+        self.resume_failures = 0
+        self.expired = 0
+
+    def create(self, language: Optional[str]) -> ChatSession:
+        """Start a new session."""
+        self._sweep()
+        while len(self._sessions) >= self.max_sessions and self._evict_detached():
+            pass
+        session = ChatSession(secrets.token_urlsafe(16), language, self.replay_size)
+        self._sessions[session.session_id] = session
+        self.created += 1
+        return session
+
+    def resume(self, session_id: str, last_seq: int) -> Optional[Tuple[ChatSession, List[Dict[str, Any]]]]:
+        """
+        Look up a session and the events its client missed.
+
+        Args:
+            session_id: Id from the session's welcome frame
+            last_seq: Last event number the client received
+
+        Returns:
+            The session and its missed events, or None if the session has
+            expired or cannot replay everything after ``last_seq``
+        """
+        self._sweep()
+        session = self._sessions.get(session_id)
+        events = session.replay(last_seq) if session is not None else None
+        if events is None:
+            self.resume_failures += 1
+            return None
+        self.resumed += 1
+        return session, events
+
+    def detach(self, session: ChatSession, send: Sender) -> None:
+        """Mark a session's connection as gone; it expires after ``ttl`` unless resumed."""
+        if session.detach(send):
+            self._sessions.move_to_end(session.session_id)
+
+    def _sweep(self) -> None:
+        """Remove sessions detached for longer than the TTL."""
+        cutoff = time.monotonic() - self.ttl
+        expired = [
+            session for session in self._sessions.values()
+            if session.detached_at is not None and session.detached_at < cutoff
+        ]
+        for session in expired:
+            self._remove(session)
+            self.expired += 1
+
+    def _evict_detached(self) -> bool:
+        """Drop the longest-detached session; False if every session is attached."""
+        for session in self._sessions.values():
+            if not session.attached:
+                self._remove(session)
+                return True
+        return False
+
+    def _remove(self, session: ChatSession) -> None:
+        session.cancel()
+        self._sessions.pop(session.session_id, None)
+
+    async def aclose(self) -> None:
+        """Cancel every in-flight message."""
+        tasks = [task for session in self._sessions.values() for task in session.tasks.values()]
+        for session in list(self._sessions.values()):
+            self._remove(session)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get session counts."""
+        attached = sum(1 for session in self._sessions.values() if session.attached)
+        return {
+            "sessions": len(self._sessions),
+            "attached": attached,
+            "in_flight": sum(len(session.tasks) for session in self._sessions.values()),
+            "created": self.created,
+            "resumed": self.resumed,
+            "resume_failures": self.resume_failures,
+            "expired": self.expired,
+        }
@@ -6,6 +6,9 @@ Following Single Responsibility Principle - handles only error management.
 from fastapi import HTTPException
 from typing import Any, Dict, Optional
 import logging
+import math
+
+from .metrics import ERRORS
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,43 @@ class ChatServiceError(Exception):
         super().__init__(self.message)
 
 
+class UpstreamServiceError(ChatServiceError):
+    """Exception raised when the upstream AI service call fails."""
+    
+    def __init__(
+        self, 
+        message: str, 
+        retryable: bool = False, 
+        status_code: Optional[int] = None
+    ):
+        self.retryable = retryable
+        self.status_code = status_code
+        super().__init__(message, {"upstream_status": status_code, "retryable": retryable})
+
+
+class AttachmentError(ChatServiceError):
+    """Exception raised when an attachment cannot be fetched or is not accepted."""
+
+
+class AttachmentTooLargeError(AttachmentError):
+    """Exception raised when an attachment exceeds the size limit."""
+    
+    def __init__(self, filename: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(
+            f"Attachment {filename} exceeds the limit of {max_bytes} bytes",
+            {"filename": filename, "max_bytes": max_bytes}
+        )
+
+
+class CircuitOpenError(Exception):
+    """Exception raised while the upstream circuit breaker is open."""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Upstream service unavailable, retry after {retry_after:.1f}s")
+
+
 class LanguageNotSupportedError(Exception):
     """Exception raised when an unsupported language is requested."""
     
@@ -27,18 +67,126 @@ class LanguageNotSupportedError(Exception):
         super().__init__(f"Language '{language}' is not supported")
 
 
+class RateLimitExceededError(Exception):
+    """Exception raised when a user exceeds their request rate."""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+
+
+class ServiceOverloadedError(Exception):
+    """Exception raised when the service is shedding load."""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Service overloaded, retry after {retry_after:.1f}s")
+
+
+class QuotaExceededError(Exception):
+    """Exception raised when a user has used up their token quota."""
+    
+    def __init__(self, quota: int, used: int, retry_after: float):
+        self.quota = quota
+        self.used = used
+        self.retry_after = retry_after
+        super().__init__(f"Token quota of {quota} exceeded ({used} used), retry after {retry_after:.0f}s")
+
+
+class InputTooLargeError(Exception):
+    """Exception raised when a request's estimated input tokens exceed the limit."""
+    
+    def __init__(self, estimated_tokens: int, max_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.max_tokens = max_tokens
+        super().__init__(f"Request is about {estimated_tokens} tokens, over the limit of {max_tokens}")
+
+
+class IdempotencyConflictError(Exception):
+    """Exception raised when an Idempotency-Key is reused for a different request."""
+    
+    def __init__(self):
+        super().__init__("Idempotency-Key was already used for a different request")
+
+
+class ClientDisconnectedError(Exception):
+    """Exception raised when the client went away before its answer was ready."""
+    
+    def __init__(self):
+        super().__init__("Client disconnected before the response was ready")
+
+
+class DeadlineExceededError(Exception):
+    """Exception raised when a request's deadline passes before its answer is ready."""
+    
+    def __init__(self, remaining: float = 0.0):
+        self.remaining = remaining
+        if remaining > 0:
+            super().__init__(f"Only {remaining:.1f}s left before the request deadline")
+        else:
+            super().__init__("Request deadline exceeded")
+
+
+def _retry_after_header(retry_after: float) -> Dict[str, str]:
+    """Build a Retry-After header in whole seconds."""
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
 def handle_service_error(error: Exception, user_id: str = "") -> HTTPException:
     """
     Convert service errors to HTTP exceptions.
     
+    Logging is left to ``log_request_error`` so each error is logged once.
+    
     Args:
         error: The exception to handle
-        user_id: User ID for logging context
+        user_id: User ID of the failed request
         
     Returns:
         HTTPException with appropriate status code and message
     """
-    logger.error(f"Service error for user {user_id}: {str(error)}")
+    ERRORS.labels(type(error).__name__).inc()
+    
+    if isinstance(error, CircuitOpenError):
+        return HTTPException(
+            status_code=503,
+            detail={
+                "message": str(error),
+                "type": "upstream_unavailable"
+            },
+            headers=_retry_after_header(error.retry_after)
+        )
+    
+    if isinstance(error, AttachmentTooLargeError):
+        return HTTPException(
+            status_code=413,
+            detail={
+                "message": error.message,
+                "details": error.details,
+                "type": "attachment_too_large"
+            }
+        )
+    
+    if isinstance(error, AttachmentError):
+        return HTTPException(
+            status_code=422,
+            detail={
+                "message": error.message,
+                "details": error.details,
+                "type": "attachment_error"
+            }
+        )
+    
+    if isinstance(error, UpstreamServiceError):
+        return HTTPException(
+            status_code=503 if error.retryable else 502,
+            detail={
+                "message": error.message,
+                "details": error.details,
+                "type": "upstream_error"
+            },
+            headers=_retry_after_header(1) if error.retryable else None
+        )
     
     if isinstance(error, ChatServiceError):
         return HTTPException(
@@ -50,6 +198,75 @@ def handle_service_error(error: Exception, user_id: str = "") -> HTTPException:
             }
         )
     
+    if isinstance(error, RateLimitExceededError):
+        return HTTPException(
+            status_code=429,
+            detail={
+                "message": str(error),
+                "type": "rate_limit_exceeded"
+            },
+            headers=_retry_after_header(error.retry_after)
+        )
+    
+    if isinstance(error, ServiceOverloadedError):
+        return HTTPException(
+            status_code=429,
+            detail={
+                "message": str(error),
+                "type": "service_overloaded"
+            },
+            headers=_retry_after_header(error.retry_after)
+        )
+    
+    if isinstance(error, QuotaExceededError):
+        return HTTPException(
+            status_code=429,
+            detail={
+                "message": str(error),
+                "details": {"quota": error.quota, "used": error.used},
+                "type": "quota_exceeded"
+            },
+            headers=_retry_after_header(error.retry_after)
+        )
+    
+    if isinstance(error, InputTooLargeError):
+        return HTTPException(
+            status_code=413,
+            detail={
+                "message": str(error),
+                "details": {"estimated_tokens": error.estimated_tokens, "max_tokens": error.max_tokens},
+                "type": "input_too_large"
+            }
+        )
+    
+    if isinstance(error, IdempotencyConflictError):
+        return HTTPException(
+            status_code=422,
+            detail={
+                "message": str(error),
+                "type": "idempotency_key_reused"
+            }
+        )
+    
+    if isinstance(error, DeadlineExceededError):
+        return HTTPException(
+            status_code=504,
+            detail={
+                "message": str(error),
+                "type": "deadline_exceeded"
+            }
+        )
+    
+    if isinstance(error, ClientDisconnectedError):
+        # Nobody reads this; nginx's "client closed request" status keeps access logs honest
+        return HTTPException(
+            status_code=499,
+            detail={
+                "message": str(error),
+                "type": "client_disconnected"
+            }
+        )
+    
     if isinstance(error, LanguageNotSupportedError):
         return HTTPException(
             status_code=400,
@@ -69,20 +286,59 @@ def handle_service_error(error: Exception, user_id: str = "") -> HTTPException:
     )
 
 
-def log_request_error(endpoint: str, user_id: str, error: Exception) -> None:
+# Errors that reject a request by design rather than indicate a fault
+_EXPECTED_ERRORS = (
+    AttachmentError,
+    CircuitOpenError,
+    RateLimitExceededError,
+    ServiceOverloadedError,
+    QuotaExceededError,
+    InputTooLargeError,
+    IdempotencyConflictError,
+    DeadlineExceededError,
+    ClientDisconnectedError,
+    LanguageNotSupportedError,
+)
+
+
+def log_request_error(
+    endpoint: str,
+    user_id: str,
+    error: Exception,
+    language: Optional[str] = None,
+    latency: Optional[float] = None
+) -> None:
     """
     Log request errors with context.
     
+    Expected rejections (rate limits, token quotas, overload, open circuit,
+    missed deadlines, disconnected clients, unsupported language) are logged
+    as warnings without a traceback; anything else is an error with its
+    traceback.
+    
     Args:
         endpoint: API endpoint where error occurred
         user_id: User ID for context
         error: The exception that occurred
+        language: Language of the request, if known
+        latency: Seconds spent on the request before it failed
     """
-    logger.error(
-        f"Error in {endpoint} for user {user_id}: {str(error)}",
+    expected = isinstance(error, _EXPECTED_ERRORS) or (
+        isinstance(error, UpstreamServiceError) and error.retryable
+    )
+    logger.log(
+        logging.WARNING if expected else logging.ERROR,
+        "Error in %s: %s",
+        endpoint,
+        error,
+        exc_info=None if expected else error,
         extra={
             "endpoint": endpoint,
             "user_id": user_id,
-            "error_type": type(error).__name__
+            "language": language,
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "error_type": type(error).__name__,
+            "outcome": "error"
         }
     )
+
@@ -1,51 +1,211 @@
 """
 Logging utilities.
 Following Single Responsibility Principle - handles only logging configuration.
+
+Handlers on the request path only enqueue records; a background listener
+thread formats them and writes to stdout, so a slow or blocked stdout never
+stalls request handling. When the queue is full, records are dropped and
+counted rather than waiting.
 """
 
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-from typing import Optional
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from .request_context import get_request_options
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Loggers uvicorn gives handlers of its own when started with its default log config
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: Optional[QueueListener] = None
+
+request_logger = logging.getLogger("app.requests")
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with ``extra`` fields at top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SuccessSampleFilter(logging.Filter):
+    """
+    Keep only a share of success logs.
+
+    Records below WARNING with ``outcome="success"`` pass with probability
+    ``rate``; everything else always passes.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        if getattr(record, "outcome", None) != "success":
+            return True
+        return random.random() < self.rate
 
 
-def setup_logging(level: str = "INFO") -> None:
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that does no formatting on the calling thread.
+
+    Only the request ID is captured here (the listener thread cannot see
+    request context); message formatting happens in the listener.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = get_request_options().request_id or None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    level: str = "INFO",
+    log_format: str = "json",
+    queue_size: int = 10000,
+    success_sample_rate: float = 1.0
+) -> None:
     """
     Setup application logging configuration.
-    
+
     Args:
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        log_format: "json" for structured records, "text" for plain lines
+        queue_size: Records buffered before new ones are dropped
+        success_sample_rate: Share of success logs to keep (0.0 - 1.0)
     """
+    global _listener
     log_level = getattr(logging, level.upper(), logging.INFO)
-    
+
     # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
-    # Create console handler
+    if log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    # Console handler, driven by the background listener
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    
+
+    # Request-path handler only samples and enqueues
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(SuccessSampleFilter(success_sample_rate))
+
+    shutdown_logging()
+    _listener = QueueListener(queue_handler.queue, console_handler, respect_handler_level=True)
+    _listener.start()
+
     # Configure root logger
-    logging.basicConfig(
-        level=log_level,
-        handlers=[console_handler],
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
+    logging.basicConfig(level=log_level, handlers=[queue_handler], force=True)
+
+    # Uvicorn's default handlers write synchronously; send its records through the queue
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
     # Set specific loggers
     logging.getLogger("uvicorn").setLevel(log_level)
     logging.getLogger("fastapi").setLevel(log_level)
 
 
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_log_records() -> int:
+    """Get the number of records dropped because the log queue was full."""
+    return sum(
+        handler.dropped
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, NonBlockingQueueHandler)
+    )
+
+
+def log_request_success(
+    endpoint: str,
+    user_id: str,
+    language: str,
+    latency: float,
+    **fields: Any
+) -> None:
+    """
+    Log a completed request (subject to success sampling).
+
+    Args:
+        endpoint: API endpoint that served the request
+        user_id: User ID of the request
+        language: Response language
+        latency: Seconds taken to serve the request
+        **fields: Additional structured fields
+    """
+    if not request_logger.isEnabledFor(logging.INFO):
+        return
+    request_logger.info(
+        "Completed %s",
+        endpoint,
+        extra={
+            "endpoint": endpoint,
+            "user_id": user_id,
+            "language": language,
+            "latency_ms": round(latency * 1000, 1),
+            "outcome": "success",
+            **fields
+        }
+    )
+
+
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """
     Get a logger instance.
-    
+
     Args:
         name: Logger name (defaults to calling module)
-        
+
     Returns:
         Logger instance
     """
     return logging.getLogger(name or __name__)
+
+
+atexit.register(shutdown_logging)
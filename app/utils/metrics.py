@@ -0,0 +1,327 @@
+"""
+Prometheus-style metrics.
+Following Single Responsibility Principle - handles only metric collection and exposition.
+
+Counters, gauges and histograms update plain Python numbers without locks:
+request handlers run on the event loop, so updates do not interleave, and a
+rare lost increment from a worker thread is an acceptable trade for keeping
+the hot path cheap.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds (LLM calls range from ms cache hits to tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a Prometheus label set."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        """Get the child metric for a label combination."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._new_child()
+            self._children[key] = child
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Render the metric family in text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: LabelValues, child: Any) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class _Value:
+    """Mutable numeric cell."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class _HistogramValue:
+    """Bucketed observations for one label combination."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def _render_child(self, values: LabelValues, child: _HistogramValue) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them for scraping."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Dict[str, Any]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(self.prefix + name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def register_collector(self, collect: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Register a callback whose nested stats are exported as gauges at scrape time.
+
+        Numeric leaves of the returned dictionary become gauges named after
+        their path, e.g. ``{"response_cache": {"hits": 3}}`` becomes
+        ``<prefix>response_cache_hits 3``.
+        """
+        self._collectors.append(collect)
+
+    def unregister_collector(self, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Remove a previously registered collector."""
+        if collect in self._collectors:
+            self._collectors.remove(collect)
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collect in list(self._collectors):
+            for name, value in self._flatten(collect()):
+                lines.append(f"# TYPE {self.prefix}{name} gauge")
+                lines.append(f"{self.prefix}{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _flatten(self, stats: Dict[str, Any], path: str = "") -> Iterable[Tuple[str, float]]:
+        """Yield (name, value) pairs for numeric leaves of nested stats."""
+        for key, value in stats.items():
+            name = f"{path}_{key}" if path else str(key)
+            if isinstance(value, dict):
+                yield from self._flatten(value, name)
+            elif isinstance(value, bool):
+                yield name, float(value)
+            elif isinstance(value, (int, float)):
+                yield name, float(value)
+
+
+# Global registry and application metrics
+registry = MetricsRegistry(prefix="chatbot_")
+
+REQUEST_LATENCY = registry.histogram(
+    "request_duration_seconds",
+    "Chat request latency by route and language",
+    ("route", "language")
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "requests_in_flight",
+    "Chat requests currently being processed",
+    ("route",)
+)
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_duration_seconds",
+    "Gemini call latency from request to last chunk",
+    ("model", "language")
+)
+UPSTREAM_FIRST_CHUNK = registry.histogram(
+    "upstream_first_chunk_seconds",
+    "Time from Gemini call to first streamed chunk",
+    ("model", "language")
+)
+UPSTREAM_CHUNKS = registry.histogram(
+    "upstream_chunks",
+    "Chunks received per Gemini call",
+    ("model",),
+    buckets=COUNT_BUCKETS
+)
+UPSTREAM_IN_FLIGHT = registry.gauge(
+    "upstream_in_flight",
+    "Gemini calls currently streaming",
+    ("model",)
+)
+UPSTREAM_TOKENS = registry.counter(
+    "upstream_tokens_total",
+    "Tokens reported in Gemini usage metadata",
+    ("model", "language", "direction")
+)
+UPSTREAM_MAX_TOKENS = registry.counter(
+    "upstream_max_tokens_total",
+    "Gemini responses cut off at the output token cap",
+    ("model", "language")
+)
+UPSTREAM_CANCELLED = registry.counter(
+    "upstream_cancelled_total",
+    "Gemini streams closed before they finished (client gone or deadline passed)",
+    ("model",)
+)
+REQUESTS_CANCELLED = registry.counter(
+    "requests_cancelled_total",
+    "Chat requests abandoned before they finished, by reason (disconnect or deadline)",
+    ("route", "reason")
+)
+REQUESTS_DEGRADED = registry.counter(
+    "requests_degraded_total",
+    "Chat requests answered briefly because their deadline was near",
+    ("route",)
+)
+ERRORS = registry.counter(
+    "errors_total",
+    "Errors converted to HTTP responses, by exception type",
+    ("type",)
+)
+STREAM_FIRST_TOKEN = registry.histogram(
+    "stream_first_token_seconds",
+    "Time to first token on SSE endpoints",
+    ("language",)
+)
+
+
+def observe_request(route: str, language: str, seconds: float) -> None:
+    """Record a completed request's latency."""
+    REQUEST_LATENCY.labels(route, language).observe(seconds)
+
+
+def record_usage(model: str, language: str, usage_metadata: Optional[Any]) -> None:
+    """Record token counts from a Gemini usage metadata object."""
+    if usage_metadata is None:
+        return
+    prompt_tokens = getattr(usage_metadata, "prompt_token_count", None) or 0
+    output_tokens = getattr(usage_metadata, "candidates_token_count", None) or 0
+    cached_tokens = getattr(usage_metadata, "cached_content_token_count", None) or 0
+    thinking_tokens = getattr(usage_metadata, "thoughts_token_count", None) or 0
+    if prompt_tokens:
+        UPSTREAM_TOKENS.labels(model, language, "input").inc(prompt_tokens)
+    if output_tokens:
+        UPSTREAM_TOKENS.labels(model, language, "output").inc(output_tokens)
+    if cached_tokens:
+        UPSTREAM_TOKENS.labels(model, language, "cached").inc(cached_tokens)
+    if thinking_tokens:
+        UPSTREAM_TOKENS.labels(model, language, "thinking").inc(thinking_tokens)
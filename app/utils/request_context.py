@@ -0,0 +1,42 @@
+"""
+Per-request context utilities.
+Following Single Responsibility Principle - handles only request-scoped options.
+"""
+
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RequestOptions:
+    """Options that apply to the current request only."""
+    bypass_cache: bool = False
+    request_id: str = ""
+    # Request path, used to pick per-route limits
+    route: str = ""
+    # time.monotonic() by which the client needs its answer, if it set a deadline
+    deadline: Optional[float] = None
+
+
+_request_options: ContextVar[RequestOptions] = ContextVar("request_options")
+
+
+def get_request_options() -> RequestOptions:
+    """
+    Get options for the current request.
+
+    Returns:
+        The request's options, or defaults outside of a request
+    """
+    return _request_options.get(RequestOptions())
+
+
+def set_request_options(options: RequestOptions) -> None:
+    """
+    Set options for the current request.
+
+    Args:
+        options: Options to apply
+    """
+    _request_options.set(options)
@@ -0,0 +1,35 @@
+"""
+SQLite connection setup.
+Following Single Responsibility Principle - handles only opening the SQLite databases shared by worker processes.
+"""
+
+import sqlite3
+
+# Seconds a statement waits for another process's write lock before failing
+DEFAULT_BUSY_TIMEOUT = 0.5
+
+# Least seconds between refreshes of a row's last-access time on reads
+TOUCH_INTERVAL = 60.0
+
+
+def connect_shared(path: str, busy_timeout: float = DEFAULT_BUSY_TIMEOUT) -> sqlite3.Connection:
+    """
+    Open a database shared by every worker process.
+
+    The connection is in autocommit mode (stores open their own write
+    transactions) and the database in WAL mode, so reads never wait for a
+    writer. Stores are called on the event loop, so a write waits at most
+    ``busy_timeout`` for another process's lock instead of sqlite's default
+    five seconds, during which no other request on the worker could run.
+
+    Args:
+        path: Database file
+        busy_timeout: Seconds to wait for a lock held by another connection
+
+    Returns:
+        Open connection, usable from any thread
+    """
+    conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,25 @@
+"""
+Token estimation utilities.
+Following Single Responsibility Principle - handles only cheap token counting.
+"""
+
+# Gemini averages roughly four bytes of UTF-8 text per token across our languages
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without calling the API.
+
+    Counts UTF-8 bytes rather than characters so Arabic-script text, which
+    tokenizes less densely than English, is not underestimated.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count (at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+    return max(1, len(text.encode("utf-8")) // BYTES_PER_TOKEN)
@@ -0,0 +1,78 @@
+"""
+Outbound URL checks.
+Following Single Responsibility Principle - handles only deciding whether the server may send a request to a client-supplied URL.
+"""
+
+import asyncio
+import ipaddress
+import socket
+from typing import Awaitable, Callable, Collection, List
+from urllib.parse import urlsplit
+
+# Resolves a host and port to IP address strings
+Resolver = Callable[[str, int], Awaitable[List[str]]]
+
+
+async def resolve_host(host: str, port: int) -> List[str]:
+    """Resolve a host name to every IP address it points at."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def is_public_address(address: str) -> bool:
+    """
+    Whether an IP address is on the public internet.
+
+    Loopback, private (RFC 1918, unique local), link-local (including the
+    169.254.169.254 cloud metadata service), multicast and reserved ranges
+    are not public. IPv4-mapped IPv6 addresses are judged by their IPv4 part.
+    """
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_outbound_url(
+    url: str,
+    allowed_hosts: Collection[str] = (),
+    resolve: Resolver = resolve_host
+) -> None:
+    """
+    Check that the server may send a request to a client-supplied URL.
+
+    With ``allowed_hosts`` the host must be one of them. Without, the host
+    must resolve only to public addresses, so clients cannot reach internal
+    services through the server. The check runs before every request
+    (including each redirect hop) but cannot stop a DNS answer that changes
+    between the check and the connection; use ``allowed_hosts`` where that
+    matters.
+
+    Args:
+        url: URL from the client
+        allowed_hosts: Lowercase hosts that may be used (any public host if empty)
+        resolve: Host resolver (replaceable in tests)
+
+    Raises:
+        ValueError: If the URL is not http(s) or its host is not allowed
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("URL must be an absolute http(s) URL")
+
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f"Host {host} is not allowed")
+        return
+
+    try:
+        addresses = [str(ipaddress.ip_address(host))]
+    except ValueError:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            addresses = await resolve(host, port)
+        except OSError:
+            raise ValueError(f"Host {host} could not be resolved")
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        raise ValueError(f"Host {host} is not a public address")
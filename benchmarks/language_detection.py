@@ -0,0 +1,136 @@
+"""
+Language detection benchmark.
+Following Single Responsibility Principle - measures detector accuracy and speed on a labelled set.
+
+The evaluation set (``benchmarks/data/language_eval.jsonl``) is kept apart
+from the training corpus in ``app/data`` so accuracy is measured on unseen
+sentences.
+
+Usage:
+    python -m benchmarks.language_detection
+    python -m benchmarks.language_detection --min-confidence 0.6 --iterations 200
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.language_detection import LanguageDetector
+
+EVAL_PATH = Path(__file__).parent / "data" / "language_eval.jsonl"
+
+
+def load_samples(path: Path) -> List[Dict[str, str]]:
+    """Read ``{"text", "language"}`` records, one per line."""
+    with open(path, encoding="utf-8") as eval_file:
+        return [json.loads(line) for line in eval_file if line.strip()]
+
+
+def evaluate(detector: LanguageDetector, samples: List[Dict[str, str]], min_confidence: float) -> Dict[str, Any]:
+    """
+    Score the detector on labelled samples.
+
+    A detection below ``min_confidence`` counts as abstained: the service
+    would fall back to the default language for it.
+    """
+    per_language: Dict[str, Counter] = defaultdict(Counter)
+    confusions: Counter = Counter()
+    for sample in samples:
+        result = detector.detect(sample["text"])
+        expected = sample["language"]
+        counts = per_language[expected]
+        counts["total"] += 1
+        if result.confidence < min_confidence:
+            counts["abstained"] += 1
+        elif result.language == expected:
+            counts["correct"] += 1
+        else:
+            confusions[f"{expected}->{result.language}"] += 1
+
+    languages = {
+        language: {
+            "samples": counts["total"],
+            "accuracy": round(counts["correct"] / counts["total"], 3),
+            "abstained": counts["abstained"],
+        }
+        for language, counts in sorted(per_language.items())
+    }
+    total = sum(counts["total"] for counts in per_language.values())
+    correct = sum(counts["correct"] for counts in per_language.values())
+    return {
+        "accuracy": round(correct / total, 3) if total else None,
+        "languages": languages,
+        "confusions": dict(confusions.most_common()),
+    }
+
+
+def measure_throughput(detector: LanguageDetector, samples: List[Dict[str, str]], iterations: int) -> Dict[str, Any]:
+    """Time repeated detection over the whole set (model training excluded)."""
+    texts = [sample["text"] for sample in samples]
+    detector.detect("warm up the model")
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            detector.detect(text)
+    elapsed = time.perf_counter() - started
+    calls = iterations * len(texts)
+    return {
+        "calls": calls,
+        "us_per_call": round(elapsed / calls * 1e6, 1),
+        "detections_per_second": round(calls / elapsed),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark offline language detection.")
+    parser.add_argument("--data", type=Path, default=EVAL_PATH, help="Labelled JSONL evaluation set")
+    parser.add_argument(
+        "--min-confidence", type=float, default=0.6,
+        help="Confidence below which a detection counts as abstained (default 0.6)"
+    )
+    parser.add_argument("--iterations", type=int, default=100, help="Passes over the set when timing")
+    parser.add_argument("--output", type=Path, help="Also write the report as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    samples = load_samples(args.data)
+
+    started = time.perf_counter()
+    detector = LanguageDetector()
+    detector.model  # Train up front so training time is reported separately
+    training_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    report = {
+        "min_confidence": args.min_confidence,
+        "training_ms": training_ms,
+        **evaluate(detector, samples, args.min_confidence),
+        "throughput": measure_throughput(detector, samples, args.iterations),
+    }
+
+    print(f"{'language':<12}{'samples':>9}{'accuracy':>10}{'abstained':>11}")
+    for language, scores in report["languages"].items():
+        print(f"{language:<12}{scores['samples']:>9}{scores['accuracy']:>10}{scores['abstained']:>11}")
+    print(f"\nOverall accuracy: {report['accuracy']}")
+    if report["confusions"]:
+        print("Confusions: " + ", ".join(f"{pair} x{count}" for pair, count in report["confusions"].items()))
+    throughput = report["throughput"]
+    print(
+        f"Model training: {training_ms} ms; detection: {throughput['us_per_call']} us/call "
+        f"({throughput['detections_per_second']}/s)"
+    )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
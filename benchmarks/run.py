@@ -0,0 +1,334 @@
+"""
+Load test and benchmark runner.
+Following Single Responsibility Principle - drives the chat routes at fixed concurrency and reports latency.
+
+Runs in-process against the fake backend by default (no API key or quota
+needed), or against a running server with ``--url``. Results are written to
+``benchmarks/results/<label>.json`` and can be compared with a baseline file
+so regressions show up between versions.
+
+Usage:
+    python -m benchmarks.run --label baseline
+    python -m benchmarks.run --label candidate --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Environment for in-process runs; explicit environment variables win
+IN_PROCESS_ENV = {
+    "CHAT_BACKEND": "fake",
+    "RATE_LIMIT_ENABLED": "false",
+    "CONVERSATION_BACKEND": "none",
+}
+
+SAMPLE_MESSAGES = [
+    "Which road is safest to Quetta at night?",
+    "How often should I check tyre pressure?",
+    "Where can I rest near Multan?",
+    "What documents do I need at the weigh station?",
+    "How do I handle brake fade on a downhill?",
+]
+
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, or None without samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def git_revision() -> str:
+    """Get the current git revision, or "unknown" outside a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@asynccontextmanager
+async def open_client(url: Optional[str]) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Open an HTTP client for the target server.
+
+    Without a URL the app is created in-process, its lifespan is run, and
+    requests go through an ASGI transport.
+    """
+    timeout = httpx.Timeout(60.0)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    for key, value in IN_PROCESS_ENV.items():
+        os.environ.setdefault(key, value)
+    from app.main import create_app
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=timeout
+        ) as client:
+            yield client
+
+
+def build_payloads(count: int, repeat_ratio: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    Build request bodies.
+
+    A ``repeat_ratio`` share of messages is drawn from a small fixed pool
+    (exercising the response cache and coalescing); the rest are unique.
+    Every request uses its own user id so rate limits and conversation
+    memory do not interfere.
+    """
+    payloads = []
+    for index in range(count):
+        if rng.random() < repeat_ratio:
+            message = rng.choice(SAMPLE_MESSAGES)
+        else:
+            message = f"{rng.choice(SAMPLE_MESSAGES)} (#{index}-{rng.getrandbits(32):08x})"
+        payloads.append({
+            "user_id": f"bench-{index}",
+            "role": "user",
+            "message": message,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
+    return payloads
+
+
+async def timed_request(
+    client: httpx.AsyncClient,
+    route: str,
+    payload: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Send one request and time it.
+
+    Streaming routes also record time to the first ``chunk`` event.
+    """
+    started = time.perf_counter()
+    first_chunk = None
+    try:
+        if "/stream" in route:
+            async with client.stream("POST", route, json=payload) as response:
+                async for line in response.aiter_lines():
+                    if first_chunk is None and line.startswith("event: chunk"):
+                        first_chunk = time.perf_counter() - started
+                    elif line.startswith("event: error"):
+                        return {"ok": False, "status": response.status_code}
+                status = response.status_code
+        else:
+            response = await client.post(route, json=payload)
+            status = response.status_code
+    except httpx.HTTPError:
+        return {"ok": False, "status": None}
+
+    return {
+        "ok": status == 200,
+        "status": status,
+        "latency": time.perf_counter() - started,
+        "first_chunk": first_chunk,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    route: str,
+    concurrency: int,
+    payloads: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Run all payloads against a route with a fixed number of concurrent workers."""
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    outcomes: List[Dict[str, Any]] = []
+
+    async def worker() -> None:
+        while True:
+            try:
+                payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            outcomes.append(await timed_request(client, route, payload))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [o["latency"] for o in outcomes if o["ok"]]
+    first_chunks = [o["first_chunk"] for o in outcomes if o["ok"] and o["first_chunk"] is not None]
+    errors: Dict[str, int] = {}
+    for outcome in outcomes:
+        if not outcome["ok"]:
+            key = str(outcome["status"])
+            errors[key] = errors.get(key, 0) + 1
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    result = {
+        "route": route,
+        "concurrency": concurrency,
+        "requests": len(outcomes),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+    }
+    if first_chunks:
+        result["first_chunk_p50_ms"] = ms(percentile(first_chunks, 0.50))
+        result["first_chunk_p95_ms"] = ms(percentile(first_chunks, 0.95))
+    return result
+
+
+def compare(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Compare results with a baseline run.
+
+    Returns:
+        One message per (route, concurrency) whose p95 latency rose, or whose
+        throughput fell, by more than ``threshold`` (a fraction)
+    """
+    previous = {(r["route"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for result in current:
+        before = previous.get((result["route"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['route']} @ {result['concurrency']}"
+        if before.get("p95_ms") and result.get("p95_ms"):
+            change = result["p95_ms"] / before["p95_ms"] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{label}: p95 {before['p95_ms']} -> {result['p95_ms']} ms (+{change:.0%})"
+                )
+        if before.get("throughput_rps") and result.get("throughput_rps") is not None:
+            change = 1 - result["throughput_rps"] / before["throughput_rps"]
+            if change > threshold:
+                regressions.append(
+                    f"{label}: throughput {before['throughput_rps']} -> "
+                    f"{result['throughput_rps']} req/s (-{change:.0%})"
+                )
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    """Print a summary table."""
+    header = f"{'route':<24}{'conc':>6}{'reqs':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'ttfc50':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['route']:<24}{r['concurrency']:>6}{r['requests']:>7}{sum(r['errors'].values()):>6}"
+            f"{r['throughput_rps']:>9}{str(r['p50_ms']):>9}{str(r['p95_ms']):>9}{str(r['p99_ms']):>9}"
+            f"{str(r.get('first_chunk_p50_ms', '-')):>9}"
+        )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every route at every concurrency level."""
+    rng = random.Random(args.seed)
+    results = []
+    async with open_client(args.url) as client:
+        for route in args.routes:
+            for concurrency in args.concurrency:
+                payloads = build_payloads(args.requests, args.repeat_ratio, rng)
+                results.append(await run_level(client, route, concurrency, payloads))
+
+    report: Dict[str, Any] = {
+        "label": args.label,
+        "git_revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.url or "in-process",
+        "parameters": {
+            "requests": args.requests,
+            "repeat_ratio": args.repeat_ratio,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if not args.url:
+        report["parameters"]["environment"] = {
+            key: os.environ.get(key)
+            for key in sorted(os.environ)
+            if key.startswith(("CHAT_BACKEND", "FAKE_", "RESPONSE_CACHE", "COALESCING", "MAX_"))
+        }
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the chat routes.")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process fake backend)")
+    parser.add_argument(
+        "--routes", type=lambda s: s.split(","), default=["/chat/urdu", "/chat/stream/urdu"],
+        help="Comma-separated routes to drive"
+    )
+    parser.add_argument(
+        "--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32],
+        help="Comma-separated concurrency levels"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route and level")
+    parser.add_argument(
+        "--repeat-ratio", type=float, default=0.0,
+        help="Share of requests reusing a common message (exercises cache and coalescing)"
+    )
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for message generation")
+    parser.add_argument("--label", default=None, help="Result name (default: git revision)")
+    parser.add_argument("--baseline", help="Result file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="Regression threshold as a fraction of the baseline (default 0.10)"
+    )
+    args = parser.parse_args(argv)
+    args.label = args.label or git_revision()
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_table(report["results"])
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{args.label}.json"
+    path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\nResults written to {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report["results"], baseline["results"], args.threshold)
+        if regressions:
+            print(f"\nRegressions against {baseline.get('label')} ({baseline.get('git_revision')}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {baseline.get('label')} ({baseline.get('git_revision')})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
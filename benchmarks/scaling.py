@@ -0,0 +1,177 @@
+"""
+Worker scaling benchmark.
+Following Single Responsibility Principle - measures how throughput grows with the number of worker processes.
+
+Starts ``python main.py`` with the fake backend once per worker count, drives
+it over HTTP at a fixed concurrency and reports throughput and latency.
+The fake backend's latency defaults to a few milliseconds so the runs
+measure CPU-bound request handling, which is what extra workers add. The
+response cache, conversation store, rate limiter and token ledger use their
+multi-worker (SQLite) backends in every run, so the numbers include the cost
+of sharing.
+
+Usage:
+    python -m benchmarks.scaling --workers 1,2,4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .run import RESULTS_DIR, build_payloads, git_revision, run_level
+
+ROOT = Path(__file__).parent.parent
+
+# Environment for every server run; explicit environment variables win
+SERVER_ENV = {
+    "CHAT_BACKEND": "fake",
+    "FAKE_FIRST_CHUNK_MS": "5",
+    "FAKE_CHUNK_INTERVAL_MS": "1",
+    "FAKE_LATENCY_SIGMA": "0",
+    "RESPONSE_CACHE_BACKEND": "sqlite",
+    "CONVERSATION_BACKEND": "sqlite",
+    "RATE_LIMIT_BACKEND": "sqlite",
+    "TOKEN_LEDGER_BACKEND": "sqlite",
+    "RATE_LIMIT_PER_MINUTE": "1000000",
+    "RATE_LIMIT_BURST": "1000000",
+    "LOG_SUCCESS_SAMPLE_RATE": "0",
+}
+
+
+def start_server(workers: int, port: int, data_dir: str) -> subprocess.Popen:
+    """Start the API with a number of workers and wait until it answers."""
+    env = {**SERVER_ENV, **os.environ}
+    env.update({
+        "WORKERS": str(workers),
+        "PORT": str(port),
+        "HOST": "127.0.0.1",
+        "RESPONSE_CACHE_DB_PATH": os.path.join(data_dir, "response_cache.db"),
+        "CONVERSATION_DB_PATH": os.path.join(data_dir, "conversations.db"),
+        "RATE_LIMIT_DB_PATH": os.path.join(data_dir, "rate_limits.db"),
+        "TOKEN_LEDGER_DB_PATH": os.path.join(data_dir, "token_usage.db"),
+        "JOB_DB_PATH": os.path.join(data_dir, "jobs.db"),
+        "IDEMPOTENCY_DB_PATH": os.path.join(data_dir, "idempotency.db"),
+    })
+    process = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                # Give every worker time to finish startup, not just the first
+                time.sleep(1.0)
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError("Server did not start within 60s")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """Stop the server gracefully, killing it if it does not exit."""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=45)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def measure(port: int, route: str, concurrency: int, requests: int, seed: int) -> Dict[str, Any]:
+    """Warm the server up, then run one load level against it."""
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", timeout=httpx.Timeout(60.0), limits=limits
+    ) as client:
+        await run_level(client, route, concurrency, build_payloads(concurrency * 4, 0.0, rng))
+        return await run_level(client, route, concurrency, build_payloads(requests, 0.0, rng))
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    """Print a summary table with speed-up over the first run."""
+    header = f"{'workers':>8}{'reqs':>7}{'err':>6}{'req/s':>9}{'speedup':>9}{'p50':>9}{'p95':>9}"
+    print(header)
+    print("-" * len(header))
+    base = results[0]["throughput_rps"] or None
+    for r in results:
+        speedup = f"{r['throughput_rps'] / base:.2f}x" if base else "-"
+        print(
+            f"{r['workers']:>8}{r['requests']:>7}{sum(r['errors'].values()):>6}"
+            f"{r['throughput_rps']:>9}{speedup:>9}{str(r['p50_ms']):>9}{str(r['p95_ms']):>9}"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure throughput against the number of workers.")
+    parser.add_argument(
+        "--workers", type=lambda s: [int(w) for w in s.split(",")], default=[1, 2, 4],
+        help="Comma-separated worker counts"
+    )
+    parser.add_argument("--route", default="/chat/urdu", help="Route to drive")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent requests")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per worker count")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the server under test")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for message generation")
+    parser.add_argument("--label", default=None, help="Result name (default: scaling-<git revision>)")
+    args = parser.parse_args(argv)
+    args.label = args.label or f"scaling-{git_revision()}"
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as data_dir:
+            process = start_server(workers, args.port, data_dir)
+            try:
+                result = asyncio.run(
+                    measure(args.port, args.route, args.concurrency, args.requests, args.seed)
+                )
+            finally:
+                stop_server(process)
+        results.append({"workers": workers, **result})
+        print(f"{workers} worker(s): {result['throughput_rps']} req/s", file=sys.stderr)
+
+    print_table(results)
+    report = {
+        "label": args.label,
+        "git_revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "route": args.route,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "environment": {key: os.environ.get(key, value) for key, value in SERVER_ENV.items()},
+        },
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{args.label}.json"
+    path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\nResults written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,11 @@
 """
 Main entry point for the Truck Driver Assistant API.
+
+Runs one worker by default; set WORKERS (or WEB_CONCURRENCY) to serve with
+several preloaded worker processes. See app/server.py.
 """
 
-import uvicorn
-from app.main import app
-from app.core.config import settings
+from app.server import serve
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
-        log_level="info" if not settings.debug else "debug"
-    )
+    serve()
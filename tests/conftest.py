@@ -0,0 +1,8 @@
+"""
+Shared test setup.
+"""
+
+import os
+
+# Settings are read on import; the fake backend needs no GEMINI_API_KEY
+os.environ.setdefault("CHAT_BACKEND", "fake")
@@ -0,0 +1,190 @@
+"""
+Tests for rate and concurrency limits on upstream calls.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import chat
+from app.services import admission
+from app.services.admission import (
+    ConcurrencyLimiter,
+    RateLimitedChatService,
+    SQLiteTokenBucketRateLimiter,
+    TokenBucketRateLimiter,
+)
+from app.services.fake_service import FakeChatService
+from app.utils.exceptions import RateLimitExceededError, ServiceOverloadedError, handle_service_error
+
+BODY = {"user_id": "driver-1", "role": "user", "message": "fuel tips", "timestamp": "2024-01-01T00:00:00"}
+
+
+class FakeClock:
+    """Stand-in for the time module whose clock only moves when told to."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+class ReadyStartup:
+    """Startup state whose warm-up has already finished."""
+
+    async def wait(self, timeout: float) -> bool:
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission, "time", clock)
+    return clock
+
+
+async def _hold(limiter: ConcurrencyLimiter, release: asyncio.Event) -> None:
+    async with limiter.slot():
+        await release.wait()
+
+
+def test_queue_overflow_rejected_immediately():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=5.0)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limiter, release))
+        waiter = asyncio.create_task(_hold(limiter, release))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(ServiceOverloadedError):
+            async with limiter.slot():
+                pass
+        queued = limiter.queued
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return limiter, queued
+
+    limiter, queued = asyncio.run(scenario())
+    assert queued == 1
+    assert limiter.stats()["rejected"] == 1
+    assert limiter.admitted == 2
+
+
+def test_queue_timeout_is_429_with_retry_after():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limiter, release))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(ServiceOverloadedError) as excinfo:
+            async with limiter.slot():
+                pass
+
+        release.set()
+        await holder
+        return limiter, excinfo.value
+
+    limiter, error = asyncio.run(scenario())
+    assert limiter.queued == 0
+    assert limiter.in_flight == 0
+    exception = handle_service_error(error)
+    assert exception.status_code == 429
+    assert exception.detail["type"] == "service_overloaded"
+    assert int(exception.headers["Retry-After"]) >= 1
+
+
+def test_waiter_admitted_when_slot_frees():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=1.0)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limiter, release))
+        await asyncio.sleep(0.01)
+        asyncio.get_running_loop().call_later(0.02, release.set)
+
+        async with limiter.slot():
+            in_flight = limiter.in_flight
+        await holder
+        return limiter, in_flight
+
+    limiter, in_flight = asyncio.run(scenario())
+    assert in_flight == 1
+    assert limiter.stats()["rejected"] == 0
+
+
+def test_token_bucket_refills(clock):
+    limiter = TokenBucketRateLimiter(rate=2.0, burst=2)
+    limiter.check("alice")
+    limiter.check("alice")
+    with pytest.raises(RateLimitExceededError) as excinfo:
+        limiter.check("alice")
+    assert excinfo.value.retry_after == pytest.approx(0.5)
+    # Other users have their own bucket
+    limiter.check("bob")
+
+    clock.now += 0.5
+    limiter.check("alice")
+    with pytest.raises(RateLimitExceededError):
+        limiter.check("alice")
+
+    # Refill stops at the burst size
+    clock.now += 60.0
+    limiter.check("alice")
+    limiter.check("alice")
+    with pytest.raises(RateLimitExceededError):
+        limiter.check("alice")
+    assert limiter.stats() == {"tracked_users": 2, "allowed": 6, "limited": 3}
+
+
+def test_sqlite_bucket_shared_between_processes(clock, tmp_path):
+    # Two limiters on one file stand in for two worker processes
+    path = str(tmp_path / "rate_limits.db")
+    first = SQLiteTokenBucketRateLimiter(path, rate=1.0, burst=2)
+    second = SQLiteTokenBucketRateLimiter(path, rate=1.0, burst=2)
+    try:
+        first.check("alice")
+        second.check("alice")
+        with pytest.raises(RateLimitExceededError):
+            first.check("alice")
+        with pytest.raises(RateLimitExceededError) as excinfo:
+            second.check("alice")
+        assert excinfo.value.retry_after == pytest.approx(1.0)
+
+        clock.now += 1.0
+        second.check("alice")
+        with pytest.raises(RateLimitExceededError):
+            first.check("alice")
+        assert first.stats()["tracked_users"] == 1
+    finally:
+        first.close()
+        second.close()
+
+
+def test_rate_limited_request_is_429_with_retry_after():
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.state.startup = ReadyStartup()
+    app.state.components = SimpleNamespace(
+        chat_service=RateLimitedChatService(
+            FakeChatService(first_chunk_ms=1.0, sigma=0.0, chunk_interval_ms=1.0, chunks=2, seed=1),
+            TokenBucketRateLimiter(rate=0.1, burst=1)
+        ),
+        attachment_fetcher=None,
+        idempotency=None
+    )
+    client = TestClient(app)
+
+    assert client.post("/chat/english", json=BODY).status_code == 200
+    response = client.post("/chat/english", json=BODY)
+
+    assert response.status_code == 429
+    assert response.json()["detail"]["type"] == "rate_limit_exceeded"
+    assert 1 <= int(response.headers["Retry-After"]) <= 10
@@ -0,0 +1,197 @@
+"""
+Tests for attachment fetching against local HTTP stand-ins.
+"""
+
+import asyncio
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.models.schemas import Attachment
+from app.services.attachments import AttachmentFetcher
+from app.utils.exceptions import AttachmentError, AttachmentTooLargeError
+from app.utils.urls import is_public_address, resolve_host
+
+PDF = b"%PDF-1.4 weigh station receipt"
+
+# Stand-in DNS for the mocked hosts
+ADDRESSES = {
+    "files.example.com": ["93.184.216.34"],
+    "cdn.example.com": ["93.184.216.35"],
+    "internal.example.com": ["10.0.0.7"],
+    "rebind.example.com": ["93.184.216.36", "127.0.0.1"],
+}
+
+
+async def _resolve(host: str, port: int):
+    if host not in ADDRESSES:
+        raise OSError("unknown host")
+    return ADDRESSES[host]
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if path == "/bilty.pdf":
+        return httpx.Response(200, content=PDF, headers={"content-type": "application/pdf"})
+    if path == "/big.pdf":
+        return httpx.Response(200, content=b"x" * 2048, headers={"content-type": "application/pdf"})
+    if path == "/to-cdn":
+        return httpx.Response(302, headers={"location": "https://cdn.example.com/bilty.pdf"})
+    if path == "/to-internal":
+        return httpx.Response(302, headers={"location": "http://internal.example.com/secret"})
+    if path == "/to-metadata":
+        return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/meta-data/"})
+    if path == "/loop":
+        return httpx.Response(302, headers={"location": "/loop"})
+    return httpx.Response(404)
+
+
+def _fetcher(**options) -> AttachmentFetcher:
+    options.setdefault("transport", httpx.MockTransport(_handler))
+    options.setdefault("resolve", _resolve)
+    return AttachmentFetcher(**options)
+
+
+def _attachment(url: str) -> Attachment:
+    return Attachment(type="pdf", url=url, filename="bilty.pdf")
+
+
+def _fetch(fetcher: AttachmentFetcher, url: str):
+    async def run():
+        try:
+            return await fetcher.fetch(_attachment(url))
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(run())
+
+
+def test_fetches_from_public_host():
+    content = _fetch(_fetcher(), "https://files.example.com/bilty.pdf")
+
+    assert content.data == PDF
+    assert content.mime_type == "application/pdf"
+    assert content.sha256 == hashlib.sha256(PDF).hexdigest()
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/admin",
+    "http://localhost/admin",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/admin",
+    "http://internal.example.com/secret",
+    "http://rebind.example.com/bilty.pdf",
+    "http://unknown.example.com/bilty.pdf",
+    "ftp://files.example.com/bilty.pdf",
+])
+def test_rejects_non_public_and_unsupported_urls(url):
+    # localhost goes through the real resolver, which needs no network for it
+    fetcher = _fetcher(resolve=_resolve if "example.com" in url else resolve_host)
+
+    with pytest.raises(AttachmentError):
+        _fetch(fetcher, url)
+    assert fetcher.stats()["rejected"] == 1
+
+
+def test_follows_redirects_to_public_hosts():
+    assert _fetch(_fetcher(), "https://files.example.com/to-cdn").data == PDF
+
+
+@pytest.mark.parametrize("path", ["/to-internal", "/to-metadata"])
+def test_checks_every_redirect_hop(path):
+    fetcher = _fetcher()
+
+    with pytest.raises(AttachmentError, match="not a public address"):
+        _fetch(fetcher, f"https://files.example.com{path}")
+
+
+def test_stops_after_too_many_redirects():
+    with pytest.raises(AttachmentError, match="Could not fetch"):
+        _fetch(_fetcher(), "https://files.example.com/loop")
+
+
+def test_allowlist_limits_hosts_without_resolving():
+    fetcher = _fetcher(allowed_hosts=["files.example.com"], resolve=None)
+
+    assert _fetch(fetcher, "https://files.example.com/bilty.pdf").data == PDF
+    with pytest.raises(AttachmentError, match="not allowed"):
+        _fetch(fetcher, "https://cdn.example.com/bilty.pdf")
+
+
+def test_allowlist_applies_to_redirects():
+    fetcher = _fetcher(allowed_hosts=["files.example.com"], resolve=None)
+
+    with pytest.raises(AttachmentError, match="not allowed"):
+        _fetch(fetcher, "https://files.example.com/to-cdn")
+
+
+def test_rejects_bodies_over_the_size_limit():
+    with pytest.raises(AttachmentTooLargeError):
+        _fetch(_fetcher(max_bytes=1024), "https://files.example.com/big.pdf")
+
+
+def test_public_address_ranges():
+    assert is_public_address("93.184.216.34")
+    assert is_public_address("2606:2800:220:1:248:1893:25c8:1946")
+    for address in ("127.0.0.1", "10.1.2.3", "172.16.0.1", "192.168.1.1", "169.254.169.254",
+                    "0.0.0.0", "::1", "fe80::1", "fd00::1", "::ffff:10.0.0.1", "224.0.0.1"):
+        assert not is_public_address(address), address
+
+
+class _PDFHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(PDF)))
+        self.end_headers()
+        self.wfile.write(PDF)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PDFHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/bilty.pdf"
+    server.shutdown()
+    server.server_close()
+
+
+def test_local_server_needs_an_allowlist_entry(local_server):
+    with pytest.raises(AttachmentError, match="not a public address"):
+        _fetch(AttachmentFetcher(), local_server)
+
+    assert _fetch(AttachmentFetcher(allowed_hosts=["127.0.0.1"]), local_server).data == PDF
+
+
+def test_first_failure_cancels_other_downloads():
+    state = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/slow.pdf":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+        return _handler(request)
+
+    async def run():
+        fetcher = _fetcher(transport=httpx.MockTransport(handler), timeout=5.0)
+        try:
+            with pytest.raises(AttachmentError):
+                await fetcher.fetch_all([
+                    _attachment("https://files.example.com/slow.pdf"),
+                    _attachment("https://files.example.com/missing.pdf"),
+                ])
+            return dict(state)
+        finally:
+            await fetcher.aclose()
+
+    assert asyncio.run(asyncio.wait_for(run(), 2.0)) == {"cancelled": True}
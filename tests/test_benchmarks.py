@@ -0,0 +1,34 @@
+"""
+Tests for the benchmark runner's payloads, percentiles and baseline comparison.
+"""
+
+import random
+
+from benchmarks.run import SAMPLE_MESSAGES, build_payloads, compare, percentile
+
+
+def test_percentile_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+
+    assert percentile(samples, 0.50) == 50.0
+    assert percentile(samples, 0.95) == 95.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([], 0.5) is None
+
+
+def test_payloads_repeat_messages_at_the_requested_ratio():
+    payloads = build_payloads(200, 1.0, random.Random(1))
+
+    assert all(payload["message"] in SAMPLE_MESSAGES for payload in payloads)
+    assert len({payload["user_id"] for payload in payloads}) == 200
+    assert all(payload["message"] not in SAMPLE_MESSAGES for payload in build_payloads(50, 0.0, random.Random(1)))
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    baseline = [{"route": "/chat", "concurrency": 10, "p95_ms": 100.0, "throughput_rps": 50.0}]
+    slower = [{"route": "/chat", "concurrency": 10, "p95_ms": 130.0, "throughput_rps": 40.0}]
+    similar = [{"route": "/chat", "concurrency": 10, "p95_ms": 105.0, "throughput_rps": 49.0}]
+
+    assert len(compare(slower, baseline, threshold=0.1)) == 2
+    assert compare(similar, baseline, threshold=0.1) == []
+    assert compare([{**slower[0], "concurrency": 20}], baseline, threshold=0.1) == []
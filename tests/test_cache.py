@@ -0,0 +1,230 @@
+"""
+Tests for response cache keys and both cache backends.
+"""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from app.models.attachment import AttachmentContent
+from app.models.conversation import ConversationHistory, ConversationTurn
+from app.services.cache import (
+    CachedChatService,
+    ResponseCache,
+    SQLiteResponseCache,
+    build_request_key,
+    is_standalone,
+)
+from app.services.interfaces import ChatServiceInterface
+
+HISTORY = ConversationHistory(turns=[
+    ConversationTurn("user", "nearest weigh station?"),
+    ConversationTurn("model", "Sheikhupura, 12 km ahead."),
+])
+
+
+class CountingChatService(ChatServiceInterface):
+    """Stub model that numbers its answers."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_response(self, message, language, context=None, user_id="", history=None, attachments=None):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+    async def generate_response_async(
+        self, message, language, context=None, user_id="", history=None, attachments=None
+    ):
+        return self.generate_response(message, language, context, user_id, history, attachments)
+
+    async def stream_response(
+        self, message, language, context=None, user_id="", history=None, attachments=None
+    ):
+        yield self.generate_response(message, language, context, user_id, history, attachments)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    caches = []
+
+    def make(**limits):
+        if request.param == "memory":
+            cache = ResponseCache(**limits)
+        else:
+            # Exact recency, as the in-memory cache keeps
+            cache = SQLiteResponseCache(str(tmp_path / f"cache{len(caches)}.db"), touch_interval=0.0, **limits)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        if isinstance(cache, SQLiteResponseCache):
+            cache.close()
+
+
+def test_key_ignores_case_whitespace_and_trailing_punctuation():
+    assert build_request_key("How  to save fuel?", "english") == build_request_key("how to save fuel", "english")
+    assert build_request_key("ایندھن کیسے بچائیں؟", "urdu") == build_request_key("ایندھن کیسے بچائیں", "urdu")
+
+
+def test_key_depends_on_language_and_answer_changing_context():
+    base = build_request_key("fuel tips", "english")
+
+    assert build_request_key("fuel tips", "urdu") != base
+    assert build_request_key("fuel tips", "english", {"screen": "trip"}) != base
+    assert build_request_key("fuel tips", "english", {"max_output_tokens": 256}) != base
+    assert build_request_key("fuel tips", "english", {"brief": True}) != base
+    # Fields that do not reach the prompt do not split the cache
+    assert build_request_key("fuel tips", "english", {"location": "31.5,74.3"}) == base
+
+
+def test_key_includes_history_and_attachments():
+    base = build_request_key("and the next one?", "english")
+    history = HISTORY
+    attachment = AttachmentContent(filename="bilty.pdf", mime_type="application/pdf", data=b"x", sha256="ab")
+
+    assert build_request_key("and the next one?", "english", history=history) != base
+    assert build_request_key("and the next one?", "english", history=ConversationHistory()) == base
+    assert build_request_key("and the next one?", "english", attachments=[attachment]) != base
+
+
+def test_cache_hit_and_miss(make_cache):
+    cache = make_cache()
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_cache_expires_entries(make_cache):
+    cache = make_cache()
+    cache.set("key", "value", ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_cache_evicts_least_recently_used(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_skips_values_over_the_byte_limit(make_cache):
+    cache = make_cache(max_bytes=64)
+    cache.set("key", "x" * 1000)
+
+    assert cache.get("key") is None
+
+
+def test_sqlite_cache_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "shared.db")
+    writer = SQLiteResponseCache(path)
+    reader = SQLiteResponseCache(path)
+    try:
+        writer.set("key", "value")
+        assert reader.get("key") == "value"
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_sqlite_cache_hit_does_not_wait_for_a_busy_writer(tmp_path):
+    path = str(tmp_path / "busy.db")
+    cache = SQLiteResponseCache(path, busy_timeout=0.05)
+    cache.set("key", "value")
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        assert cache.get("key") == "value"
+        cache.set("other", "value")
+        elapsed = time.perf_counter() - started
+        assert cache.stats()["errors"] == 1
+    finally:
+        other_worker.rollback()
+        other_worker.close()
+
+    assert elapsed < 1.0
+    assert cache.get("other") is None
+    cache.close()
+
+
+def test_sqlite_cache_refreshes_stale_access_time(tmp_path):
+    path = str(tmp_path / "touch.db")
+    cache = SQLiteResponseCache(path)
+    cache.set("key", "value")
+    cache._conn.execute("UPDATE response_cache SET accessed_at = 0")
+
+    assert cache.get("key") == "value"
+    (accessed_at,) = cache._conn.execute("SELECT accessed_at FROM response_cache").fetchone()
+    cache.close()
+    assert accessed_at > 0
+
+
+@pytest.mark.parametrize("message, standalone", [
+    ("How do I check tyre pressure?", True),
+    ("Lahore se Multan ka toll kitna hai", True),
+    ("ٹائر کا دباؤ کیسے چیک کریں؟", True),
+    ("why?", False),
+    ("is it open now?", False),
+    ("and the next weigh station?", False),
+    ("what about Multan toll", False),
+    ("woh kahan hai bhai", False),
+    ("وہاں کتنا ٹول ہے", False),
+])
+def test_is_standalone(message, standalone):
+    assert is_standalone(message) is standalone
+
+
+def test_standalone_question_shared_across_conversations():
+    inner = CountingChatService()
+    service = CachedChatService(inner, ResponseCache())
+
+    first = service.generate_response("How do I check tyre pressure?", "english")
+    mid_conversation = service.generate_response("how do i check tyre pressure", "english", history=HISTORY)
+
+    assert first == mid_conversation == "answer 1"
+    assert inner.calls == 1
+
+
+def test_follow_up_not_cached():
+    inner = CountingChatService()
+    cache = ResponseCache()
+    service = CachedChatService(inner, cache)
+
+    async def ask():
+        return [text async for text in service.stream_response("is it open now?", "english", history=HISTORY)]
+
+    assert asyncio.run(ask()) == ["answer 1"]
+    assert asyncio.run(ask()) == ["answer 2"]
+    assert cache.stats()["entries"] == 0
+    # Without a history the same words are a complete question for the model
+    assert service.generate_response("is it open now?", "english") == "answer 3"
+    assert service.generate_response("is it open now?", "english") == "answer 3"
+
+
+def test_standalone_follow_ups_can_be_turned_off():
+    inner = CountingChatService()
+    service = CachedChatService(inner, ResponseCache(), standalone_follow_ups=False)
+
+    for _ in range(2):
+        asyncio.run(service.generate_response_async("How do I check tyre pressure?", "english", history=HISTORY))
+    assert inner.calls == 2
+    assert service.cache_key("How do I check tyre pressure?", "english") is not None
@@ -0,0 +1,116 @@
+"""
+Tests for the chat endpoints' request handling.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import chat
+from app.services.admission import RateLimitedChatService, TokenBucketRateLimiter
+from app.services.budget import BudgetedChatService, TokenBudget, TokenLedger
+from app.services.fake_service import FakeChatService
+from app.utils import metrics
+
+BODY = {"user_id": "driver-1", "role": "user", "message": "fuel tips", "timestamp": "2024-01-01T00:00:00"}
+
+
+class CountingFetcher:
+    """Attachment fetcher that only counts fetches."""
+
+    def __init__(self):
+        self.fetches = 0
+
+    async def fetch_all(self, attachments):
+        self.fetches += 1
+        return []
+
+
+class ReadyStartup:
+    """Startup state whose warm-up has already finished."""
+
+    async def wait(self, timeout: float) -> bool:
+        return True
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.state.startup = ReadyStartup()
+    app.state.components = SimpleNamespace(
+        chat_service=FakeChatService(first_chunk_ms=1.0, sigma=0.0, chunk_interval_ms=1.0, chunks=2, seed=1),
+        attachment_fetcher=None,
+        idempotency=None
+    )
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path, route", [
+    ("/chat/english", "/chat/english"),
+    ("/chat/urdu", "/chat/urdu"),
+    ("/chat/", "/chat/"),
+])
+def test_latency_recorded_per_route(client, path, route):
+    histogram = metrics.REQUEST_LATENCY.labels(route, "urdu" if path == "/chat/urdu" else "english")
+    before = histogram.count
+
+    response = client.post(path, json=BODY)
+
+    assert response.status_code == 200
+    assert histogram.count == before + 1
+
+
+def test_batch_items_recorded_under_batch_route(client):
+    histogram = metrics.REQUEST_LATENCY.labels("/chat/batch", "english")
+    before = histogram.count
+
+    response = client.post("/chat/batch", json={"requests": [{**BODY, "language": "english"}] * 2})
+
+    assert response.status_code == 200
+    assert histogram.count == before + 2
+
+
+def _fake_service() -> FakeChatService:
+    return FakeChatService(first_chunk_ms=1.0, sigma=0.0, chunk_interval_ms=1.0, chunks=2, seed=1)
+
+
+def _limited_client(chat_service, fetcher) -> TestClient:
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.state.startup = ReadyStartup()
+    app.state.components = SimpleNamespace(chat_service=chat_service, attachment_fetcher=fetcher, idempotency=None)
+    return TestClient(app)
+
+
+ATTACHED = {**BODY, "attachments": [{"type": "pdf", "url": "https://files.example.com/a.pdf", "filename": "a.pdf"}]}
+
+
+def test_rate_limited_request_fetches_nothing():
+    fetcher = CountingFetcher()
+    service = RateLimitedChatService(_fake_service(), TokenBucketRateLimiter(rate=0.01, burst=1))
+    client = _limited_client(service, fetcher)
+
+    assert client.post("/chat/english", json=ATTACHED).status_code == 200
+    response = client.post("/chat/english", json=ATTACHED)
+
+    assert response.status_code == 429
+    assert response.json()["detail"]["type"] == "rate_limit_exceeded"
+    assert fetcher.fetches == 1
+    # The early check does not take a token of its own
+    assert service.limiter.stats()["allowed"] == 1
+
+
+def test_over_quota_request_fetches_nothing():
+    ledger = TokenLedger(window=60.0, buckets=6)
+    ledger.record("driver-1", 100, 0)
+    fetcher = CountingFetcher()
+    client = _limited_client(BudgetedChatService(_fake_service(), TokenBudget(ledger=ledger, quota=100)), fetcher)
+
+    response = client.post("/chat/english", json=ATTACHED)
+
+    assert response.status_code == 429
+    assert response.json()["detail"]["type"] == "quota_exceeded"
+    assert fetcher.fetches == 0
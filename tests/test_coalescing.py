@@ -0,0 +1,104 @@
+"""
+Tests for single-flight coalescing of identical in-flight requests.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.coalescing import CoalescingChatService
+from app.services.fake_service import FakeChatService
+from app.utils.exceptions import UpstreamServiceError
+
+
+def _fake(**options) -> FakeChatService:
+    defaults = {"first_chunk_ms": 20.0, "sigma": 0.0, "chunk_interval_ms": 5.0, "chunks": 4, "seed": 1}
+    return FakeChatService(**{**defaults, **options})
+
+
+async def _collect(service, message: str = "fuel tips", language: str = "english") -> str:
+    return "".join([text async for text in service.stream_response(message, language)])
+
+
+def test_identical_requests_share_one_generation():
+    service = CoalescingChatService(_fake())
+
+    async def run():
+        return await asyncio.gather(*(_collect(service) for _ in range(3)))
+
+    results = asyncio.run(run())
+
+    assert len(set(results)) == 1 and results[0]
+    assert service.stats() == {"in_flight": 0, "upstream_calls": 1, "coalesced_calls": 2}
+
+
+def test_different_requests_are_not_shared():
+    service = CoalescingChatService(_fake())
+
+    async def run():
+        await asyncio.gather(_collect(service, "fuel tips"), _collect(service, "fuel tips", "urdu"))
+
+    asyncio.run(run())
+
+    assert service.stats()["upstream_calls"] == 2
+
+
+def test_late_joiner_receives_earlier_chunks():
+    service = CoalescingChatService(_fake(chunk_interval_ms=40.0))
+
+    async def run():
+        first = asyncio.create_task(_collect(service))
+        await asyncio.sleep(0.05)
+        return await asyncio.gather(first, _collect(service))
+
+    first, late = asyncio.run(run())
+
+    assert late == first
+    assert service.stats()["coalesced_calls"] == 1
+
+
+def test_failure_reaches_every_waiter():
+    service = CoalescingChatService(_fake(error_rate=1.0))
+
+    async def run():
+        return await asyncio.gather(*(_collect(service) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, UpstreamServiceError) for result in results)
+    assert service.stats()["upstream_calls"] == 1
+
+
+def test_upstream_is_cancelled_when_every_waiter_leaves():
+    service = CoalescingChatService(_fake(first_chunk_ms=1000.0))
+
+    async def run():
+        waiters = [asyncio.create_task(_collect(service)) for _ in range(2)]
+        await asyncio.sleep(0.02)
+        flight = next(iter(service._flights.values()))
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        with pytest.raises(asyncio.CancelledError):
+            await flight.task
+        return flight
+
+    asyncio.run(run())
+
+    assert service.stats()["in_flight"] == 0
+
+
+def test_request_after_abandon_starts_a_new_generation():
+    service = CoalescingChatService(_fake())
+
+    async def run():
+        abandoned = service.stream_response("fuel tips", "english")
+        await abandoned.__anext__()
+        # Cancels the shared generation; its task has not yet run its cleanup
+        await abandoned.aclose()
+        return await _collect(service)
+
+    result = asyncio.run(run())
+
+    assert len(result.split()) == 12
+    assert service.stats() == {"in_flight": 0, "upstream_calls": 2, "coalesced_calls": 0}
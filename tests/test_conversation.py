@@ -0,0 +1,122 @@
+"""
+Tests for conversation memory: history assembly and both conversation stores.
+"""
+
+import pytest
+
+from app.models.conversation import ConversationTurn
+from app.services.conversation import (
+    InMemoryConversationStore,
+    SQLiteConversationStore,
+    assemble_history,
+)
+
+
+def _exchange(index: int, size: int = 40):
+    return [
+        ConversationTurn("user", f"question {index} " + "q" * size),
+        ConversationTurn("model", f"answer {index} " + "a" * size),
+    ]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(**limits):
+        if request.param == "memory":
+            store = InMemoryConversationStore(**limits)
+        else:
+            store = SQLiteConversationStore(str(tmp_path / f"conv{len(stores)}.db"), **limits)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        if isinstance(store, SQLiteConversationStore):
+            store.close()
+
+
+def test_assemble_history_keeps_everything_within_budget():
+    turns = _exchange(1, size=8) + _exchange(2, size=8)
+
+    history = assemble_history(turns, token_budget=1000)
+
+    assert history.turns == turns
+    assert history.summary is None
+
+
+def test_assemble_history_summarizes_older_turns_over_budget():
+    turns = [turn for index in range(10) for turn in _exchange(index)]
+
+    history = assemble_history(turns, token_budget=80)
+
+    assert 0 < len(history.turns) < len(turns)
+    assert history.turns[0].role == "user"
+    assert history.turns[-1] == turns[-1]
+    assert history.summary.startswith("The user previously asked: ")
+    assert "question 0" not in " ".join(turn.text for turn in history.turns)
+
+
+def test_assemble_history_empty():
+    assert assemble_history([], token_budget=100).is_empty()
+    assert assemble_history(_exchange(1), token_budget=0).is_empty()
+
+
+def test_store_round_trip(make_store):
+    store = make_store()
+    store.append_turns("driver", _exchange(1))
+
+    assert [(turn.role, turn.text) for turn in store.get_turns("driver")] == [
+        (turn.role, turn.text) for turn in _exchange(1)
+    ]
+    assert store.get_turns("someone_else") == []
+    assert store.stats()["sessions"] == 1
+
+
+def test_store_trims_oldest_turns_per_user(make_store):
+    store = make_store(max_turns_per_user=4)
+    for index in range(5):
+        store.append_turns("driver", _exchange(index))
+
+    texts = [turn.text for turn in store.get_turns("driver")]
+    assert len(texts) == 4
+    assert texts[0].startswith("question 3")
+    assert texts[-1].startswith("answer 4")
+
+
+def test_store_evicts_least_recently_active_over_total_bytes(make_store):
+    store = make_store(max_total_bytes=400)
+    store.append_turns("first", _exchange(1, size=100))
+    store.append_turns("second", _exchange(2, size=100))
+
+    assert store.get_turns("first") == []
+    assert len(store.get_turns("second")) == 2
+    assert store.stats()["evictions"] == 1
+
+
+def test_store_forgets_idle_sessions(make_store):
+    store = make_store(idle_ttl=0.0)
+    store.append_turns("driver", _exchange(1))
+
+    assert store.get_turns("driver") == []
+
+
+def test_store_clear(make_store):
+    store = make_store()
+    store.append_turns("driver", _exchange(1))
+    store.clear("driver")
+
+    assert store.get_turns("driver") == []
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "shared.db")
+    writer = SQLiteConversationStore(path)
+    reader = SQLiteConversationStore(path)
+    try:
+        writer.append_turns("driver", _exchange(1))
+        assert len(reader.get_turns("driver")) == 2
+    finally:
+        writer.close()
+        reader.close()
@@ -0,0 +1,87 @@
+"""
+Tests for cancelling work when the HTTP client disconnects.
+"""
+
+import asyncio
+
+import pytest
+
+from app.api.disconnect import run_until_disconnect
+from app.utils.exceptions import ClientDisconnectedError
+
+
+class StubRequest:
+    """Request whose only remaining ASGI message is a disconnect, sent on demand."""
+
+    def __init__(self):
+        self.gone = asyncio.Event()
+
+    async def receive(self):
+        await self.gone.wait()
+        return {"type": "http.disconnect"}
+
+
+def test_returns_result_in_calling_task():
+    async def scenario():
+        async def work():
+            return asyncio.current_task()
+
+        task = await run_until_disconnect(StubRequest(), work(), "/test")
+        return task is asyncio.current_task()
+
+    assert asyncio.run(scenario())
+
+
+def test_disconnect_cancels_work():
+    async def scenario():
+        request = StubRequest()
+        state = {}
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        asyncio.get_running_loop().call_later(0.01, request.gone.set)
+        with pytest.raises(ClientDisconnectedError):
+            await run_until_disconnect(request, work(), "/test")
+        # The cancellation was consumed, so the caller can keep awaiting
+        await asyncio.sleep(0)
+        return state, asyncio.current_task().cancelling()
+
+    state, cancelling = asyncio.run(scenario())
+    assert state == {"cancelled": True}
+    assert cancelling == 0
+
+
+def test_outside_cancellation_is_passed_on():
+    async def scenario():
+        task = asyncio.create_task(run_until_disconnect(StubRequest(), asyncio.sleep(10), "/test"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+
+def test_stream_advanced_in_consuming_task():
+    async def scenario():
+        tasks = []
+
+        async def stream():
+            for text in ("a", "b", "c"):
+                tasks.append(asyncio.current_task())
+                await asyncio.sleep(0)
+                yield text
+
+        chunks = stream()
+        first = await run_until_disconnect(StubRequest(), chunks.__anext__(), "/test")
+        rest = [text async for text in chunks]
+        return [first] + rest, tasks, asyncio.current_task()
+
+    texts, tasks, consumer = asyncio.run(scenario())
+    assert texts == ["a", "b", "c"]
+    assert all(task is consumer for task in tasks)
@@ -0,0 +1,59 @@
+"""
+Tests for the fake chat backend used for local development and load tests.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.fake_service import FakeChatService
+from app.utils.exceptions import UpstreamServiceError
+
+
+def _fake(**options) -> FakeChatService:
+    defaults = {"first_chunk_ms": 1.0, "sigma": 0.0, "chunk_interval_ms": 1.0, "chunks": 6, "seed": 7}
+    return FakeChatService(**{**defaults, **options})
+
+
+async def _chunks(service, context=None):
+    return [text async for text in service.stream_response("fuel tips", "english", context)]
+
+
+def test_streams_the_configured_number_of_chunks():
+    assert len(asyncio.run(_chunks(_fake()))) == 6
+
+
+def test_same_seed_gives_the_same_answer():
+    assert asyncio.run(_chunks(_fake())) == asyncio.run(_chunks(_fake()))
+
+
+def test_async_and_sync_paths_answer():
+    service = _fake()
+
+    assert asyncio.run(service.generate_response_async("fuel tips", "urdu"))
+    assert service.generate_response("fuel tips", "english")
+
+
+def test_error_rate_injects_retryable_upstream_errors():
+    with pytest.raises(UpstreamServiceError) as raised:
+        asyncio.run(_chunks(_fake(error_rate=1.0)))
+
+    assert raised.value.retryable
+
+
+def test_output_stops_at_max_output_tokens():
+    chunks = asyncio.run(_chunks(_fake(chunks=20), {"max_output_tokens": 5}))
+
+    assert 0 < len(chunks) < 20
+
+
+def test_first_chunk_pacing_follows_first_chunk_ms():
+    service = _fake(first_chunk_ms=50.0, chunks=1)
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await _chunks(service)
+        return loop.time() - started
+
+    assert asyncio.run(timed()) >= 0.045
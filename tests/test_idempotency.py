@@ -0,0 +1,158 @@
+"""
+Tests for running retried chat requests once.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import chat
+from app.models.schemas import ChatRequest, ChatResponse
+from app.services.cache import ResponseCache
+from app.services.fake_service import FakeChatService
+from app.services.idempotency import IdempotencyGuard, build_idempotency_key
+
+BODY = {"user_id": "driver-1", "role": "user", "message": "fuel tips", "timestamp": "2024-01-01T00:00:00"}
+
+
+class RecordingCache(ResponseCache):
+    """Response cache that remembers the TTL of each write."""
+
+    def __init__(self):
+        super().__init__()
+        self.ttls = {}
+
+    def set(self, key, value, ttl=None):
+        self.ttls[key] = ttl
+        super().set(key, value, ttl)
+
+
+class ReadyStartup:
+    """Startup state whose warm-up has already finished."""
+
+    async def wait(self, timeout: float) -> bool:
+        return True
+
+
+class CountingChatService(FakeChatService):
+    """Fake backend that counts generations."""
+
+    def __init__(self):
+        super().__init__(first_chunk_ms=1.0, sigma=0.0, chunk_interval_ms=1.0, chunks=2, seed=1)
+        self.calls = 0
+
+    async def generate_response_async(self, *args, **kwargs):
+        self.calls += 1
+        return await super().generate_response_async(*args, **kwargs)
+
+
+def _response(text: str = "check tyres") -> ChatResponse:
+    return ChatResponse.create(text, "english", "driver-1")
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.state.startup = ReadyStartup()
+    app.state.components = SimpleNamespace(
+        chat_service=CountingChatService(),
+        attachment_fetcher=None,
+        idempotency=IdempotencyGuard(RecordingCache(), ttl=3600.0, derived_ttl=60.0)
+    )
+    return app
+
+
+def test_retry_replays_stored_response(app):
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post("/chat/english", json=BODY, headers=headers)
+    second = client.post("/chat/english", json=BODY, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    assert app.state.components.chat_service.calls == 1
+
+
+def test_key_reused_for_different_request(app):
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "retry-1"}
+
+    client.post("/chat/english", json=BODY, headers=headers)
+    response = client.post("/chat/english", json={**BODY, "message": "rest stops"}, headers=headers)
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["type"] == "idempotency_key_reused"
+    assert app.state.components.chat_service.calls == 1
+
+
+def test_derived_keys_kept_for_derived_ttl(app):
+    client = TestClient(app)
+    guard = app.state.components.idempotency
+
+    client.post("/chat/english", json=BODY)
+    client.post("/chat/urdu", json=BODY, headers={"Idempotency-Key": "retry-1"})
+
+    assert sorted(guard.store.ttls.values()) == [60.0, 3600.0]
+
+
+def test_derived_keys_disabled():
+    request = ChatRequest(**BODY)
+    assert build_idempotency_key("/chat/english", request, "english") is not None
+    assert build_idempotency_key("/chat/english", request, "english", derive=False) is None
+    assert build_idempotency_key("/chat/english", request, "english", "retry-1", derive=False) is not None
+
+
+def test_concurrent_retries_run_once():
+    async def scenario():
+        guard = IdempotencyGuard(ResponseCache())
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return _response()
+
+        results = await asyncio.gather(guard.run("k", None, work), guard.run("k", None, work))
+        return guard, calls, results
+
+    guard, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results[0][0] == results[1][0]
+    assert sorted(replayed for _, replayed in results) == [False, True]
+    assert guard.stats()["attached"] == 1
+
+
+def test_abandoned_execution_cancelled_after_grace():
+    async def scenario():
+        guard = IdempotencyGuard(ResponseCache(), abandon_grace=0.05)
+        state = {}
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+            return _response()
+
+        caller = asyncio.create_task(guard.run("k", None, work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.02)
+        # Still running during the grace period, for a retry to attach to
+        running = "cancelled" not in state and guard.stats()["in_flight"] == 1
+        await asyncio.sleep(0.1)
+        return guard, state, running
+
+    guard, state, running = asyncio.run(scenario())
+    assert running
+    assert state == {"cancelled": True}
+    assert guard.stats()["abandoned"] == 1
+    assert guard.stats()["in_flight"] == 0
@@ -0,0 +1,179 @@
+"""
+Tests for background chat jobs and their webhooks.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+
+import httpx
+import pytest
+
+from app.models.schemas import ChatRequest
+from app.services.fake_service import FakeChatService
+from app.services.jobs import (
+    JOB_FAILED,
+    JOB_SUCCEEDED,
+    WEBHOOK_DELIVERED,
+    WEBHOOK_FAILED,
+    InMemoryJobStore,
+    JobManager,
+)
+
+# Stand-in DNS for the mocked webhook hosts
+ADDRESSES = {
+    "hooks.example.com": ["93.184.216.34"],
+    "internal.example.com": ["10.0.0.7"],
+}
+
+
+async def _resolve(host: str, port: int):
+    if host not in ADDRESSES:
+        raise OSError("unknown host")
+    return ADDRESSES[host]
+
+
+class WebhookReceiver:
+    """Mock webhook endpoint that records deliveries and can fail the first few."""
+
+    def __init__(self, failures: int = 0, status_code: int = 500):
+        self.failures = failures
+        self.status_code = status_code
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if len(self.requests) <= self.failures:
+            return httpx.Response(self.status_code)
+        return httpx.Response(204)
+
+
+class FlakyJobStore(InMemoryJobStore):
+    """Job store whose next ``failures`` saves raise."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def save(self, job_id, record, ttl):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().save(job_id, record, ttl)
+
+
+def _request(message: str = "tyre pressure?") -> ChatRequest:
+    return ChatRequest(user_id="driver-1", role="user", message=message, timestamp="2024-01-01T00:00:00")
+
+
+def _manager(store=None, receiver=None, **options) -> JobManager:
+    return JobManager(
+        FakeChatService(first_chunk_ms=1.0, sigma=0.0, chunk_interval_ms=1.0, chunks=2, seed=1),
+        store or InMemoryJobStore(),
+        workers=1,
+        transport=httpx.MockTransport(receiver or WebhookReceiver()),
+        resolve=_resolve,
+        **options
+    )
+
+
+async def _run_job(manager: JobManager, webhook_url=None):
+    """Submit one job, wait for it and for its webhook, and return its final record."""
+    await manager.start()
+    try:
+        job_id = manager.submit(_request(), "english", webhook_url=webhook_url)["job_id"]
+        await manager.wait(job_id, 5.0)
+        while manager.stats()["webhooks_pending"]:
+            await asyncio.sleep(0.01)
+        return manager.get(job_id)
+    finally:
+        await manager.stop()
+
+
+def test_webhook_delivered_with_signature():
+    receiver = WebhookReceiver()
+    manager = _manager(receiver=receiver, webhook_secret="s3cret")
+    record = asyncio.run(_run_job(manager, "https://hooks.example.com/done"))
+
+    assert record["status"] == JOB_SUCCEEDED
+    assert record["webhook"] == WEBHOOK_DELIVERED
+    (request,) = receiver.requests
+    body = json.loads(request.content)
+    assert body["job_id"] == record["job_id"]
+    assert body["status"] == JOB_SUCCEEDED
+    expected = hmac.new(b"s3cret", request.content, hashlib.sha256).hexdigest()
+    assert request.headers["X-Signature"] == f"sha256={expected}"
+
+
+def test_webhook_retried_on_server_error():
+    receiver = WebhookReceiver(failures=1)
+    manager = _manager(receiver=receiver, webhook_attempts=2)
+    record = asyncio.run(_run_job(manager, "https://hooks.example.com/done"))
+
+    assert record["webhook"] == WEBHOOK_DELIVERED
+    assert len(receiver.requests) == 2
+
+
+def test_webhook_not_retried_on_client_error():
+    receiver = WebhookReceiver(failures=3, status_code=400)
+    manager = _manager(receiver=receiver, webhook_attempts=3)
+    record = asyncio.run(_run_job(manager, "https://hooks.example.com/done"))
+
+    assert record["webhook"] == WEBHOOK_FAILED
+    assert len(receiver.requests) == 1
+    assert manager.stats()["webhooks_failed"] == 1
+
+
+@pytest.mark.parametrize("url, reason", [
+    ("http://127.0.0.1:8080/hook", "not a public address"),
+    ("http://169.254.169.254/latest/meta-data/", "not a public address"),
+    ("http://[::1]/hook", "not a public address"),
+    ("https://internal.example.com/hook", "not a public address"),
+    ("https://unknown.example.com/hook", "could not be resolved"),
+    ("ftp://hooks.example.com/hook", "absolute http(s) URL"),
+])
+def test_webhook_url_rejects_non_public_hosts(url, reason):
+    manager = _manager()
+    with pytest.raises(ValueError, match="Invalid webhook URL") as excinfo:
+        asyncio.run(manager.check_webhook_url(url))
+    assert reason in str(excinfo.value)
+
+
+def test_webhook_url_allowlist():
+    manager = _manager(webhook_allowed_hosts=["Internal.example.com"])
+    asyncio.run(manager.check_webhook_url("https://internal.example.com/hook"))
+    with pytest.raises(ValueError, match="not allowed"):
+        asyncio.run(manager.check_webhook_url("https://hooks.example.com/hook"))
+
+
+def test_webhook_host_checked_again_before_delivery():
+    receiver = WebhookReceiver()
+    manager = _manager(receiver=receiver)
+    record = asyncio.run(_run_job(manager, "https://internal.example.com/hook"))
+
+    assert record["status"] == JOB_SUCCEEDED
+    assert record["webhook"] == WEBHOOK_FAILED
+    assert receiver.requests == []
+
+
+def test_worker_survives_store_error():
+    async def scenario():
+        manager = _manager(store=FlakyJobStore(failures=0))
+        await manager.start()
+        try:
+            first = manager.submit(_request(), "english")["job_id"]
+            # The save marking the job as running fails
+            manager.store.failures = 1
+            first_record = await manager.wait(first, 5.0)
+            second = manager.submit(_request("rest stops?"), "english")["job_id"]
+            second_record = await manager.wait(second, 5.0)
+            return manager, first_record, second_record
+        finally:
+            await manager.stop()
+
+    manager, first_record, second_record = asyncio.run(scenario())
+    assert first_record["status"] == JOB_FAILED
+    assert first_record["error"]["type"] == "internal_error"
+    assert second_record["status"] == JOB_SUCCEEDED
+    assert manager.stats()["running"] == 0
@@ -0,0 +1,94 @@
+"""
+Tests for queued, structured logging.
+"""
+
+import asyncio
+import json
+import logging
+import logging.config
+import socket
+
+import httpx
+import pytest
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from app.server import _server_options
+from app.utils.logging import UVICORN_LOGGERS, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    yield
+    shutdown_logging()
+    root.handlers[:], level = saved
+    root.setLevel(level)
+    for name in UVICORN_LOGGERS:
+        logging.getLogger(name).handlers.clear()
+
+
+def _records(output: str):
+    return [json.loads(line) for line in output.splitlines() if line.strip()]
+
+
+async def _app(scope, receive, send):
+    """ASGI app answering every HTTP request with 204."""
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 204, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_uvicorn_default_handlers_replaced(restore_logging, capsys):
+    # As when started with `uvicorn app.main:app`: uvicorn configures logging before importing the app
+    logging.config.dictConfig(LOGGING_CONFIG)
+    setup_logging("INFO", log_format="json")
+
+    for name in UVICORN_LOGGERS:
+        assert logging.getLogger(name).handlers == []
+        assert logging.getLogger(name).propagate
+
+    logging.getLogger("uvicorn.access").info(
+        '%s - "%s %s HTTP/%s" %d', "127.0.0.1:5000", "GET", "/health", "1.1", 200
+    )
+    shutdown_logging()
+
+    (record,) = _records(capsys.readouterr().out)
+    assert record["logger"] == "uvicorn.access"
+    assert record["message"] == '127.0.0.1:5000 - "GET /health HTTP/1.1" 200'
+
+
+def test_server_access_log_written_as_json(restore_logging, capsys):
+    # As in the prefork supervisor: the app sets up logging, then the server config is built
+    setup_logging("INFO", log_format="json")
+    options = _server_options(1.0)
+    options.update(host="127.0.0.1", port=_free_port())
+    config = uvicorn.Config(_app, **options)
+    server = uvicorn.Server(config)
+
+    async def scenario():
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{options['port']}/health")
+        server.should_exit = True
+        await task
+        return response.status_code
+
+    assert asyncio.run(scenario()) == 204
+    shutdown_logging()
+
+    records = _records(capsys.readouterr().out)
+    access = [record for record in records if record["logger"] == "uvicorn.access"]
+    assert len(access) == 1
+    assert '"GET /health HTTP/1.1" 204' in access[0]["message"]
+    assert any(record["logger"] == "uvicorn.error" for record in records)
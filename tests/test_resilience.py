@@ -0,0 +1,173 @@
+"""
+Fault-injection tests for retries, hedging and the circuit breaker.
+"""
+
+import asyncio
+from typing import AsyncIterator, List
+
+import pytest
+
+from app.services.fake_service import FakeChatService
+from app.services.interfaces import ChatServiceInterface
+from app.services.resilience import CircuitBreaker, ResilientChatService, RetryPolicy
+from app.utils.exceptions import CircuitOpenError, UpstreamServiceError
+
+
+class ScriptedChatService(ChatServiceInterface):
+    """Stub upstream whose calls fail or stall as scripted, in call order."""
+
+    def __init__(self, script: List):
+        self.script = list(script)
+        self.calls = 0
+        self.closed = 0
+
+    def generate_response(self, message, language, context=None, user_id="", history=None, attachments=None):
+        raise NotImplementedError
+
+    async def generate_response_async(
+        self, message, language, context=None, user_id="", history=None, attachments=None
+    ):
+        return "".join([text async for text in self.stream_response(message, language)])
+
+    async def stream_response(
+        self, message, language, context=None, user_id="", history=None, attachments=None
+    ) -> AsyncIterator[str]:
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        try:
+            if isinstance(step, Exception):
+                raise step
+            await asyncio.sleep(step)
+            yield f"answer {self.calls}"
+        finally:
+            self.closed += 1
+
+
+def _transient() -> UpstreamServiceError:
+    return UpstreamServiceError("Simulated upstream error", retryable=True, status_code=503)
+
+
+def _service(inner, **options) -> ResilientChatService:
+    options.setdefault("retry_policy", RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0))
+    return ResilientChatService(inner, **options)
+
+
+async def _collect(service) -> str:
+    return "".join([text async for text in service.stream_response("fuel tips", "english")])
+
+
+def test_transient_failures_are_retried():
+    inner = ScriptedChatService([_transient(), _transient(), 0.0])
+    service = _service(inner)
+
+    assert asyncio.run(_collect(service)) == "answer 3"
+    assert service.stats()["retries"] == 2
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_and_rejects_with_fake_backend_failing():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60.0)
+    service = _service(
+        FakeChatService(first_chunk_ms=1.0, sigma=0.0, error_rate=1.0, seed=1),
+        retry_policy=RetryPolicy(max_attempts=1),
+        breaker=breaker
+    )
+
+    for _ in range(2):
+        with pytest.raises(UpstreamServiceError):
+            asyncio.run(_collect(service))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(_collect(service))
+    assert breaker.stats()["state"] == CircuitBreaker.OPEN
+    assert breaker.stats()["rejected"] == 1
+
+
+def _open_breaker(recovery_timeout: float = 0.01) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=recovery_timeout)
+    breaker.before_call()
+    breaker.record_failure(_transient())
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_cancelled_trial_releases_the_half_open_slot():
+    breaker = _open_breaker()
+    inner = ScriptedChatService([1.0, 0.0])
+    service = _service(inner, breaker=breaker)
+
+    async def run():
+        await asyncio.sleep(0.02)
+        trial = asyncio.create_task(_collect(service))
+        await asyncio.sleep(0.01)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await _collect(service)
+
+    assert asyncio.run(run()) == "answer 2"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_closed_trial_stream_releases_the_half_open_slot():
+    breaker = _open_breaker()
+    inner = ScriptedChatService([0.0])
+    service = _service(inner, breaker=breaker)
+
+    async def run():
+        await asyncio.sleep(0.02)
+        stream = service.stream_response("fuel tips", "english")
+        assert await stream.__anext__() == "answer 1"
+        await stream.aclose()
+        return await _collect(service)
+
+    assert asyncio.run(run()) == "answer 2"
+    assert inner.closed == 2
+
+
+def test_lost_trial_is_replaced_after_the_recovery_timeout():
+    breaker = _open_breaker(recovery_timeout=0.01)
+
+    async def run():
+        await asyncio.sleep(0.02)
+        assert breaker.before_call() is True
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        await asyncio.sleep(0.02)
+        return breaker.before_call()
+
+    assert asyncio.run(run()) is True
+
+
+def test_stream_records_first_chunk_latency():
+    service = _service(ScriptedChatService([0.0]))
+
+    asyncio.run(_collect(service))
+
+    assert service.stats()["first_chunk_p95_ms"] is not None
+
+
+def test_slow_stream_is_hedged_and_loser_cancelled():
+    inner = ScriptedChatService([1.0, 0.0])
+    service = _service(inner, hedge_percentile=0.95, hedge_min_samples=1)
+    service.first_chunk.record(0.02)
+
+    async def run():
+        result = await _collect(service)
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(run()) == "answer 2"
+    stats = service.stats()
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
+    assert inner.closed == 2
+
+
+def test_hedged_stream_fails_only_when_every_attempt_fails():
+    inner = ScriptedChatService([UpstreamServiceError("bad request", retryable=False, status_code=400)])
+    service = _service(inner, hedge_percentile=0.95, hedge_min_samples=1)
+    service.first_chunk.record(0.02)
+
+    with pytest.raises(UpstreamServiceError):
+        asyncio.run(_collect(service))
+    assert inner.calls == 1
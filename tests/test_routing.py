@@ -0,0 +1,78 @@
+"""
+Tests for routing between a fast and a strong model.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+from app.services.fake_service import FakeChatService
+from app.services.interfaces import ChatServiceInterface
+from app.services.routing import TIER_FAST, TIER_STRONG, ModelRouterChatService
+
+
+class TaskRecordingChatService(ChatServiceInterface):
+    """Stub model that records which task resumes its stream."""
+
+    def __init__(self, first_chunk_delay: float = 0.0):
+        self.first_chunk_delay = first_chunk_delay
+        self.tasks = []
+        self.closed = False
+
+    def generate_response(self, message, language, context=None, user_id="", history=None, attachments=None):
+        raise NotImplementedError
+
+    async def generate_response_async(
+        self, message, language, context=None, user_id="", history=None, attachments=None
+    ):
+        raise NotImplementedError
+
+    async def stream_response(
+        self, message, language, context=None, user_id="", history=None, attachments=None
+    ) -> AsyncIterator[str]:
+        try:
+            await asyncio.sleep(self.first_chunk_delay)
+            for text in ("one ", "two"):
+                self.tasks.append(asyncio.current_task())
+                yield text
+        finally:
+            self.closed = True
+
+
+def _router(fast, strong, **options) -> ModelRouterChatService:
+    return ModelRouterChatService({"fast": fast, "strong": strong}, "fast", "strong", **options)
+
+
+async def _collect(service, message: str = "fuel tips") -> str:
+    return "".join([text async for text in service.stream_response(message, "english")])
+
+
+def test_classifies_by_length_complexity_and_brief():
+    router = _router(FakeChatService(), FakeChatService())
+
+    assert router.classify("fuel tips") == TIER_FAST
+    assert router.classify("x" * 500) == TIER_STRONG
+    assert router.classify("x" * 500, brief=True) == TIER_FAST
+
+
+def test_stream_is_resumed_only_by_the_consuming_task():
+    fast = TaskRecordingChatService()
+    router = _router(fast, TaskRecordingChatService(), first_chunk_timeout=5.0)
+
+    async def run():
+        return await _collect(router), asyncio.current_task()
+
+    text, consumer = asyncio.run(run())
+
+    assert text == "one two"
+    assert fast.tasks == [consumer, consumer]
+    assert fast.closed
+
+
+def test_falls_back_when_the_first_chunk_is_late():
+    slow = TaskRecordingChatService(first_chunk_delay=1.0)
+    strong = TaskRecordingChatService()
+    router = _router(slow, strong, first_chunk_timeout=0.05)
+
+    assert asyncio.run(_collect(router)) == "one two"
+    assert slow.closed
+    assert router.stats()["fallbacks"] == 1
@@ -0,0 +1,52 @@
+"""
+Tests for access to the token usage endpoints.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import utils
+from app.core.config import settings
+from app.services.budget import TokenBudget, TokenLedger
+
+
+@pytest.fixture
+def client(monkeypatch):
+    ledger = TokenLedger(window=60.0, buckets=6)
+    ledger.record("alice", 10, 20)
+    app = FastAPI()
+    app.include_router(utils.router)
+    app.state.components = SimpleNamespace(token_budget=TokenBudget(ledger=ledger, quota=100))
+    monkeypatch.setattr(settings, "usage_admin_token", "s3cret")
+    return TestClient(app)
+
+
+def test_usage_disabled_without_admin_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "usage_admin_token", None)
+    for path in ("/usage", "/usage/alice"):
+        response = client.get(path, headers={"Authorization": "Bearer s3cret"})
+        assert response.status_code == 404
+        assert response.json()["detail"]["type"] == "usage_disabled"
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "Basic s3cret", "s3cret"])
+def test_usage_rejects_missing_or_wrong_token(client, authorization):
+    headers = {"Authorization": authorization} if authorization else {}
+    for path in ("/usage", "/usage/alice"):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_usage_with_admin_token(client):
+    response = client.get("/usage/alice", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    user = response.json()["users"][0]
+    assert user["user_id"] == "alice"
+    assert user["remaining"] == 70
+
+    response = client.get("/usage", headers={"Authorization": "Bearer s3cret"})
+    assert [user["user_id"] for user in response.json()["users"]] == ["alice"]